@@ -1,37 +1,175 @@
+import asyncio
+import json
+import secrets
 import uuid
-from fastapi import APIRouter, HTTPException, Request
-from pydantic import BaseModel
-from app.core import llm_client
-from app.core.llm_client import LLMClient
+from fastapi import APIRouter, HTTPException, Path, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from typing import Optional, Union
+from pydantic import BaseModel, ConfigDict, Field
 from app.core.tool_client import ToolClient
 import structlog
 from app.core.guardrails import is_unsafe_user_input
 from app.core.rate_limit import RateLimiter
-from app.workflows.qa_graph import run_qa_workflow
+from app.core.config import (
+    BATCH_MAX_QUESTIONS, BATCH_CONCURRENCY, REQUEST_TIMEOUT_S, MAX_REQUEST_TIMEOUT_S, DEFAULT_COLLECTION,
+    ADMIN_TOKEN, INDEX_STORAGE,
+)
+from app.core.deadline import deadline_after
+from app.core.bulkhead import UpstreamUnavailable, bulkheads, shed_load
+from app.core.lifecycle import lifecycle
+from app.core import metrics
 
 router = APIRouter()
 tool_client = ToolClient()
 log = structlog.get_logger()
 limiter = RateLimiter(max_requests=10, window_seconds=60)
 
-llm = None
-try:
-    llm = LLMClient()
-except Exception as e:
-    llm = None
+COLLECTION_PATTERN = r"^[a-z0-9][a-z0-9_-]{0,63}$"
+
+class SearchFilters(BaseModel):
+    """Restrict retrieval to matching chunks: a value or a list of values per field."""
+    model_config = ConfigDict(extra="forbid")
+
+    doc_id: Optional[Union[str, list[str]]] = None
+    source: Optional[Union[str, list[str]]] = None
+    doc_type: Optional[Union[str, list[str]]] = None   # file suffix: "pdf", "md", "txt"
 
 class ChatRequest(BaseModel):
     message: str
+    collection: str = Field(DEFAULT_COLLECTION, pattern=COLLECTION_PATTERN)
+    filters: Optional[SearchFilters] = None
 
 class ChatResponse(BaseModel):
     reply: str
     request_id: str
     meta: dict
 
+class ChatBatchRequest(BaseModel):
+    messages: list[str] = Field(..., min_length=1, max_length=BATCH_MAX_QUESTIONS)
+    concurrency: int = Field(BATCH_CONCURRENCY, ge=1, le=64)
+    collection: str = Field(DEFAULT_COLLECTION, pattern=COLLECTION_PATTERN)
+    filters: Optional[SearchFilters] = None
+
+class RebuildRequest(BaseModel):
+    docs_dir: str = "docs"
+    storage: str = Field(INDEX_STORAGE, pattern=r"^(flat|fp16|sq8|binary)$")
+
+class ActivateRequest(BaseModel):
+    version: str = Field(..., pattern=r"^[0-9A-Za-z_-]{1,64}$")
+
+def request_deadline(request: Request) -> float:
+    """Deadline from the x-request-timeout-ms header (capped), else REQUEST_TIMEOUT_S."""
+    timeout_s = REQUEST_TIMEOUT_S
+    raw = request.headers.get("x-request-timeout-ms")
+    if raw:
+        try:
+            timeout_s = min(max(float(raw) / 1000.0, 0.0), MAX_REQUEST_TIMEOUT_S)
+        except ValueError:
+            pass
+    return deadline_after(timeout_s)
+
+def upstream_unavailable(e: UpstreamUnavailable, endpoint: str) -> HTTPException:
+    """429 (overloaded) or 503 (circuit open), with Retry-After."""
+    metrics.LOAD_SHED.inc(endpoint=endpoint, reason=e.reason)
+    log.warning("load_shed", endpoint=endpoint, upstream=e.upstream, reason=e.reason, retry_after_s=e.retry_after)
+    return HTTPException(
+        status_code=e.status_code,
+        detail=f"{e}; retry after {e.retry_after}s",
+        headers={"Retry-After": e.retry_after},
+    )
+
+def require_collection(name: str) -> None:
+    from app.rag.stores import collection_exists
+
+    if not collection_exists(name):
+        raise HTTPException(status_code=404, detail=f"Unknown collection: {name}")
+
+def require_admin(request: Request) -> None:
+    """x-admin-token must match ADMIN_TOKEN; with no token configured the admin endpoints are disabled."""
+    if not ADMIN_TOKEN:
+        # Fail closed: behind a same-host reverse proxy every caller looks like loopback
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if not secrets.compare_digest(request.headers.get("x-admin-token", ""), ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
 @router.get("/health")
 async def health() -> dict:
     return {"status": "ok"}
 
+@router.get("/live")
+async def live() -> dict:
+    """Liveness: the event loop answers. Stays 200 while draining."""
+    return {"status": "alive", "state": lifecycle.state}
+
+@router.get("/ready")
+async def ready() -> JSONResponse:
+    """Readiness: warmed up and not draining; 503 otherwise, so load balancers route around this worker."""
+    body = {
+        **lifecycle.status(),
+        "upstreams": {name: b.breaker.state for name, b in bulkheads.items()},
+    }
+    return JSONResponse(body, status_code=200 if lifecycle.ready else 503)
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics() -> PlainTextResponse:
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/collections")
+async def collections() -> dict:
+    from app.rag.stores import list_collections, stores
+
+    return {"collections": list_collections(), "resident": stores.resident(), **stores.stats()}
+
+_warmers: set = set()
+
+@router.post("/admin/collections/{name}/rebuild", status_code=202)
+async def rebuild_collection(
+    req: RebuildRequest, request: Request, name: str = Path(..., pattern=COLLECTION_PATTERN)
+) -> dict:
+    """
+    Rebuild `name` from docs_dir in a worker process. The new version goes live
+    atomically when it is complete; poll GET on the same path for progress.
+    """
+    require_admin(request)
+    from app.rag.rebuild import RebuildRunning, rebuild_status, start_rebuild, wait_and_warm
+
+    try:
+        started = start_rebuild(name, req.docs_dir, storage=req.storage)
+    except RebuildRunning:
+        raise HTTPException(status_code=409, detail=f"A rebuild of {name} is already running")
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Load the new version as soon as it is published, before a query has to
+    task = asyncio.create_task(wait_and_warm(name))
+    _warmers.add(task)
+    task.add_done_callback(_warmers.discard)
+    return {**started, "status": rebuild_status(name)}
+
+@router.get("/admin/collections/{name}/rebuild")
+async def rebuild_progress(request: Request, name: str = Path(..., pattern=COLLECTION_PATTERN)) -> dict:
+    require_admin(request)
+    from app.rag.rebuild import rebuild_status
+
+    status = rebuild_status(name)
+    if status["active_version"] is None and not status["versions"]:
+        raise HTTPException(status_code=404, detail=f"Unknown collection: {name}")
+    return status
+
+@router.post("/admin/collections/{name}/activate")
+async def activate_version(
+    req: ActivateRequest, request: Request, name: str = Path(..., pattern=COLLECTION_PATTERN)
+) -> dict:
+    """Point the collection at an earlier (kept) version, e.g. to roll back."""
+    require_admin(request)
+    from app.rag.rebuild import activate, rebuild_status
+
+    try:
+        activate(name, req.version)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return rebuild_status(name)
+
 """@router.post("/chat", response_model=ChatResponse)
 async def chat(req: ChatRequest, request: Request):
     request_id = getattr(request.state, "request_id", str(uuid.uuid4()))
@@ -66,8 +204,27 @@ async def chat(req: ChatRequest, request: Request):
 async def chat(req: ChatRequest, request: Request):
     request_id = getattr(request.state, "request_id", str(uuid.uuid4()))
     client_key = request.client.host if request.client else "unknown"
+    require_collection(req.collection)
+
+    # Turn the request away now rather than queue it behind calls that are already waiting
+    shed = shed_load()
+    if shed is not None:
+        raise upstream_unavailable(shed, "chat")
+
+    # Imported on first use: pulls in langgraph, faiss, numpy and openai
+    from app.workflows.qa_graph import run_qa_workflow
 
-    result = await run_qa_workflow(req.message, request_id=request_id, client_key=client_key)
+    try:
+        result = await run_qa_workflow(
+            req.message,
+            request_id=request_id,
+            client_key=client_key,
+            deadline=request_deadline(request),
+            collection=req.collection,
+            filters=req.filters.model_dump(exclude_none=True) if req.filters else None,
+        )
+    except UpstreamUnavailable as e:
+        raise upstream_unavailable(e, "chat")
 
     return ChatResponse(
         reply=result.get("answer", ""),
@@ -79,3 +236,35 @@ async def chat(req: ChatRequest, request: Request):
     )
 
 
+@router.post("/chat/batch")
+async def chat_batch(req: ChatBatchRequest, request: Request):
+    """
+    Streams one NDJSON line per question as it completes:
+    {"index": i, "reply": ..., "request_id": ..., "meta": {...}}
+    """
+    request_id = getattr(request.state, "request_id", str(uuid.uuid4()))
+    client_key = request.client.host if request.client else "unknown"
+    require_collection(req.collection)
+    shed = shed_load()
+    if shed is not None:
+        raise upstream_unavailable(shed, "chat_batch")
+
+    from app.workflows.qa_graph import run_qa_batch
+
+    async def lines():
+        async for i, result in run_qa_batch(
+            req.messages,
+            request_id=request_id,
+            client_key=client_key,
+            concurrency=req.concurrency,
+            collection=req.collection,
+            filters=req.filters.model_dump(exclude_none=True) if req.filters else None,
+        ):
+            item = ChatResponse(
+                reply=result.get("answer", ""),
+                request_id=result.get("request_id", f"{request_id}:{i}"),
+                meta={**result.get("meta", {}), "citations": result.get("citations", [])},
+            )
+            yield json.dumps({"index": i, **item.model_dump()}, default=str) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -0,0 +1,367 @@
+"""
+Bulkheads for the upstreams a request depends on (chat, embeddings, MCP).
+
+Each upstream gets its own bulkhead, so a slow one cannot take every
+coroutine in the server down with it:
+
+- AdaptiveLimit: how many calls may be in flight. It grows by about one per
+  `limit` successful calls while the limit is in use. It shrinks by 10% (at
+  most once per round trip) when a call fails, or when latency exceeds
+  `tolerance` x the baseline (the fastest recent call).
+- Waiting for a slot is bounded by BULKHEAD_MAX_WAIT_S (and the caller's
+  deadline). Past it, Overloaded is raised instead of queueing further.
+- CircuitBreaker: BREAKER_FAILURES consecutive upstream failures open it.
+  Failures are transport errors, 429/5xx responses and calls cut off by the
+  request deadline while waiting on the upstream; bad requests and (for MCP)
+  errors raised by the tool itself don't count.
+  Calls then fail fast with CircuitOpen for BREAKER_OPEN_S. After that one
+  probe is let through; its outcome closes or re-opens the breaker.
+
+shed_load() is the admission check for /chat: new requests are turned away
+(429 + Retry-After) while queued upstream calls already wait longer than
+SHED_QUEUE_WAIT_MS, instead of all of them timing out later.
+
+All state is per process and touched only from the event loop (no locks).
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Deque, Dict, Iterable, Optional, Tuple
+
+import httpx
+import structlog
+
+from app.core.config import (
+    BREAKER_FAILURES,
+    BREAKER_OPEN_S,
+    BULKHEAD_MAX_WAIT_S,
+    CHAT_CONCURRENCY,
+    EMBED_CONCURRENCY,
+    MCP_CONCURRENCY,
+    SHED_QUEUE_WAIT_MS,
+)
+from app.core.deadline import DeadlineExceeded, remaining
+from app.core.metrics import UPSTREAM_REJECTED, Gauge
+
+log = structlog.get_logger()
+
+
+class UpstreamUnavailable(RuntimeError):
+    """The call was not made; retry after `retry_after_s`."""
+
+    status_code = 503
+
+    def __init__(self, upstream: str, reason: str, retry_after_s: float) -> None:
+        super().__init__(f"{upstream} upstream {reason}")
+        self.upstream = upstream
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+
+    @property
+    def retry_after(self) -> str:
+        """Retry-After header value (whole seconds, at least 1)."""
+        return str(max(1, math.ceil(self.retry_after_s)))
+
+
+class CircuitOpen(UpstreamUnavailable):
+    status_code = 503
+
+
+class Overloaded(UpstreamUnavailable):
+    status_code = 429
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    """
+    For the OpenAI upstreams (chat, embeddings): connection errors, timeouts
+    and 429/5xx responses. Bad requests and local bugs inside the slot
+    (KeyError, ValueError, ...) say nothing about the upstream's health.
+    """
+    if isinstance(exc, DeadlineExceeded):
+        return exc.in_flight
+    import openai  # already loaded by whoever made the call
+
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code == 429 or exc.status_code >= 500
+    return isinstance(exc, (openai.APIConnectionError, openai.APITimeoutError, httpx.TransportError))
+
+
+def is_transport_failure(exc: BaseException) -> bool:
+    """
+    For MCP, where tool errors, protocol errors and bad arguments also arrive
+    as exceptions: only transport errors, 429/5xx responses and timeouts count.
+    """
+    if isinstance(exc, BaseExceptionGroup):  # raised out of the MCP client's task group
+        return any(is_transport_failure(e) for e in exc.exceptions)
+    if isinstance(exc, DeadlineExceeded):
+        return exc.in_flight
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return isinstance(exc, (httpx.TransportError, OSError, TimeoutError))
+
+
+# -------------------------
+# Adaptive concurrency limit
+# -------------------------
+class AdaptiveLimit:
+    def __init__(self, initial: int, min_limit: int = 1, max_limit: Optional[int] = None, tolerance: float = 2.0):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit or 4 * initial
+        self.tolerance = tolerance
+        # Baseline = fastest call in the current or previous window, so it can drift back up
+        self.window_s = 30.0
+        self._min_rtt = (math.inf, math.inf)
+        self._window_start = time.monotonic()
+        self._last_decrease = 0.0
+
+    @property
+    def baseline_s(self) -> float:
+        return min(self._min_rtt)
+
+    def sample(self, rtt_s: float, in_flight: int, dropped: bool = False) -> None:
+        now = time.monotonic()
+        if now - self._window_start >= self.window_s:
+            self._min_rtt = (self._min_rtt[1], math.inf)
+            self._window_start = now
+        self._min_rtt = (self._min_rtt[0], min(self._min_rtt[1], rtt_s))
+
+        baseline = self.baseline_s
+        if dropped or (math.isfinite(baseline) and rtt_s > self.tolerance * baseline):
+            # One decrease per round trip: calls already in flight saw the same congestion
+            if now - self._last_decrease >= max(rtt_s, 0.001):
+                self.limit = max(float(self.min_limit), self.limit * 0.9)
+                self._last_decrease = now
+        elif in_flight >= int(self.limit):
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+
+
+# -------------------------
+# Circuit breaker
+# -------------------------
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failures: int = BREAKER_FAILURES, open_s: float = BREAKER_OPEN_S) -> None:
+        self.failures = failures
+        self.open_s = open_s
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self._probing = False
+
+    def retry_after_s(self) -> float:
+        return max(0.0, self.opened_at + self.open_s - time.monotonic())
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and self.retry_after_s() > 0:
+            return False
+        # Open long enough: let exactly one probe through
+        self.state = self.HALF_OPEN
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def abandon_probe(self) -> None:
+        """The probe never reached the upstream (or was cancelled): let the next call probe."""
+        self._probing = False
+
+    def record(self, ok: bool) -> Optional[str]:
+        """Returns the new state when this outcome changed it."""
+        self._probing = False
+        if ok:
+            self.consecutive_failures = 0
+            if self.state != self.CLOSED:
+                self.state = self.CLOSED
+                return self.CLOSED
+            return None
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failures:
+            was_open = self.state == self.OPEN
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            if not was_open:
+                self.opens += 1
+                return self.OPEN
+        return None
+
+
+# -------------------------
+# Bulkhead
+# -------------------------
+class Bulkhead:
+    def __init__(
+        self,
+        name: str,
+        concurrency: int,
+        tolerance: float = 2.0,
+        max_wait_s: float = BULKHEAD_MAX_WAIT_S,
+        is_failure: Callable[[BaseException], bool] = is_upstream_failure,
+    ) -> None:
+        self.name = name
+        self.limiter = AdaptiveLimit(concurrency, tolerance=tolerance)
+        self.breaker = CircuitBreaker()
+        self.max_wait_s = max_wait_s
+        self.is_failure = is_failure
+        self.in_flight = 0
+        self._waiters: Deque[Tuple[float, asyncio.Future]] = deque()
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self._rtt_ewma = 0.0
+
+    @property
+    def limit(self) -> int:
+        return max(1, int(self.limiter.limit))
+
+    def _prune(self) -> None:
+        # Waiters that gave up (timed out, cancelled) are dropped lazily
+        while self._waiters and self._waiters[0][1].done():
+            self._waiters.popleft()
+
+    def queue_wait_s(self) -> float:
+        """How long the oldest queued call has been waiting."""
+        self._prune()
+        return time.monotonic() - self._waiters[0][0] if self._waiters else 0.0
+
+    def retry_after_s(self) -> float:
+        """Rough time until a new call would get a slot."""
+        if self.breaker.state == CircuitBreaker.OPEN:
+            return self.breaker.retry_after_s()
+        return (len(self._waiters) + 1) / self.limit * max(self._rtt_ewma, 0.1)
+
+    def _reject(self, exc: UpstreamUnavailable) -> UpstreamUnavailable:
+        self.rejected += 1
+        UPSTREAM_REJECTED.inc(upstream=self.name, reason=exc.reason)
+        return exc
+
+    async def _acquire(self, deadline: Optional[float]) -> None:
+        self._prune()
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return
+
+        left = remaining(deadline)
+        wait_s = self.max_wait_s if left is None else min(self.max_wait_s, left)
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append((time.monotonic(), fut))
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), timeout=wait_s)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if fut.done() and not fut.cancelled():
+                self._release()  # the slot was handed over just as we gave up
+            else:
+                fut.cancel()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            if left is not None and left <= self.max_wait_s:
+                raise DeadlineExceeded(f"deadline exceeded waiting for {self.name}") from None
+            raise self._reject(Overloaded(self.name, "overloaded", self.retry_after_s())) from None
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        # Hand freed slots straight to waiters, oldest first
+        while self._waiters and self.in_flight < self.limit:
+            _, fut = self._waiters.popleft()
+            if not fut.done():
+                self.in_flight += 1
+                fut.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, deadline: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        Hold one of the upstream's slots for the duration of the block.
+        Raises CircuitOpen or Overloaded without calling the upstream, or
+        DeadlineExceeded when the deadline passes while waiting.
+        """
+        if not self.breaker.allow():
+            raise self._reject(CircuitOpen(self.name, "circuit_open", self.breaker.retry_after_s()))
+        try:
+            await self._acquire(deadline)
+        except BaseException:
+            self.breaker.abandon_probe()
+            raise
+
+        start = time.monotonic()
+        failed: Optional[BaseException] = None
+        try:
+            yield
+        except BaseException as e:
+            failed = e
+            raise
+        finally:
+            rtt = time.monotonic() - start
+            upstream_failure = failed is not None and self.is_failure(failed)
+            self.calls += 1
+            self._rtt_ewma = rtt if self._rtt_ewma == 0.0 else 0.9 * self._rtt_ewma + 0.1 * rtt
+            self.limiter.sample(rtt, self.in_flight, dropped=upstream_failure)
+            if upstream_failure:
+                self.failures += 1
+            # Cancellation and our own deadlines say nothing about the upstream's health
+            if failed is None or upstream_failure:
+                changed = self.breaker.record(ok=not upstream_failure)
+                if changed is not None:
+                    log.warning("upstream_circuit", upstream=self.name, state=changed, error=repr(failed))
+            else:
+                self.breaker.abandon_probe()
+            self._release()
+
+    def stats(self) -> dict:
+        baseline = self.limiter.baseline_s
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "queue_wait_ms": round(self.queue_wait_s() * 1000.0, 1),
+            "baseline_ms": round(baseline * 1000.0, 1) if math.isfinite(baseline) else None,
+            "breaker": self.breaker.state,
+            "breaker_opens": self.breaker.opens,
+            "calls": self.calls,
+            "failures": self.failures,
+            "rejected": self.rejected,
+        }
+
+
+# Chat latency follows output length (a rerank vs. a full answer), hence the wider tolerance
+bulkheads: Dict[str, Bulkhead] = {
+    "chat": Bulkhead("chat", CHAT_CONCURRENCY, tolerance=5.0),
+    "embeddings": Bulkhead("embeddings", EMBED_CONCURRENCY),
+    "mcp": Bulkhead("mcp", MCP_CONCURRENCY, is_failure=is_transport_failure),
+}
+
+
+def shed_load(upstreams: Iterable[str] = ("chat", "embeddings")) -> Optional[UpstreamUnavailable]:
+    """The reason to turn a new /chat request away now, or None to admit it."""
+    for name in upstreams:
+        b = bulkheads[name]
+        if b.breaker.state == CircuitBreaker.OPEN and b.breaker.retry_after_s() > 0:
+            return CircuitOpen(name, "circuit_open", b.breaker.retry_after_s())
+        if b.queue_wait_s() * 1000.0 > SHED_QUEUE_WAIT_MS:
+            return Overloaded(name, "overloaded", b.retry_after_s())
+    return None
+
+
+_STATES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+
+def _bulkhead_gauge():
+    for name, b in bulkheads.items():
+        for stat, value in b.stats().items():
+            if stat == "breaker":
+                value = _STATES[value]
+            if value is not None:
+                yield (name, stat), value
+
+
+Gauge(
+    "upstream_bulkhead",
+    "Per-upstream concurrency limit, queue and circuit breaker (breaker: 0 closed, 1 half-open, 2 open).",
+    ["upstream", "stat"],
+    _bulkhead_gauge,
+)
@@ -0,0 +1,174 @@
+"""
+Process-wide OpenAI clients.
+
+Everything that talks to OpenAI (chat, rerank, embeddings, index builds) goes
+through these two clients so TCP/TLS connections are pooled and reused.
+They are created in the app lifespan via init_clients(); scripts that never
+run the lifespan get them lazily on first use.
+"""
+from typing import TYPE_CHECKING, Optional
+
+import httpx
+
+from app.core.metrics import Gauge
+from app.core.config import (
+    OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+    OPENAI_TIMEOUT_S,
+    OPENAI_CONNECT_TIMEOUT_S,
+    OPENAI_MAX_RETRIES,
+    OPENAI_MAX_CONNECTIONS,
+    OPENAI_MAX_KEEPALIVE,
+    OPENAI_KEEPALIVE_EXPIRY_S,
+)
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
+
+
+class PoolStats:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+        }
+
+
+async_stats = PoolStats()
+sync_stats = PoolStats()
+
+
+class _CountingAsyncTransport(httpx.AsyncHTTPTransport):
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        async_stats.requests += 1
+        async_stats.in_flight += 1
+        async_stats.peak_in_flight = max(async_stats.peak_in_flight, async_stats.in_flight)
+        try:
+            return await super().handle_async_request(request)
+        except Exception:
+            async_stats.errors += 1
+            raise
+        finally:
+            async_stats.in_flight -= 1
+
+
+class _CountingTransport(httpx.HTTPTransport):
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        sync_stats.requests += 1
+        sync_stats.in_flight += 1
+        sync_stats.peak_in_flight = max(sync_stats.peak_in_flight, sync_stats.in_flight)
+        try:
+            return super().handle_request(request)
+        except Exception:
+            sync_stats.errors += 1
+            raise
+        finally:
+            sync_stats.in_flight -= 1
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY_S,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(OPENAI_TIMEOUT_S, connect=OPENAI_CONNECT_TIMEOUT_S)
+
+
+_async_transport: Optional[_CountingAsyncTransport] = None
+_sync_transport: Optional[_CountingTransport] = None
+_async_client: Optional["AsyncOpenAI"] = None
+_sync_client: Optional["OpenAI"] = None
+_llm = None
+
+
+def get_async_openai() -> "AsyncOpenAI":
+    global _async_client, _async_transport
+    if _async_client is None:
+        from openai import AsyncOpenAI
+
+        _async_transport = _CountingAsyncTransport(limits=_limits())
+        _async_client = AsyncOpenAI(
+            api_key=OPENAI_API_KEY,
+            base_url=OPENAI_BASE_URL,
+            timeout=_timeout(),
+            # The SDK retries 408/409/429/5xx and connection errors with
+            # exponential backoff plus jitter.
+            max_retries=OPENAI_MAX_RETRIES,
+            http_client=httpx.AsyncClient(transport=_async_transport, timeout=_timeout()),
+        )
+    return _async_client
+
+
+def get_openai() -> "OpenAI":
+    global _sync_client, _sync_transport
+    if _sync_client is None:
+        from openai import OpenAI
+
+        _sync_transport = _CountingTransport(limits=_limits())
+        _sync_client = OpenAI(
+            api_key=OPENAI_API_KEY,
+            base_url=OPENAI_BASE_URL,
+            timeout=_timeout(),
+            max_retries=OPENAI_MAX_RETRIES,
+            http_client=httpx.Client(transport=_sync_transport, timeout=_timeout()),
+        )
+    return _sync_client
+
+
+def get_llm():
+    """Shared LLMClient (raises ValueError if OPENAI_API_KEY is missing)."""
+    global _llm
+    if _llm is None:
+        from app.core.llm_client import LLMClient
+
+        _llm = LLMClient()
+    return _llm
+
+
+def init_clients() -> None:
+    get_async_openai()
+    get_openai()
+
+
+async def close_clients() -> None:
+    global _async_client, _sync_client, _async_transport, _sync_transport, _llm
+    if _async_client is not None:
+        await _async_client.close()
+    if _sync_client is not None:
+        _sync_client.close()
+    _async_client = _sync_client = _async_transport = _sync_transport = _llm = None
+
+
+def _open_connections(transport) -> int:
+    pool = getattr(transport, "_pool", None)
+    return len(getattr(pool, "connections", [])) if pool is not None else 0
+
+
+def pool_stats() -> dict:
+    return {
+        "async": {**async_stats.as_dict(), "open_connections": _open_connections(_async_transport)},
+        "sync": {**sync_stats.as_dict(), "open_connections": _open_connections(_sync_transport)},
+        "max_connections": OPENAI_MAX_CONNECTIONS,
+        "max_keepalive": OPENAI_MAX_KEEPALIVE,
+    }
+
+
+def _pool_gauge():
+    for client in ("async", "sync"):
+        for stat, value in pool_stats()[client].items():
+            yield (client, stat), value
+
+
+Gauge("openai_http_pool", "OpenAI HTTP client pool usage.", ["client", "stat"], _pool_gauge)
@@ -6,13 +6,132 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 OPENAI_EMBED_MODEL = os.getenv("OPENAI_EMBED_MODEL", "text-embedding-3-small")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None  # e.g. a local fake server for benchmarks
+
+# Shared OpenAI HTTP clients (app/core/clients.py)
+OPENAI_TIMEOUT_S = float(os.getenv("OPENAI_TIMEOUT_S", "30"))
+OPENAI_CONNECT_TIMEOUT_S = float(os.getenv("OPENAI_CONNECT_TIMEOUT_S", "5"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "20"))
+OPENAI_KEEPALIVE_EXPIRY_S = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY_S", "30"))
+
+# Upstream bulkheads (app/core/bulkhead.py): starting concurrency per upstream
+# (adapts between 1 and 4x), the longest a call waits for a slot, and the
+# circuit breaker (consecutive failures to open, seconds to stay open).
+CHAT_CONCURRENCY = int(os.getenv("CHAT_CONCURRENCY", "32"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "8"))
+MCP_CONCURRENCY = int(os.getenv("MCP_CONCURRENCY", "16"))
+BULKHEAD_MAX_WAIT_S = float(os.getenv("BULKHEAD_MAX_WAIT_S", "5"))
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_OPEN_S = float(os.getenv("BREAKER_OPEN_S", "10"))
+# /chat answers 429 + Retry-After while queued upstream calls have waited longer than this
+SHED_QUEUE_WAIT_MS = float(os.getenv("SHED_QUEUE_WAIT_MS", "1000"))
 # RAG tuning knobs (start values)
 CHUNK_SIZE = 900
 CHUNK_OVERLAP = 150
+# Token-based sizing used by the index build (tokens of the embedding model's encoding)
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "220"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "40"))
 
 TOP_K = 6
 MIN_SCORE = 0.25 
 
 RETRIEVE_K = 15
 RERANK_TOP_N = 5
-MIN_SCORE = 0.25 # increase to be stricter (0.30-0.40), decrease for more recall (0.15-0.25)
\ No newline at end of file
+MIN_SCORE = 0.25 # increase to be stricter (0.30-0.40), decrease for more recall (0.15-0.25)
+
+# MMR between MIN_SCORE and the reranker: keep MMR_K diverse candidates (0 = off).
+# MMR_LAMBDA 1.0 is pure relevance; lower values penalize near-duplicate chunks harder.
+MMR_K = int(os.getenv("MMR_K", "8"))
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+
+# Query embedding micro-batching: wait at most this long to fill a batch
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "64"))
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "5"))
+
+# /chat/batch
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "1000"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+# Per-request deadlines (override per request with the x-request-timeout-ms header)
+REQUEST_TIMEOUT_S = float(os.getenv("REQUEST_TIMEOUT_S", "20"))
+MAX_REQUEST_TIMEOUT_S = float(os.getenv("MAX_REQUEST_TIMEOUT_S", "60"))
+RERANK_MIN_BUDGET_S = float(os.getenv("RERANK_MIN_BUDGET_S", "6"))   # skip LLM rerank below this
+ANSWER_MIN_BUDGET_S = float(os.getenv("ANSWER_MIN_BUDGET_S", "3"))   # time kept back for the final answer
+
+# Tracing: per-node spans go to the structured log; set TRACE_EXPORT_PATH to also
+# append OTLP/JSON traces to a file for an OpenTelemetry collector. The file is
+# written by a background thread; traces beyond TRACE_EXPORT_QUEUE_SIZE pending
+# are dropped (and counted) rather than slowing requests.
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "ai-engineer-capstone")
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")
+TRACE_EXPORT_QUEUE_SIZE = int(os.getenv("TRACE_EXPORT_QUEUE_SIZE", "1000"))
+
+# /metrics: with several workers, set METRICS_DIR so each live worker's snapshot
+# (written every METRICS_FLUSH_S, removed on shutdown) is merged into every scrape.
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_FLUSH_S = float(os.getenv("METRICS_FLUSH_S", "5"))
+
+# Logging: records go through a bounded queue to a writer thread.
+# LOG_SAMPLE_RATES="event=rate,..." keeps that fraction of info-level events
+# (by default the per-request trace, qa_complete and chat_success lines).
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_SAMPLE_RATES = {
+    name.strip(): float(rate)
+    for name, rate in (
+        pair.split("=", 1)
+        for pair in os.getenv("LOG_SAMPLE_RATES", "trace=0.1,qa_complete=0.1,chat_success=0.1").split(",")
+        if "=" in pair
+    )
+}
+
+# Document extraction (app/rag/loader.py)
+EXTRACT_CACHE_DIR = os.getenv("EXTRACT_CACHE_DIR", ".cache/extract")
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "20"))
+
+# Streaming index build (app/rag/pipeline.py): chunks per embeddings call, and
+# how many batches between checkpoints of the build progress.
+INDEX_BATCH_SIZE = int(os.getenv("INDEX_BATCH_SIZE", "256"))
+INDEX_CHECKPOINT_EVERY = int(os.getenv("INDEX_CHECKPOINT_EVERY", "20"))
+
+# Startup and shutdown (app/main.py, app/core/lifecycle.py). WARMUP_QUERIES
+# ("|"-separated, empty disables) are embedded and searched before a worker
+# reports ready. After SIGTERM, /ready answers 503 for DRAIN_DELAY_S while
+# requests are still served; then in-flight requests get GRACEFUL_SHUTDOWN_S.
+WARMUP_QUERIES = [
+    q.strip()
+    for q in os.getenv(
+        "WARMUP_QUERIES",
+        "What are my key skills?|How does the on-call escalation work?|What companies have I worked for?",
+    ).split("|")
+    if q.strip()
+]
+DRAIN_DELAY_S = float(os.getenv("DRAIN_DELAY_S", "0"))
+GRACEFUL_SHUTDOWN_S = float(os.getenv("GRACEFUL_SHUTDOWN_S", "30"))
+
+# Where the app finds its FAISS store and MCP tools (the MCP server is mounted on the app at /mcp)
+RAG_STORE_DIR = os.getenv("RAG_STORE_DIR", "rag_store")
+MCP_URL = os.getenv("MCP_URL", "http://127.0.0.1:8000/mcp")
+
+# Per-client /chat rate limit (requests per window)
+CHAT_RATE_LIMIT = int(os.getenv("CHAT_RATE_LIMIT", "2"))
+CHAT_RATE_WINDOW_S = int(os.getenv("CHAT_RATE_WINDOW_S", "60"))
+
+# Named collections: "default" is RAG_STORE_DIR, any other name lives in
+# COLLECTIONS_DIR/<name>. Loaded on first query, LRU-evicted above the budget.
+DEFAULT_COLLECTION = "default"
+COLLECTIONS_DIR = os.getenv("COLLECTIONS_DIR", "rag_collections")
+STORE_MEMORY_BUDGET_MB = float(os.getenv("STORE_MEMORY_BUDGET_MB", "1024"))
+# Versioned rebuilds (app/rag/rebuild.py): finished versions kept per collection
+KEEP_VERSIONS = int(os.getenv("KEEP_VERSIONS", "2"))
+# /admin endpoints need x-admin-token: ADMIN_TOKEN; without one they are disabled
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Index storage (app/rag/quantize.py): flat | fp16 | sq8 | binary. Compact layouts
+# search RESCORE_FACTOR * k candidates, then re-score them exactly.
+# EMBED_DIMENSIONS > 0 asks text-embedding-3 models for shortened vectors.
+INDEX_STORAGE = os.getenv("INDEX_STORAGE", "flat")
+RESCORE_FACTOR = int(os.getenv("RESCORE_FACTOR", "4"))
+EMBED_DIMENSIONS = int(os.getenv("EMBED_DIMENSIONS", "0"))
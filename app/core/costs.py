@@ -1,16 +1,20 @@
 MODEL_PRICING = {
     "gpt-4o-mini": {
         "input_per_1k": 0.00015,
+        "cached_input_per_1k": 0.000075,
         "output_per_1k": 0.0006,
     }
 }
 
 
-def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
+    """cached_tokens: the part of prompt_tokens served from the provider's prompt cache."""
     pricing = MODEL_PRICING.get(model)
     if not pricing:
         return 0.0
 
-    input_cost = (prompt_tokens / 1000) * pricing["input_per_1k"]
+    cached = min(cached_tokens, prompt_tokens)
+    input_cost = ((prompt_tokens - cached) / 1000) * pricing["input_per_1k"]
+    cached_cost = (cached / 1000) * pricing.get("cached_input_per_1k", pricing["input_per_1k"])
     output_cost = (completion_tokens / 1000) * pricing["output_per_1k"]
-    return round(input_cost + output_cost, 6)
+    return round(input_cost + cached_cost + output_cost, 6)
@@ -1,10 +1,20 @@
-from sqlalchemy import create_engine, text
+_engine = None
 
-engine = create_engine("sqlite:///./app_logs.db", future=True)
+
+def get_engine():
+    # Created on first use so importing the app doesn't pay for sqlalchemy
+    global _engine
+    if _engine is None:
+        from sqlalchemy import create_engine
+
+        _engine = create_engine("sqlite:///./app_logs.db", future=True)
+    return _engine
 
 
 def init_db():
-    with engine.begin() as conn:
+    from sqlalchemy import text
+
+    with get_engine().begin() as conn:
         conn.execute(text("""
         CREATE TABLE IF NOT EXISTS chat_logs (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
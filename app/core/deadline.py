@@ -0,0 +1,46 @@
+import asyncio
+import time
+from typing import Awaitable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Deadlines are absolute time.monotonic() values carried in QAState["deadline"].
+
+
+class DeadlineExceeded(TimeoutError):
+    # True when a call was cut off while waiting on the upstream (it was too
+    # slow), False when it was never started for lack of budget
+    in_flight = False
+
+
+def deadline_after(timeout_s: float) -> float:
+    return time.monotonic() + timeout_s
+
+
+def remaining(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left, or None when there is no deadline."""
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def has_budget(deadline: Optional[float], needed_s: float) -> bool:
+    left = remaining(deadline)
+    return left is None or left >= needed_s
+
+
+async def with_deadline(aw: Awaitable[T], deadline: Optional[float], what: str = "call") -> T:
+    """Await `aw`, cancelling it and raising DeadlineExceeded once the deadline passes."""
+    left = remaining(deadline)
+    if left is None:
+        return await aw
+    if left <= 0:
+        if asyncio.iscoroutine(aw):
+            aw.close()
+        raise DeadlineExceeded(f"deadline exceeded before {what}")
+    try:
+        return await asyncio.wait_for(aw, timeout=left)
+    except asyncio.TimeoutError:
+        exc = DeadlineExceeded(f"deadline exceeded during {what}")
+        exc.in_flight = True
+        raise exc from None
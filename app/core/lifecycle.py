@@ -0,0 +1,90 @@
+"""
+Worker lifecycle behind /live and /ready.
+
+    starting -> ready -> draining -> stopped
+
+- starting: the lifespan is warming up (store, clients, warmup queries)
+- ready: warmup finished; /ready answers 200
+- draining: SIGTERM received. /ready answers 503 so load balancers stop
+  sending traffic, while requests keep being served for DRAIN_DELAY_S. Then
+  uvicorn's own shutdown runs: it stops accepting and waits up to
+  GRACEFUL_SHUTDOWN_S for in-flight requests.
+- stopped: lifespan shutdown
+
+/live only says the event loop is responsive; it stays 200 while draining so
+the orchestrator doesn't kill a worker that is finishing its requests.
+"""
+import asyncio
+import signal
+import time
+from typing import Dict, Optional
+
+import structlog
+
+log = structlog.get_logger()
+
+STARTING, READY, DRAINING, STOPPED = "starting", "ready", "draining", "stopped"
+
+
+class Lifecycle:
+    def __init__(self) -> None:
+        self.state = STARTING
+        self.started_at = time.time()
+        self.ready_at: Optional[float] = None
+        self.drain_started_at: Optional[float] = None
+        self.in_flight = 0  # HTTP requests, counted by RequestContextMiddleware
+        self.warmup: Dict[str, dict] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    def mark_ready(self) -> None:
+        self.state = READY
+        self.ready_at = time.time()
+        log.info("worker_ready", startup_s=round(self.ready_at - self.started_at, 2), warmup=self.warmup)
+
+    def start_draining(self) -> None:
+        if self.state in (DRAINING, STOPPED):
+            return
+        self.state = DRAINING
+        self.drain_started_at = time.time()
+        log.info("worker_draining", in_flight=self.in_flight)
+
+    def status(self) -> dict:
+        out = {"state": self.state, "in_flight": self.in_flight, "uptime_s": round(time.time() - self.started_at, 1)}
+        if self.ready_at is not None:
+            out["startup_s"] = round(self.ready_at - self.started_at, 2)
+        if self.warmup:
+            out["warmup"] = self.warmup
+        return out
+
+
+lifecycle = Lifecycle()
+
+
+def install_drain_handler(delay_s: float) -> None:
+    """
+    Put a drain period in front of the server's SIGTERM handler (uvicorn's,
+    installed before the lifespan starts). A second SIGTERM skips the wait.
+    """
+    try:
+        previous = signal.getsignal(signal.SIGTERM)
+    except ValueError:  # not the main thread (e.g. an embedded server)
+        return
+    if not callable(previous):
+        return
+    loop = asyncio.get_running_loop()
+
+    def on_sigterm(sig, frame) -> None:
+        if lifecycle.state == DRAINING or delay_s <= 0:
+            lifecycle.start_draining()
+            previous(sig, frame)
+            return
+        lifecycle.start_draining()
+        loop.call_soon_threadsafe(loop.call_later, delay_s, previous, sig, None)
+
+    try:
+        signal.signal(signal.SIGTERM, on_sigterm)
+    except ValueError:
+        pass
@@ -1,23 +1,49 @@
 import json
 import time
-from typing import Any
-import uuid
+from typing import TYPE_CHECKING, Any, Optional
 
-from openai import AsyncOpenAI
 from app.core.config import OPENAI_API_KEY, OPENAI_MODEL
+from app.core.bulkhead import UpstreamUnavailable, bulkheads
+from app.core.clients import get_async_openai
+from app.core.deadline import DeadlineExceeded, with_deadline
+from app.core.tracing import span
+from app.core.metrics import LLM_TOKENS, LLM_COST
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 from app.core.tool_client import ToolClient
 from pydantic import ValidationError
-from app.core.tool_schemas import AddArgs, MultiplyArgs
+from app.core.tool_schemas import (
+    MAX_ARRAY_LEN, AddArgs, DotArgs, ElementwiseArgs, MultiplyArgs, ProductArgs, SumArgs,
+)
 import hashlib
 from app.core.tool_log_repo import insert_tool_log
 
-import time
 from app.core.costs import estimate_cost
 from app.core.budget import add_cost
 
-ALLOWED_TOOLS = {"add","multiply"}
+# Tool name -> argument schema, checked before any call reaches MCP
+TOOL_ARGS = {
+    "add": AddArgs,
+    "multiply": MultiplyArgs,
+    "sum": SumArgs,
+    "product": ProductArgs,
+    "dot": DotArgs,
+    "elementwise": ElementwiseArgs,
+}
+ALLOWED_TOOLS = set(TOOL_ARGS)
 MAX_TOOL_CALLS_PER_REQUEST = 5
 
+# Prompt caching: providers reuse a byte-identical prompt prefix (tools, then
+# messages in order). Keep TOOLS and every system prompt constant and put
+# anything request-specific in the user message, after them.
+DEFAULT_SYSTEM = (
+    "You are a helpful assistant. Use tools for exact math. "
+    "For a list of numbers, call sum, product, dot or elementwise once with the whole list."
+)
+
+_INT_ARRAY = {"type": "array", "items": {"type": "integer"}, "minItems": 1, "maxItems": MAX_ARRAY_LEN}
+
 
 # Define the tools your LLM is allowed to call
 TOOLS = [
@@ -51,8 +77,75 @@ TOOLS = [
             },
         },
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "sum",
+            "description": "Sum a list of integers in one call.",
+            "parameters": {
+                "type": "object",
+                "properties": {"values": _INT_ARRAY},
+                "required": ["values"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "product",
+            "description": "Multiply a list of integers together in one call.",
+            "parameters": {
+                "type": "object",
+                "properties": {"values": _INT_ARRAY},
+                "required": ["values"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "dot",
+            "description": "Dot product of two integer lists of the same length.",
+            "parameters": {
+                "type": "object",
+                "properties": {"a": _INT_ARRAY, "b": _INT_ARRAY},
+                "required": ["a", "b"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "elementwise",
+            "description": "Add, subtract or multiply two integer lists of the same length pairwise.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "op": {"type": "string", "enum": ["add", "subtract", "multiply"]},
+                    "a": _INT_ARRAY,
+                    "b": _INT_ARRAY,
+                },
+                "required": ["op", "a", "b"],
+            },
+        },
+    },
 ]
 
+def cached_tokens(usage) -> int:
+    """usage.prompt_tokens_details.cached_tokens, 0 when the provider doesn't report it."""
+    details = getattr(usage, "prompt_tokens_details", None)
+    return (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+
+def valid_tool_output(tool_name: str, output: str) -> bool:
+    stripped = output.strip()
+    if tool_name != "elementwise":
+        return stripped.lstrip("-").isdigit()
+    try:
+        values = json.loads(stripped)
+    except ValueError:
+        return False
+    return isinstance(values, list) and all(isinstance(v, int) for v in values)
+
 def hash_args(args: dict) -> str:
     raw = json.dumps(args, sort_keys=True).encode("utf-8")
     return hashlib.sha256(raw).hexdigest()
@@ -61,33 +154,109 @@ class LLMClient:
     def __init__(self) -> None:
         if not OPENAI_API_KEY:
             raise ValueError("OPENAI_API_KEY is missing. Put it in .env")
-        self.client = AsyncOpenAI(api_key=OPENAI_API_KEY)
         self.tool_client = ToolClient()
 
-    async def chat_with_tools(self, user_message: str, request_id: str) -> tuple[str, dict]:
+    @property
+    def client(self) -> "AsyncOpenAI":
+        return get_async_openai()
+
+    async def chat_with_tools(
+        self,
+        user_message: str,
+        request_id: str,
+        deadline: Optional[float] = None,
+        system: str = DEFAULT_SYSTEM,
+        cache_key: Optional[str] = None,
+    ) -> tuple[str, dict]:
         """
         LLM decides if tool call is needed. If yes:
         - execute tool via MCP
         - return tool result back to LLM
         - LLM produces final answer
+
+        deadline: absolute time.monotonic() bound for every model and tool call.
+        Raises DeadlineExceeded, except when tools already ran: then the last
+        tool output is returned as a partial answer. Raises UpstreamUnavailable
+        when the chat bulkhead refuses the call (circuit open, overloaded).
+
+        A failing tool call (invalid arguments, a tool error, unexpected
+        output) is answered to the model as "Error: ..." so it can recover;
+        it counts toward MAX_TOOL_CALLS_PER_REQUEST and is listed in
+        meta["tool_errors"].
+
+        system: a static prompt (never formatted per request) so the provider
+        can serve it from its prompt cache; cache_key groups requests sharing
+        that prefix (sent as prompt_cache_key). Token counts and cost in the
+        returned meta cover every turn, with cached_tokens priced separately.
         """
         overall_start = time.perf_counter()
         tools_used: list[dict[str, Any]] = []
+        tool_errors: list[dict[str, Any]] = []
         tool_calls_count = 0
+        usage_total = {"prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0, "llm_turns": 0}
+
+        def finish(**extra: Any) -> dict:
+            # Every return path records what was spent, including partial and give-up answers
+            cost = estimate_cost(
+                OPENAI_MODEL,
+                usage_total["prompt_tokens"],
+                usage_total["completion_tokens"],
+                cached_tokens=usage_total["cached_tokens"],
+            )
+            total_spent = add_cost(cost)
+            LLM_COST.inc(cost)
+            return {
+                "model": OPENAI_MODEL,
+                "latency_ms": round((time.perf_counter() - overall_start) * 1000.0, 2),
+                "cost_estimate_usd": cost,
+                "tools_used": tools_used,
+                "total_session_cost": total_spent,
+                **usage_total,
+                "total_tokens": usage_total["prompt_tokens"] + usage_total["completion_tokens"],
+                **({"tool_errors": tool_errors} if tool_errors else {}),
+                **extra,
+            }
 
         messages: list[dict[str, Any]] = [
-            {"role": "system", "content": "You are a helpful assistant. Use tools for exact math."},
+            {"role": "system", "content": system},
             {"role": "user", "content": user_message},
         ]
 
         # loop in case model calls multiple tools
         for _ in range(5):
-            resp = await self.client.chat.completions.create(
-                model=OPENAI_MODEL,
-                messages=messages,
-                tools=TOOLS,
-                tool_choice="auto",
-            )
+            try:
+                with span("llm_turn", model=OPENAI_MODEL) as attrs:
+                    async with bulkheads["chat"].slot(deadline):
+                        resp = await with_deadline(
+                            self.client.chat.completions.create(
+                                model=OPENAI_MODEL,
+                                messages=messages,
+                                tools=TOOLS,
+                                tool_choice="auto",
+                                **({"prompt_cache_key": cache_key} if cache_key else {}),
+                            ),
+                            deadline,
+                            "chat completion",
+                        )
+                    usage_total["llm_turns"] += 1
+                    if resp.usage:
+                        cached = cached_tokens(resp.usage)
+                        attrs["prompt_tokens"] = resp.usage.prompt_tokens
+                        attrs["completion_tokens"] = resp.usage.completion_tokens
+                        attrs["cached_tokens"] = cached
+                        usage_total["prompt_tokens"] += resp.usage.prompt_tokens
+                        usage_total["completion_tokens"] += resp.usage.completion_tokens
+                        usage_total["cached_tokens"] += cached
+                        LLM_TOKENS.inc(resp.usage.prompt_tokens, type="prompt")
+                        LLM_TOKENS.inc(resp.usage.completion_tokens, type="completion")
+                        LLM_TOKENS.inc(cached, type="cached_prompt")
+            except DeadlineExceeded:
+                if not tools_used:
+                    raise
+                return (
+                    f"(Partial answer, timed out) Result: {tools_used[-1]['output']}",
+                    finish(partial=True, deadline_exceeded=True),
+                )
 
             choice = resp.choices[0]
             msg = choice.message
@@ -95,26 +264,7 @@ class LLMClient:
 
             # If no tool calls, we're done
             if not msg.tool_calls:
-                latency_ms = (time.perf_counter() - overall_start) * 1000.0
-                usage = resp.usage
-                cost = estimate_cost(OPENAI_MODEL, usage.prompt_tokens, usage.completion_tokens)
-                total_spent = add_cost(cost)
-                meta = {
-                    "model": OPENAI_MODEL,
-                    "latency_ms": round(latency_ms, 2),
-                    "cost_estimate_usd": cost,
-                    "tools_used": tools_used,
-                    "total_session_cost": total_spent,
-                }
-                if resp.usage:
-                    meta.update(
-                        {
-                            "prompt_tokens": resp.usage.prompt_tokens,
-                            "completion_tokens": resp.usage.completion_tokens,
-                            "total_tokens": resp.usage.total_tokens,
-                        }
-                    )
-                return (msg.content or "").strip(), meta
+                return (msg.content or "").strip(), finish()
 
             # Model wants to call tools
             messages.append(
@@ -133,34 +283,32 @@ class LLMClient:
                 
                 tool_calls_count += 1
                 if tool_calls_count > MAX_TOOL_CALLS_PER_REQUEST:
-                    raise ValueError(f"Tool calls limit of {MAX_TOOL_CALLS_PER_REQUEST} reached")
+                    # Also where a model retrying a failing tool ends up
+                    return "I couldn't complete the request with tools.", finish(tool_calls_limit=True)
 
                 try:
-                    if tool_name == "add":
-                        validated = AddArgs.model_validate(tool_args)
-                        tool_args = validated.model_dump()
-                    elif tool_name == "multiply":
-                        validated = MultiplyArgs.model_validate(tool_args)
-                        tool_args = validated.model_dump()
-                    else:
-                        raise ValueError(f"Tool {tool_name} is not allowed")
+                    tool_args = TOOL_ARGS[tool_name].model_validate(tool_args).model_dump()
                 except ValidationError as e:
-                    raise ValueError(f"Invalid tool arguments {tool_name}: {e}")
+                    # e.g. a list longer than MAX_ARRAY_LEN: let the model see why and recover
+                    tool_errors.append({"name": tool_name, "error": f"invalid arguments: {e}"})
+                    messages.append(
+                        {"role": "tool", "tool_call_id": tc.id, "content": f"Error: invalid arguments: {e}"}
+                    )
+                    continue
 
                 tool_start = time.perf_counter()
                 args_hash = hash_args(tool_args)
                 tool_latency_ms = None
 
                 try:
-                    tool_output = await self.tool_client.call_tool(tool_name, tool_args)
+                    with span("tool_call", tool=tool_name):
+                        tool_output = await self.tool_client.call_tool(tool_name, tool_args, deadline=deadline)
                     tool_latency_ms = (time.perf_counter() - tool_start) * 1000.0
 
                     # Tool output validation for math tools:
-                    # Should be numeric string
-                    if tool_name in {"add", "multiply"}:
-                        stripped = tool_output.strip()
-                        if not stripped.lstrip("-").isdigit():
-                            raise ValueError(f"Tool returned non-numeric output: {tool_output}")
+                    # an integer, or a JSON array of integers for elementwise
+                    if not valid_tool_output(tool_name, tool_output):
+                        raise ValueError(f"Tool returned non-numeric output: {tool_output}")
 
                     insert_tool_log(
                         request_id=request_id,
@@ -185,13 +333,26 @@ class LLMClient:
                         success=False,
                         error=str(e),
                     )
-                    raise
+                    # Out of time mid-tool: same degradation as a timed-out model turn
+                    if isinstance(e, DeadlineExceeded) and tools_used:
+                        return (
+                            f"(Partial answer, timed out) Result: {tools_used[-1]['output']}",
+                            finish(partial=True, deadline_exceeded=True),
+                        )
+                    if isinstance(e, (DeadlineExceeded, UpstreamUnavailable)):
+                        raise
+                    # A tool error (product out of range, isError from MCP, bad output) goes back
+                    # to the model as the tool result; it still counts toward the tool call limit
+                    tool_errors.append({"name": tool_name, "error": str(e)})
+                    messages.append({"role": "tool", "tool_call_id": tc.id, "content": f"Error: {e}"})
+                    continue
 
                 tools_used.append(
                     {
                         "name": tool_name,
                         "args": tool_args,
                         "tool_latency_ms": round(tool_latency_ms, 2),
+                        "output": tool_output,
                     }
                 )
 
@@ -205,8 +366,4 @@ class LLMClient:
                 )
 
         # Safety fallback
-        latency_ms = (time.perf_counter() - overall_start) * 1000.0
-        return (
-            "I couldn't complete the request with tools.",
-            {"model": OPENAI_MODEL, "latency_ms": round(latency_ms, 2), "tools_used": tools_used},
-        )
+        return "I couldn't complete the request with tools.", finish()
@@ -1,24 +1,99 @@
+import atexit
 import logging
+import logging.handlers
+import queue
+import random
 import sys
+from typing import Dict, List, Optional
+
 import structlog
 
+from app.core.config import LOG_LEVEL, LOG_QUEUE_SIZE, LOG_SAMPLE_RATES
+from app.core.metrics import Counter
+
+try:
+    import orjson
+
+    def _dumps(obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=str).decode("utf-8")
+except ImportError:  # installed with the project; stdlib json is several times slower but works
+    import json
+
+    def _dumps(obj, **kwargs) -> str:
+        return json.dumps(obj, default=str)
+
+
+LOGS_DROPPED = Counter("log_records_dropped_total", "Log records dropped because the log queue was full.")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_root_handlers: List[logging.Handler] = []  # restored when the listener stops
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never block the event loop on a slow sink: drop (and count) when the queue is full."""
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOGS_DROPPED.inc()
+
+
+def _sample(rates: Dict[str, float]):
+    """Keep 1-in-N of high-volume info events; warnings and errors are always kept."""
+
+    def processor(logger, method_name, event_dict):
+        rate = rates.get(event_dict.get("event"))
+        if rate is not None and method_name in ("debug", "info") and random.random() >= rate:
+            raise structlog.DropEvent
+        return event_dict
+
+    return processor
+
 
 def setup_logging():
-    # Basic Python logging config
-    logging.basicConfig(
-        format="%(message)s",
-        stream=sys.stdout,
-        level=logging.INFO,
-    )
+    """Idempotent; the app lifespan calls it again after a previous shutdown_logging()."""
+    global _listener, _root_handlers
+    level = getattr(logging, LOG_LEVEL.upper(), logging.INFO)
+
+    # Python logging: callers only enqueue; a listener thread writes to stdout.
+    if _listener is None:
+        log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(logging.Formatter("%(message)s"))
+        _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=False)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+        root = logging.getLogger()
+        _root_handlers = root.handlers
+        root.handlers = [_DroppingQueueHandler(log_queue)]
+        root.setLevel(level)
 
     # Configure structlog for JSON logs
     structlog.configure(
         processors=[
+            _sample(LOG_SAMPLE_RATES),
+            # request_id bound by RequestContextMiddleware
+            structlog.contextvars.merge_contextvars,
             structlog.processors.add_log_level,
             structlog.processors.TimeStamper(fmt="iso"),
-            structlog.processors.JSONRenderer(),
+            structlog.processors.JSONRenderer(serializer=_dumps),
         ],
-        wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
+        wrapper_class=structlog.make_filtering_bound_logger(level),
         logger_factory=structlog.stdlib.LoggerFactory(),
         cache_logger_on_first_use=True,
     )
+
+
+def shutdown_logging():
+    """
+    Flush queued records (called on app shutdown and at exit) and put the
+    previous root handlers back: nothing drains the queue after this.
+    """
+    global _listener, _root_handlers
+    if _listener is not None:
+        logging.getLogger().handlers = _root_handlers
+        _root_handlers = []
+        _listener.stop()
+        _listener = None
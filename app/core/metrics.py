@@ -0,0 +1,224 @@
+import bisect
+import json
+import os
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from app.core.config import METRICS_DIR
+
+# In-process Prometheus-style metrics.
+# Updates are plain dict/list operations on the event loop thread (no locks);
+# the cost per observation is a dict lookup plus a bisect.
+# With several uvicorn workers, each worker periodically writes a snapshot to
+# METRICS_DIR and /metrics merges the snapshots of live workers: counters and
+# histograms are summed, gauges are reported per worker (a `worker` label).
+# A worker removes its snapshot on shutdown, so like any Prometheus counter
+# the totals reset when workers restart.
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_REGISTRY: Dict[str, "Metric"] = {}
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        _REGISTRY[name] = self
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def snapshot(self) -> List[list]:
+        return [[list(k), v] for k, v in self.values.items()]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self.values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        v = self.values.get(key)
+        if v is None:
+            v = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        v[0][bisect.bisect_left(self.buckets, value)] += 1
+        v[1] += value
+        v[2] += 1
+
+    def snapshot(self) -> List[list]:
+        return [[list(k), v[0], v[1], v[2]] for k, v in self.values.items()]
+
+
+class Gauge(Metric):
+    """Read at scrape time from `fn`, which yields (label values, value) pairs."""
+
+    kind = "gauge"
+
+    def __init__(
+        self, name: str, help: str, labelnames: Sequence[str], fn: Callable[[], Iterable[Tuple[LabelValues, float]]]
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+
+    def snapshot(self) -> List[list]:
+        return [[list(k), float(v)] for k, v in self.fn()]
+
+
+# -------------------------
+# Metric definitions
+# -------------------------
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency.", ["method", "path", "status"])
+SPAN_LATENCY = Histogram("qa_span_duration_seconds", "QA pipeline step latency (embed, faiss_search, llm_turn, ...).", ["span"])
+QA_REQUESTS = Counter("qa_requests_total", "Completed QA graph executions by route.", ["route"])
+LLM_TOKENS = Counter("llm_tokens_total", "OpenAI chat tokens.", ["type"])
+LLM_COST = Counter("llm_cost_usd_total", "Estimated OpenAI chat cost in USD.")
+RATE_LIMITED = Counter("rate_limited_total", "Requests rejected by the rate limiter.", ["endpoint"])
+GUARDRAIL_BLOCKS = Counter("guardrail_blocks_total", "Requests blocked by input guardrails.")
+MMR_TOKENS_SAVED = Counter("mmr_tokens_saved_total", "Rerank prompt tokens avoided by dropping redundant candidates.")
+UPSTREAM_REJECTED = Counter(
+    "upstream_rejected_total", "Upstream calls refused by their bulkhead without being sent.", ["upstream", "reason"]
+)
+LOAD_SHED = Counter(
+    "load_shed_total", "Requests turned away with 429/503 because an upstream is saturated.", ["endpoint", "reason"]
+)
+TOOL_FALLBACKS = Counter("tool_fallbacks_total", "MCP tool calls answered by the local fallback.", ["tool", "reason"])
+
+
+# -------------------------
+# Snapshots + multi-worker merge
+# -------------------------
+def snapshot() -> dict:
+    return {name: {"kind": m.kind, "values": m.snapshot()} for name, m in _REGISTRY.items()}
+
+
+def write_snapshot() -> None:
+    """Persist this worker's metrics for /metrics in other workers (no-op without METRICS_DIR)."""
+    if not METRICS_DIR:
+        return
+    d = Path(METRICS_DIR)
+    d.mkdir(parents=True, exist_ok=True)
+    tmp = d / f"{os.getpid()}.json.tmp"
+    tmp.write_text(json.dumps(snapshot()), encoding="utf-8")
+    os.replace(tmp, d / f"{os.getpid()}.json")
+
+
+def remove_snapshot() -> None:
+    """Drop this worker's snapshot on shutdown, so its numbers aren't merged after it is gone."""
+    if METRICS_DIR:
+        (Path(METRICS_DIR) / f"{os.getpid()}.json").unlink(missing_ok=True)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # exists, owned by someone else
+        return True
+    return True
+
+
+def _per_worker(data: dict, pid: int) -> dict:
+    """Gauges are point-in-time per process: tag rows with the worker instead of summing them."""
+    if data["kind"] != "gauge":
+        return data
+    return {**data, "values": [[row[0], row[1], str(pid)] for row in data["values"]]}
+
+
+def _merged() -> dict:
+    merged = snapshot()
+    if not METRICS_DIR or not Path(METRICS_DIR).exists():
+        return merged
+
+    merged = {name: _per_worker(data, os.getpid()) for name, data in merged.items()}
+    for f in Path(METRICS_DIR).glob("*.json"):
+        if not f.stem.isdigit() or int(f.stem) == os.getpid():
+            continue
+        if not _alive(int(f.stem)):  # a worker that died without removing its snapshot
+            f.unlink(missing_ok=True)
+            continue
+        try:
+            other = json.loads(f.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        for name, data in other.items():
+            data = _per_worker(data, int(f.stem))
+            if name not in merged:
+                merged[name] = data
+                continue
+            if data["kind"] == "gauge":
+                merged[name]["values"] = merged[name]["values"] + data["values"]
+                continue
+            mine = {tuple(row[0]): row for row in merged[name]["values"]}
+            for row in data["values"]:
+                key = tuple(row[0])
+                if key not in mine:
+                    mine[key] = row
+                elif data["kind"] == "histogram":
+                    a = mine[key]
+                    mine[key] = [row[0], [x + y for x, y in zip(a[1], row[1])], a[2] + row[2], a[3] + row[3]]
+                else:
+                    mine[key] = [row[0], mine[key][1] + row[1]]
+            merged[name]["values"] = list(mine.values())
+    return merged
+
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render() -> str:
+    """Prometheus text exposition format (0.0.4)."""
+    lines: List[str] = []
+    for name, data in _merged().items():
+        metric = _REGISTRY.get(name)
+        if metric is None:
+            continue
+        lines.append(f"# HELP {name} {metric.help}")
+        lines.append(f"# TYPE {name} {data['kind']}")
+        for row in data["values"]:
+            labels = row[0]
+            if data["kind"] == "histogram":
+                cumulative = 0
+                for bound, count in zip(list(metric.buckets) + ["+Inf"], row[1]):
+                    cumulative += count
+                    le = 'le="%s"' % bound
+                    lines.append(f"{name}_bucket{_fmt_labels(metric.labelnames, labels, le)} {cumulative}")
+                lines.append(f"{name}_sum{_fmt_labels(metric.labelnames, labels)} {row[2]}")
+                lines.append(f"{name}_count{_fmt_labels(metric.labelnames, labels)} {row[3]}")
+            else:
+                worker = f'worker="{row[2]}"' if len(row) > 2 else ""
+                lines.append(f"{name}{_fmt_labels(metric.labelnames, labels, worker)} {row[1]}")
+    return "\n".join(lines) + "\n"
@@ -1,25 +1,86 @@
+import contextvars
 import time
 import uuid
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
+from typing import Optional
 
+import structlog
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.lifecycle import lifecycle
+from app.core.metrics import HTTP_LATENCY
+
+# Set for the lifetime of each HTTP request (see current_request_id()).
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+request_start_var: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_start", default=None)
+
+
+def current_request_id() -> Optional[str]:
+    return request_id_var.get()
 
-class RequestContextMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        request_id = request.headers.get("x-request-id") or str(uuid.uuid4())
-        start = time.perf_counter()
 
-        response: Response = await call_next(request)
+class RequestContextMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware task/body buffering):
+    - assigns request id + start time before the app runs, in request.state
+      and in contextvars (picked up by structlog and DB writes)
+    - adds x-request-id / x-latency-ms headers as the response starts, so
+      streaming responses pass through untouched. x-latency-ms is therefore
+      time to first byte.
+    - counts in-flight requests for /ready and graceful drain
+    """
 
-        latency_ms = (time.perf_counter() - start) * 1000.0
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        request_id = request_id or str(uuid.uuid4())
+        start = time.perf_counter()
 
         # Store in request.state for later use
-        request.state.request_id = request_id
-        request.state.latency_ms = round(latency_ms, 2)
+        state = scope.setdefault("state", {})
+        state["request_id"] = request_id
+        state["start_time"] = start
+
+        rid_token = request_id_var.set(request_id)
+        start_token = request_start_var.set(start)
+        structlog.contextvars.bind_contextvars(request_id=request_id)
+
+        status_code = 500
+        lifecycle.in_flight += 1
 
-        # Send back to client as headers
-        response.headers["x-request-id"] = request_id
-        response.headers["x-latency-ms"] = str(round(latency_ms, 2))
+        async def send_with_headers(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                latency_ms = (time.perf_counter() - start) * 1000.0
+                # Send back to client as headers
+                headers = MutableHeaders(scope=message)
+                headers["x-request-id"] = request_id
+                headers["x-latency-ms"] = str(round(latency_ms, 2))
+            await send(message)
 
-        return response
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            lifecycle.in_flight -= 1
+            # Templated path ("/chat") keeps label cardinality bounded
+            route = scope.get("route")
+            HTTP_LATENCY.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                path=getattr(route, "path", "unmatched"),
+                status=str(status_code),
+            )
+            structlog.contextvars.unbind_contextvars("request_id")
+            request_start_var.reset(start_token)
+            request_id_var.reset(rid_token)
@@ -0,0 +1,54 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution.
+    The first caller (leader) starts the work; callers arriving while it is
+    in flight await the same result instead of starting their own.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    async def do(
+        self, key: Hashable, fn: Callable[[], Awaitable[Any]], timeout: Optional[float] = None
+    ) -> Tuple[Any, bool]:
+        """
+        Returns (result, shared). `shared` is True when this caller joined an
+        execution started by someone else.
+
+        timeout: the longest a joining caller waits for the shared result
+        (asyncio.TimeoutError after that; the execution carries on for the
+        others). The leader is bounded by `fn` itself.
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            # shield: one waiter disconnecting or timing out must not cancel the shared work
+            return await asyncio.wait_for(asyncio.shield(task), timeout), True
+
+        self.executions += 1
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task), False
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        # Mark the exception as retrieved even if every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+        }
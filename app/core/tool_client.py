@@ -1,38 +1,92 @@
 import json
-from typing import Any
-from mcp.client.session import ClientSession
-from mcp.client.streamable_http import streamable_http_client
+from typing import Any, Optional
+
+import httpx
+import structlog
+
+from app.core.bulkhead import UpstreamUnavailable, bulkheads
+from app.core.config import MCP_URL
+from app.core.deadline import DeadlineExceeded, with_deadline
+from app.core.metrics import TOOL_FALLBACKS
+
+log = structlog.get_logger()
+
+
+class ToolError(RuntimeError):
+    """The tool ran and reported an error (MCP isError), e.g. a product out of range."""
+
+
+def _local_tool(name: str, args: dict[str, Any]) -> str | None:
+    if name == "add":
+        return str(int(args["a"]) + int(args["b"]))
+    if name == "multiply":
+        return str(int(args["a"]) * int(args["b"]))
+    from app.mcp import batch_math
+
+    if name in batch_math.BATCH_TOOLS:
+        return batch_math.run(name, args)
+    return None
+
+
+def _unreachable(exc: BaseException) -> bool:
+    """Transport-level failures (and the bulkhead refusing the call), not tool errors."""
+    if isinstance(exc, BaseExceptionGroup):  # raised out of the MCP client's task group
+        return all(_unreachable(e) for e in exc.exceptions)
+    if isinstance(exc, DeadlineExceeded):  # a TimeoutError, hence an OSError; the request is out of time
+        return False
+    return isinstance(exc, (httpx.TransportError, httpx.HTTPStatusError, OSError, UpstreamUnavailable))
+
 
 class ToolClient:
-    def __init__(self, url: str = "http://127.0.0.1:8000/mcp"):
+    def __init__(self, url: str = MCP_URL):
         self.url = url
 
-    async def call_tool(self, name: str, args: dict[str, Any]) -> str:
+    async def call_tool(self, name: str, args: dict[str, Any], deadline: Optional[float] = None) -> str:
         """
         Calls an MCP tool and returns a string result.
         (We return string because LLM tool outputs are text.)
+
+        When the MCP server can't be reached (or its circuit is open) tools
+        with a local implementation are answered locally; anything else,
+        e.g. an error from the tool itself, is raised.
+
+        deadline: absolute time.monotonic(); DeadlineExceeded once it passes.
+        A call cut off by it counts against the MCP circuit breaker.
         """
         try:
-            async with streamable_http_client(self.url) as (read, write, _):
-                async with ClientSession(read, write) as session:
-                    await session.initialize()
-                    result = await session.call_tool(name, args)
-
-                    # MCP returns a list of content parts.
-                    # We try to extract a clean string.
-                    parts = []
-                    for item in result.content:
-                        # Most commonly TextContent with .text
-                        if hasattr(item, "text") and item.text:
-                            parts.append(item.text)
-                        # Some tools may return structured JSON-like objects
-                        elif hasattr(item, "data") and item.data:
-                            parts.append(json.dumps(item.data))
-                    return "\n".join(parts).strip()
-        except Exception:
-            # Local fallback keeps core flows running when MCP is unavailable.
-            if name == "add":
-                return str(int(args["a"]) + int(args["b"]))
-            if name == "multiply":
-                return str(int(args["a"]) * int(args["b"]))
-            raise
\ No newline at end of file
+            async with bulkheads["mcp"].slot(deadline):
+                return await with_deadline(self._call_mcp(name, args), deadline, f"tool {name}")
+        except Exception as e:
+            if not _unreachable(e):
+                raise
+            local = _local_tool(name, args)  # may raise ValueError, like the server would
+            if local is None:
+                raise
+            reason = e.reason if isinstance(e, UpstreamUnavailable) else "unreachable"
+            TOOL_FALLBACKS.inc(tool=name, reason=reason)
+            log.warning("mcp_tool_fallback", tool=name, reason=reason, error=repr(e), url=self.url)
+            return local
+
+    async def _call_mcp(self, name: str, args: dict[str, Any]) -> str:
+        from mcp.client.session import ClientSession
+        from mcp.client.streamable_http import streamable_http_client
+
+        async with streamable_http_client(self.url) as (read, write, _):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                result = await session.call_tool(name, args)
+
+                # MCP returns a list of content parts.
+                # We try to extract a clean string.
+                parts = []
+                for item in result.content:
+                    # Most commonly TextContent with .text
+                    if hasattr(item, "text") and item.text:
+                        parts.append(item.text)
+                    # Some tools may return structured JSON-like objects
+                    elif hasattr(item, "data") and item.data:
+                        parts.append(json.dumps(item.data))
+                text = "\n".join(parts).strip()
+                if getattr(result, "isError", False):
+                    raise ToolError(text or f"tool {name} failed")
+                return text
@@ -1,6 +1,8 @@
 import json
 from sqlalchemy import text
-from app.core.db import engine
+from app.core.db import get_engine
+from app.core.tracing import span
+from app.core.middleware import current_request_id
 
 
 def insert_tool_log(
@@ -13,7 +15,7 @@ def insert_tool_log(
     success: bool,
     error: str | None = None,
 ) -> None:
-    with engine.begin() as conn:
+    with span("db_write", table="tool_logs"), get_engine().begin() as conn:
         conn.execute(
             text("""
             INSERT INTO tool_logs
@@ -22,7 +24,7 @@ def insert_tool_log(
             (:request_id, :tool_name, :args_hash, :args_json, :tool_latency_ms, :tool_output_preview, :success, :error)
             """),
             {
-                "request_id": request_id,
+                "request_id": request_id or current_request_id(),
                 "tool_name": tool_name,
                 "args_hash": args_hash,
                 "args_json": json.dumps(args, ensure_ascii=False),
@@ -1,6 +1,14 @@
-from pydantic import BaseModel, Field
+from typing import Annotated, Literal
+
+from pydantic import BaseModel, Field, model_validator
 
 MAX_ABS_INT = 1_000_000
+# Batch tools: longest input array, and the largest result magnitude (fits in int64)
+MAX_ARRAY_LEN = 1000
+MAX_ABS_RESULT = 10**18
+
+BoundedInt = Annotated[int, Field(ge=-MAX_ABS_INT, le=MAX_ABS_INT)]
+IntArray = Annotated[list[BoundedInt], Field(min_length=1, max_length=MAX_ARRAY_LEN)]
 
 class AddArgs(BaseModel):
     a: int = Field(..., ge=-MAX_ABS_INT, le=MAX_ABS_INT)
@@ -8,4 +16,26 @@ class AddArgs(BaseModel):
 
 class MultiplyArgs(BaseModel):
     a: int = Field(..., ge=-MAX_ABS_INT, le=MAX_ABS_INT)
-    b: int = Field(..., ge=-MAX_ABS_INT, le=MAX_ABS_INT)
\ No newline at end of file
+    b: int = Field(..., ge=-MAX_ABS_INT, le=MAX_ABS_INT)
+
+class SumArgs(BaseModel):
+    values: IntArray
+
+class ProductArgs(BaseModel):
+    values: IntArray
+
+class PairArgs(BaseModel):
+    a: IntArray
+    b: IntArray
+
+    @model_validator(mode="after")
+    def same_length(self) -> "PairArgs":
+        if len(self.a) != len(self.b):
+            raise ValueError(f"a and b must have the same length ({len(self.a)} != {len(self.b)})")
+        return self
+
+class DotArgs(PairArgs):
+    pass
+
+class ElementwiseArgs(PairArgs):
+    op: Literal["add", "subtract", "multiply"]
@@ -0,0 +1,205 @@
+import atexit
+import contextvars
+import json
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Dict, Iterator, List, Optional
+
+import structlog
+
+from app.core.config import OTEL_SERVICE_NAME, TRACE_EXPORT_PATH, TRACE_EXPORT_QUEUE_SIZE
+from app.core.metrics import SPAN_LATENCY, Counter
+
+log = structlog.get_logger()
+
+# Lightweight request tracing.
+# A Trace lives in a contextvar for the duration of one graph execution;
+# span() records nested timings into it and is a no-op when no trace is active.
+
+_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("trace", default=None)
+_current_span: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Trace:
+    def __init__(self, request_id: str) -> None:
+        self.request_id = request_id
+        self.trace_id = secrets.token_hex(16)
+        self.spans: List[Dict[str, Any]] = []
+
+    def timings(self) -> Dict[str, float]:
+        """Total ms per span name (e.g. several llm_turn spans are summed)."""
+        out: Dict[str, float] = {}
+        for s in self.spans:
+            out[s["name"]] = round(out.get(s["name"], 0.0) + s["duration_ms"], 2)
+        return out
+
+    def to_otlp(self) -> dict:
+        """OTLP/JSON (ExportTraceServiceRequest) representation of this trace."""
+        spans = []
+        for s in self.spans:
+            attrs = {"request_id": self.request_id, **s["attributes"]}
+            spans.append(
+                {
+                    "traceId": self.trace_id,
+                    "spanId": s["span_id"],
+                    "parentSpanId": s["parent_id"] or "",
+                    "name": s["name"],
+                    "kind": 1,  # SPAN_KIND_INTERNAL
+                    "startTimeUnixNano": str(s["start_ns"]),
+                    "endTimeUnixNano": str(s["end_ns"]),
+                    "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in attrs.items()],
+                    "status": {"code": 2 if s["status"] == "error" else 1},
+                }
+            )
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": OTEL_SERVICE_NAME}}]},
+                    "scopeSpans": [{"scope": {"name": "app.core.tracing"}, "spans": spans}],
+                }
+            ]
+        }
+
+
+def _otlp_value(v: Any) -> dict:
+    if isinstance(v, bool):
+        return {"boolValue": v}
+    if isinstance(v, int):
+        return {"intValue": str(v)}
+    if isinstance(v, float):
+        return {"doubleValue": v}
+    return {"stringValue": str(v)}
+
+
+# -------------------------
+# OTLP file export (TRACE_EXPORT_PATH)
+# -------------------------
+TRACES_DROPPED = Counter("traces_dropped_total", "Traces not exported because the export queue was full.")
+
+_export_queue: Optional[queue.Queue] = None
+_exporter: Optional[threading.Thread] = None
+_STOP = object()
+
+
+def _export_forever(q: queue.Queue, path: str) -> None:
+    # One OTLP/JSON document per line (OpenTelemetry Collector otlpjsonfile receiver format)
+    with open(path, "a", encoding="utf-8") as f:
+        while True:
+            item = q.get()
+            if item is _STOP:
+                return
+            try:
+                f.write(json.dumps(item.to_otlp()) + "\n")
+                if q.empty():
+                    f.flush()
+            except Exception as e:  # a bad trace must not stop the exporter
+                log.warning("trace_export_failed", trace_id=item.trace_id, error=str(e))
+
+
+def _export(trace: "Trace") -> None:
+    """Hand the trace to the writer thread; never blocks the event loop."""
+    global _export_queue, _exporter
+    if _exporter is None:
+        _export_queue = queue.Queue(maxsize=TRACE_EXPORT_QUEUE_SIZE)
+        _exporter = threading.Thread(
+            target=_export_forever, args=(_export_queue, TRACE_EXPORT_PATH), name="trace-export", daemon=True
+        )
+        _exporter.start()
+        atexit.register(shutdown_tracing)
+    try:
+        _export_queue.put_nowait(trace)
+    except queue.Full:
+        TRACES_DROPPED.inc()
+
+
+def shutdown_tracing() -> None:
+    """Write out queued traces and stop the exporter (app shutdown and at exit); the next trace restarts it."""
+    global _export_queue, _exporter
+    if _exporter is None:
+        return
+    _export_queue.put(_STOP)
+    _exporter.join(timeout=5.0)
+    _export_queue, _exporter = None, None
+
+
+def start_trace(request_id: str) -> tuple[Trace, contextvars.Token]:
+    trace = Trace(request_id)
+    return trace, _trace.set(trace)
+
+
+def finish_trace(trace: Trace, token: contextvars.Token) -> None:
+    _trace.reset(token)
+    for s in trace.spans:
+        SPAN_LATENCY.observe(s["duration_ms"] / 1000.0, span=s["name"])
+    log.info(
+        "trace",
+        request_id=trace.request_id,
+        trace_id=trace.trace_id,
+        timings=trace.timings(),
+        spans=[
+            {
+                "name": s["name"],
+                "span_id": s["span_id"],
+                "parent_id": s["parent_id"],
+                "duration_ms": round(s["duration_ms"], 2),
+                "status": s["status"],
+            }
+            for s in trace.spans
+        ],
+    )
+    if TRACE_EXPORT_PATH:
+        _export(trace)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Time a block. Yields the attribute dict so callers can add attributes
+    (e.g. token counts) before the span closes.
+    """
+    trace = _trace.get()
+    if trace is None:
+        yield attributes
+        return
+
+    span_id = secrets.token_hex(8)
+    parent_id = _current_span.get()
+    token = _current_span.set(span_id)
+    start_ns = time.time_ns()
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield attributes
+    except BaseException as e:
+        status = "error"
+        attributes["error"] = type(e).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        trace.spans.append(
+            {
+                "name": name,
+                "span_id": span_id,
+                "parent_id": parent_id,
+                "start_ns": start_ns,
+                "end_ns": time.time_ns(),
+                "duration_ms": (time.perf_counter() - start) * 1000.0,
+                "status": status,
+                "attributes": attributes,
+            }
+        )
+
+
+def traced_node(name: str, fn):
+    """Wrap a LangGraph node so each execution becomes a span named after the node."""
+
+    @wraps(fn)
+    async def wrapper(state):
+        with span(name):
+            return await fn(state)
+
+    return wrapper
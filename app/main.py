@@ -1,23 +1,125 @@
+import asyncio
+import time
 from fastapi import FastAPI
 from app.api.routes import router
 import contextlib
-from app.core.logging import setup_logging
+import structlog
+from app.core.logging import setup_logging, shutdown_logging
 from app.core.middleware import RequestContextMiddleware
 from app.core.db import init_db
-from app.mcp.math_server import math_mcp
+from app.core.clients import init_clients, close_clients, pool_stats
+from app.core.config import DEFAULT_COLLECTION, DRAIN_DELAY_S, METRICS_FLUSH_S, RETRIEVE_K, WARMUP_QUERIES
+from app.core.lifecycle import STOPPED, install_drain_handler, lifecycle
+from app.core.metrics import remove_snapshot, write_snapshot
+from app.core.tracing import shutdown_tracing
 
 setup_logging()
+log = structlog.get_logger()
+
+
+async def flush_metrics_forever():
+    # Share this worker's counters with the others via METRICS_DIR
+    while True:
+        await asyncio.sleep(METRICS_FLUSH_S)
+        write_snapshot()
+
+
+def _warm_workflow():
+    # Heavy imports (langgraph, faiss, numpy, openai) + graph compile, off the event loop
+    from app.workflows.qa_graph import get_workflow
+
+    get_workflow()
+
+
+def _warm_route_classifier():
+    # Embed the labelled route examples once; route_node falls back to keywords if this fails.
+    from app.workflows.route_classifier import init_route_classifier
+
+    init_route_classifier()
+
+
+def _warm_store():
+    # Map the default collection and fault in its index before the first query needs it
+    from app.rag.stores import collection_exists, get_store
+
+    if collection_exists(DEFAULT_COLLECTION):
+        get_store(DEFAULT_COLLECTION)
+
+
+async def _warm_queries():
+    # One embeddings round trip opens the pooled HTTPS connection; the searches and the
+    # tokenizer load run the same code paths the first real requests will
+    from app.rag.chunker import count_tokens
+    from app.rag.retriever import aembed_texts, search_vectors
+    from app.rag.stores import collection_exists
+
+    vecs = await aembed_texts(WARMUP_QUERIES)
+    if collection_exists(DEFAULT_COLLECTION):
+        await asyncio.to_thread(search_vectors, vecs, RETRIEVE_K)
+    count_tokens(WARMUP_QUERIES[0])
+
+
+async def _step(name: str, fn, required: bool = False) -> None:
+    """Run one warmup step, recording its duration (or error) in lifecycle.warmup."""
+    start = time.perf_counter()
+    try:
+        result = fn()
+        if asyncio.iscoroutine(result):
+            await result
+        lifecycle.warmup[name] = {"ms": round((time.perf_counter() - start) * 1000.0, 1)}
+    except Exception as e:
+        lifecycle.warmup[name] = {"error": str(e)}
+        if required:
+            raise
+        log.warning("warmup_step_failed", step=name, error=str(e))
+
+
+async def warm_up() -> None:
+    await _step("workflow", lambda: asyncio.to_thread(_warm_workflow), required=True)
+    await _step("store", lambda: asyncio.to_thread(_warm_store))
+    await _step("route_classifier", lambda: asyncio.to_thread(_warm_route_classifier))
+    if WARMUP_QUERIES:
+        await _step("queries", _warm_queries)
+
+
+def _mount_mcp(app: FastAPI):
+    # Imported here rather than at module import to keep `import app.main` cheap
+    from app.mcp.math_server import math_mcp
+
+    if not any(getattr(r, "path", None) == "/mcp" for r in app.routes):
+        app.mount("/mcp", math_mcp.streamable_http_app())
+    return math_mcp
+
 
 @contextlib.asynccontextmanager
 async def lifespan(app: FastAPI):
+    setup_logging()  # no-op on first start; re-installs the queue after a previous lifespan shut it down
     init_db()
+    init_clients()
+    math_mcp = _mount_mcp(app)
+
+    # The worker accepts connections only after startup, so its first request meets warm caches
+    await warm_up()
+
+    flusher = asyncio.create_task(flush_metrics_forever())
 
     async with math_mcp.session_manager.run():
+        install_drain_handler(DRAIN_DELAY_S)
+        lifecycle.mark_ready()
         yield
+        lifecycle.start_draining()
+
+    lifecycle.state = STOPPED
+    log.info("worker_stopped", in_flight=lifecycle.in_flight)
+    flusher.cancel()
+    remove_snapshot()
+    log.info("openai_pool_stats", **pool_stats())
+    await close_clients()
+    shutdown_tracing()
+    shutdown_logging()
         
 
 app = FastAPI(title="AI Engineer Capstone", description="AI Engineer Capstone API", version="0.1.0", lifespan=lifespan)
 app.add_middleware(RequestContextMiddleware)
 app.include_router(router)
-
-app.mount("/mcp", math_mcp.streamable_http_app())
+# /mcp is mounted in lifespan (see _mount_mcp)
@@ -0,0 +1,75 @@
+"""
+NumPy implementations of the batch math tools.
+
+Served by math_server, and used by ToolClient as the local fallback when the
+MCP server is unreachable. Inputs are bounded by app.core.tool_schemas
+(|x| <= MAX_ABS_INT, at most MAX_ARRAY_LEN values). Sums, dot products and
+elementwise results therefore fit in int64. Products are checked against
+MAX_ABS_RESULT before multiplying, because int64 overflow wraps silently.
+
+Results are returned as tool output text: an integer, or a JSON array for
+elementwise.
+"""
+import json
+from typing import Any, Callable, Dict, List, Union
+
+import numpy as np
+
+from app.core.tool_schemas import MAX_ABS_RESULT
+
+BATCH_TOOLS = ("sum", "product", "dot", "elementwise")
+
+ELEMENTWISE_OPS: Dict[str, Callable[[np.ndarray, np.ndarray], np.ndarray]] = {
+    "add": np.add,
+    "subtract": np.subtract,
+    "multiply": np.multiply,
+}
+
+
+def _array(values: List[int]) -> np.ndarray:
+    return np.asarray(values, dtype=np.int64)
+
+
+def _pair(a: List[int], b: List[int]) -> tuple[np.ndarray, np.ndarray]:
+    if len(a) != len(b):
+        raise ValueError(f"a and b must have the same length ({len(a)} != {len(b)})")
+    return _array(a), _array(b)
+
+
+def total(values: List[int]) -> int:
+    return int(_array(values).sum())
+
+
+def product(values: List[int]) -> int:
+    arr = _array(values)
+    if not (arr == 0).any() and float(np.log10(np.abs(arr)).sum()) > np.log10(MAX_ABS_RESULT):
+        raise ValueError(f"product exceeds {MAX_ABS_RESULT:.0e}")
+    return int(np.prod(arr))
+
+
+def dot(a: List[int], b: List[int]) -> int:
+    x, y = _pair(a, b)
+    return int(np.dot(x, y))
+
+
+def elementwise(op: str, a: List[int], b: List[int]) -> List[int]:
+    if op not in ELEMENTWISE_OPS:
+        raise ValueError(f"unknown op {op!r} (choose from {', '.join(ELEMENTWISE_OPS)})")
+    x, y = _pair(a, b)
+    return ELEMENTWISE_OPS[op](x, y).tolist()
+
+
+def run(name: str, args: Dict[str, Any]) -> str:
+    """Tool output text for batch tool `name`."""
+    result: Union[int, List[int]]
+    if name == "sum":
+        result = total(args["values"])
+    elif name == "product":
+        result = product(args["values"])
+    elif name == "dot":
+        result = dot(args["a"], args["b"])
+    elif name == "elementwise":
+        result = elementwise(args["op"], args["a"], args["b"])
+    else:
+        raise ValueError(f"unknown batch tool {name!r}")
+    return json.dumps(result) if isinstance(result, list) else str(result)
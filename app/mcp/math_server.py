@@ -1,5 +1,11 @@
+import json
+from typing import Literal
+
 from mcp.server.fastmcp import FastMCP
 
+from app.core.tool_schemas import IntArray
+from app.mcp import batch_math
+
 math_mcp = FastMCP(
     "MathTools",
     stateless_http=True,
@@ -18,3 +24,27 @@ def add(a:int, b:int) -> int:
 def multiply(a:int, b:int) -> int:
     """Multiply two numbers together"""
     return a * b
+
+
+# Batch tools: a whole list of numbers in one tool call instead of a chain of
+# add/multiply turns. Arguments are validated against the same bounds as the
+# client side (app/core/tool_schemas.py).
+@math_mcp.tool(name="sum")
+def sum_values(values: IntArray) -> int:
+    """Sum a list of integers."""
+    return batch_math.total(values)
+
+@math_mcp.tool(name="product")
+def product(values: IntArray) -> int:
+    """Multiply a list of integers together."""
+    return batch_math.product(values)
+
+@math_mcp.tool(name="dot")
+def dot(a: IntArray, b: IntArray) -> int:
+    """Dot product of two equal-length integer lists."""
+    return batch_math.dot(a, b)
+
+@math_mcp.tool(name="elementwise")
+def elementwise(op: Literal["add", "subtract", "multiply"], a: IntArray, b: IntArray) -> str:
+    """Apply add, subtract or multiply pairwise to two equal-length integer lists; returns a JSON array."""
+    return json.dumps(batch_math.elementwise(op, a, b))
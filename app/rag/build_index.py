@@ -1,13 +1,59 @@
-from app.rag.loader import load_documents
-from app.rag.chunker import chunk_documents
-from app.rag.indexer import build_faiss_index
-from app.core.config import CHUNK_SIZE, CHUNK_OVERLAP
+import argparse
+
+from app.rag.pipeline import build_index_streaming
+from app.rag.rebuild import build_version
+from app.core.config import INDEX_BATCH_SIZE, INDEX_STORAGE, DEFAULT_COLLECTION
+from app.rag.quantize import STORAGE_KINDS
+from app.rag.stores import collection_dir
+
+
+def _print_progress(state):
+    if state["status"] == "running":
+        rate = state.get("chunks_per_s")
+        print(f"  … {state['done']} chunks from {state['docs']} docs" + (f" ({rate} chunks/s)" if rate else ""))
+
 
 def main():
-    docs = load_documents("docs")
-    chunks = chunk_documents(docs, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP)
-    build_faiss_index(chunks, out_dir="rag_store")
-    print(f"✅ Indexed {len(docs)} docs into {len(chunks)} chunks. Saved to rag_store/")
+    parser = argparse.ArgumentParser(description="Build the FAISS store from a docs directory")
+    parser.add_argument("--docs", default="docs")
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION, help="named collection to (re)build")
+    parser.add_argument("--out", default=None, help="build straight into this dir instead of a new collection version")
+    parser.add_argument("--batch-size", type=int, default=INDEX_BATCH_SIZE)
+    parser.add_argument("--storage", choices=STORAGE_KINDS, default=INDEX_STORAGE, help="vector storage layout")
+    parser.add_argument("--no-resume", action="store_true", help="discard any interrupted build")
+    args = parser.parse_args()
+
+    report = []
+    if args.out:
+        out_dir = args.out
+        state = build_index_streaming(
+            args.docs,
+            out_dir=out_dir,
+            batch_size=args.batch_size,
+            storage=args.storage,
+            resume=not args.no_resume,
+            progress=_print_progress,
+            report=report,
+        )
+    else:
+        # Versioned build, published atomically; a running server picks it up without a restart
+        state = build_version(
+            args.collection,
+            args.docs,
+            storage=args.storage,
+            batch_size=args.batch_size,
+            resume=not args.no_resume,
+            progress=_print_progress,
+            report=report,
+        )
+        out_dir = str(collection_dir(args.collection) / "versions" / state["version"])
+    for r in sorted(report, key=lambda r: r["ms"], reverse=True)[:10]:
+        print(f"  {r['ms']:>9.1f} ms  {'cached' if r['cached'] else 'parsed'}  {r['file']}")
+    resumed = f" (resumed at chunk {state['resumed_from']})" if state["resumed_from"] else ""
+    print(
+        f"✅ Indexed {state['docs']} docs into {state['chunks']} chunks{resumed} "
+        f"({state['storage']} storage). Saved to {out_dir}/"
+    )
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,5 +1,9 @@
-from typing import List, Dict
-from app.rag.resume_chunker import chunk_resume
+import re
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+from app.core.config import CHUNK_OVERLAP_TOKENS, CHUNK_TOKENS, OPENAI_EMBED_MODEL
+from app.rag.resume_chunker import chunk_resume, is_heading
 
 def chunk_text(text: str, chunk_size: int = 900, overlap: int = 150) -> List[str]:
     chunks = []
@@ -19,14 +23,19 @@ def chunk_text(text: str, chunk_size: int = 900, overlap: int = 150) -> List[str
     return chunks
 
 
+def _is_resume(doc_id: str) -> bool:
+    doc_id = doc_id.lower()
+    return "resume" in doc_id or "cv" in doc_id
+
+
 def chunk_documents(docs: List[Dict], chunk_size: int = 900, overlap: int = 150) -> List[Dict]:
     """
+    Character-based chunking (original behaviour).
     Returns list of {chunk_id, doc_id, source, text}
     """
     out = []
     for d in docs:
-        doc_id = d["id"].lower()
-        if "resume" in doc_id or "cv" in doc_id:
+        if _is_resume(d["id"]):
             parts = chunk_resume(d["text"], max_chars=chunk_size)
         else:
             parts = chunk_text(d["text"], chunk_size=chunk_size, overlap=overlap)
@@ -39,4 +48,165 @@ def chunk_documents(docs: List[Dict], chunk_size: int = 900, overlap: int = 150)
                     "text": c,
                 }
             )
-    return out
\ No newline at end of file
+    return out
+
+
+# -------------------------
+# Token-aware chunking
+# -------------------------
+# Sentence ends, plus line breaks in front of bullets
+_BREAK = re.compile(r"((?<=[.!?])\s+|\n(?=\s*[-•*●▪]))")
+_MD_HEADING = re.compile(r"^\s{0,3}#{1,6}\s+\S")
+
+Unit = Tuple[str, str, int]  # (separator before it, text, n_tokens)
+
+
+@lru_cache(maxsize=None)
+def get_encoder(model: str = OPENAI_EMBED_MODEL):
+    import tiktoken
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str, model: str = OPENAI_EMBED_MODEL) -> int:
+    return len(get_encoder(model).encode_ordinary(text))
+
+
+def is_markdown_heading(line: str) -> bool:
+    return bool(_MD_HEADING.match(line))
+
+
+def _any_heading(line: str) -> bool:
+    return is_markdown_heading(line) or is_heading(line)
+
+
+def _sections(text: str, heading: Callable[[str], bool]) -> Iterator[Tuple[str, List[Tuple[str, str]]]]:
+    """Yield (heading, [(sep, sentence), ...]); a heading line always starts a new section."""
+    title = ""
+    segments: List[Tuple[str, str]] = []
+    para: List[str] = []
+
+    def end_para():
+        if not para:
+            return
+        parts = _BREAK.split("\n".join(para))
+        sep = "\n" if segments else ""
+        for i in range(0, len(parts), 2):
+            sentence = parts[i].strip()
+            if sentence:
+                segments.append((sep, sentence))
+            if i + 1 < len(parts):
+                sep = "\n" if "\n" in parts[i + 1] else " "
+        para.clear()
+
+    for line in text.splitlines():
+        if heading(line):
+            end_para()
+            if segments:
+                yield title, segments
+            title, segments = line.strip(), []
+        elif line.strip():
+            para.append(line.rstrip())
+        else:
+            end_para()
+    end_para()
+    if segments:
+        yield title, segments
+
+
+def _fit(enc, sep: str, text: str, tokens: List[int], budget: int, overlap: int) -> Iterator[Unit]:
+    """Split a segment that is over budget: first at line breaks, then on token boundaries."""
+    if len(tokens) <= budget:
+        yield sep, text, len(tokens)
+        return
+    lines = [l.strip() for l in text.split("\n") if l.strip()]
+    if len(lines) > 1:
+        for i, (line, toks) in enumerate(zip(lines, enc.encode_ordinary_batch(lines))):
+            yield from _fit(enc, sep if i == 0 else "\n", line, toks, budget, overlap)
+        return
+    step = max(budget - overlap, 1)
+    for j in range(0, len(tokens), step):
+        piece = tokens[j : j + budget]
+        yield (sep if j == 0 else " "), enc.decode(piece).strip(), len(piece)
+        if j + budget >= len(tokens):
+            break
+
+
+def _join(title: str, units: List[Unit]) -> str:
+    body = units[0][1] + "".join(sep + t for sep, t, _ in units[1:])
+    return f"{title}\n{body}" if title else body
+
+
+def chunk_tokens(
+    text: str,
+    max_tokens: int = CHUNK_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+    heading: Callable[[str], bool] = is_markdown_heading,
+    model: str = OPENAI_EMBED_MODEL,
+) -> List[Tuple[str, int]]:
+    """
+    Split text into chunks of about max_tokens tokens, breaking at headings,
+    then paragraphs/sentences, and only mid-sentence when one sentence is too
+    long on its own. Chunks repeat their section heading and carry up to
+    overlap_tokens of trailing sentences from the previous chunk.
+
+    Every sentence is encoded once and chunk sizes are running totals, so the
+    cost is linear in len(text). Returns [(chunk_text, n_tokens)].
+    """
+    enc = get_encoder(model)
+    out: List[Tuple[str, int]] = []
+
+    for title, segments in _sections(text, heading):
+        title_tokens = len(enc.encode_ordinary(title)) + 1 if title else 0
+        budget = max(max_tokens - title_tokens, max_tokens // 2)
+        encoded = enc.encode_ordinary_batch([s for _, s in segments])
+        units: List[Unit] = [
+            u for (sep, s), toks in zip(segments, encoded) for u in _fit(enc, sep, s, toks, budget, overlap_tokens)
+        ]
+
+        start, size = 0, 0
+        for i, (_, _, n) in enumerate(units):
+            if size + n > budget and i > start:
+                out.append((_join(title, units[start:i]), title_tokens + size))
+                # Carry trailing sentences (never the whole chunk) as overlap
+                back, carried = i, 0
+                while back > start + 1 and carried + units[back - 1][2] <= overlap_tokens:
+                    back -= 1
+                    carried += units[back][2]
+                while back < i and carried + n > budget:
+                    carried -= units[back][2]
+                    back += 1
+                start, size = back, carried
+            size += n
+        if start < len(units):
+            out.append((_join(title, units[start:]), title_tokens + size))
+
+    return out
+
+
+def iter_chunks(
+    docs: Iterable[Dict],
+    max_tokens: int = CHUNK_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+) -> Iterator[Dict]:
+    """
+    Token-sized chunks, one document in memory at a time.
+    Yields {chunk_id, doc_id, source, text, tokens}
+    """
+    for d in docs:
+        if _is_resume(d["id"]):
+            # resume sections ("SKILLS", "Experience:") are short and self-contained: no overlap
+            parts = chunk_tokens(d["text"], max_tokens, 0, heading=_any_heading)
+        else:
+            parts = chunk_tokens(d["text"], max_tokens, overlap_tokens)
+        for i, (text, n) in enumerate(parts):
+            yield {
+                "chunk_id": f'{d["id"]}::chunk{i}',
+                "doc_id": d["id"],
+                "source": d["source"],
+                "text": text,
+                "tokens": n,
+            }
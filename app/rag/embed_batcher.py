@@ -0,0 +1,84 @@
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import numpy as np
+
+
+class EmbeddingBatcher:
+    """
+    Collects embedding requests that arrive within `max_wait_ms` of each other
+    into one upstream call (at most `max_batch` texts) and hands each caller
+    back its own row.
+    """
+
+    def __init__(
+        self,
+        embed_many: Callable[[List[str]], Awaitable[np.ndarray]],
+        max_batch: int = 64,
+        max_wait_ms: float = 5.0,
+    ) -> None:
+        self.embed_many = embed_many
+        self.max_batch = max_batch
+        self.max_wait_s = max_wait_ms / 1000.0
+
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.items = 0
+        self.max_batch_seen = 0
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Returns a (1, dim) float32 row for `text`."""
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.append((text, fut))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_s, self._flush)
+
+        return await fut
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending[: self.max_batch], self._pending[self.max_batch :]
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        # Anything beyond max_batch starts a new window
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait_s, self._flush)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        self.batches += 1
+        self.items += len(batch)
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+        try:
+            vectors = await self.embed_many([t for t, _ in batch])
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+
+        for i, (_, fut) in enumerate(batch):
+            if not fut.done():
+                fut.set_result(vectors[i : i + 1])
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+            "pending": len(self._pending),
+        }
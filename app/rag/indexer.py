@@ -4,21 +4,26 @@ from typing import List, Dict
 
 import numpy as np
 import faiss
-from openai import OpenAI
+from app.core.config import OPENAI_API_KEY, OPENAI_EMBED_MODEL, EMBED_DIMENSIONS
+from app.core.clients import get_openai
 
-from app.core.config import OPENAI_API_KEY, OPENAI_EMBED_MODEL
+
+def embed_kwargs() -> Dict:
+    """Extra embeddings.create arguments: shortened vectors when EMBED_DIMENSIONS is set."""
+    return {"dimensions": EMBED_DIMENSIONS} if EMBED_DIMENSIONS else {}
 
 
 def embed_texts(texts: List[str]) -> np.ndarray:
     if not OPENAI_API_KEY:
         raise ValueError("OPENAI_API_KEY missing in .env")
 
-    client = OpenAI(api_key=OPENAI_API_KEY)
+    client = get_openai()
 
     # Batch embeddings to reduce overhead
     resp = client.embeddings.create(
         model=OPENAI_EMBED_MODEL,
         input=texts,
+        **embed_kwargs(),
     )
 
     vectors = np.array([e.embedding for e in resp.data], dtype="float32")
@@ -1,29 +1,170 @@
+import contextlib
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict
-from app.rag.pdf_loader import load_pdf
+from typing import Iterator, List, Dict, Optional, Tuple
 
-def load_documents(docs_dir: str = "docs") -> List[Dict]:
+from app.core.config import EXTRACT_CACHE_DIR, PDF_PAGES_PER_TASK
+from app.rag.pdf_loader import extract_head, extract_pages
+
+TEXT_SUFFIXES = {".txt", ".md"}
+
+
+def _cache_path(cache_dir: Path, file: Path) -> Path:
+    # path + size + mtime: any edit (or a replaced file) gets a new key
+    st = file.stat()
+    key = hashlib.sha256(f"{file.resolve()}|{st.st_size}|{st.st_mtime_ns}".encode("utf-8")).hexdigest()
+    return cache_dir / f"{key}.json"
+
+
+def _doc_files(p: Path) -> List[Path]:
+    return [f for f in sorted(p.glob("**/*")) if f.is_file() and f.suffix.lower() in TEXT_SUFFIXES | {".pdf"}]
+
+
+def corpus_manifest(docs_dir: str = "docs") -> str:
+    """Hash of (path, size, mtime) for every file iter_documents would read: changes when the corpus does."""
+    p = Path(docs_dir)
+    h = hashlib.sha256()
+    for f in _doc_files(p):
+        st = f.stat()
+        h.update(f"{f.relative_to(p)}|{st.st_size}|{st.st_mtime_ns}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def load_documents(
+    docs_dir: str = "docs",
+    workers: Optional[int] = None,
+    cache_dir: Optional[str] = EXTRACT_CACHE_DIR,
+    report: Optional[List[Dict]] = None,
+) -> List[Dict]:
     """
     Returns: list of {id, source, text}
+
+    PDFs are extracted in a process pool (large PDFs are split into page ranges
+    of PDF_PAGES_PER_TASK) and the extracted text is cached in `cache_dir`, so
+    unchanged files are never re-parsed. Pass `report` to receive one
+    {file, pages, ms, cached} entry per file.
+    """
+    return list(iter_documents(docs_dir, workers=workers, cache_dir=cache_dir, report=report))
+
+
+def iter_documents(
+    docs_dir: str = "docs",
+    workers: Optional[int] = None,
+    cache_dir: Optional[str] = EXTRACT_CACHE_DIR,
+    report: Optional[List[Dict]] = None,
+    window: Optional[int] = None,
+) -> Iterator[Dict]:
+    """
+    Streaming version of load_documents: yields documents in path order,
+    extracting `window` files at a time so memory stays bounded.
     """
     p = Path(docs_dir)
     if not p.exists():
         raise FileNotFoundError(f"Docs directory not found: {docs_dir}")
 
-    docs = []
-    for file in sorted(p.glob("**/*")):
-        if file.is_file() and file.suffix.lower() in {".txt", ".md"}:
-            text = file.read_text(encoding="utf-8", errors="ignore").strip()
-            if text:
-                docs.append(
-                    {
-                        "id": str(file.relative_to(p)),
-                        "source": str(file),
-                        "text": text,
-                    }
-                )
-        elif file.is_file() and file.suffix.lower() == ".pdf":
-            d = load_pdf(str(file))
-            if d["text"]:
-                docs.append(d)
-    return docs
\ No newline at end of file
+    cache = Path(cache_dir) if cache_dir else None
+    if cache is not None:
+        cache.mkdir(parents=True, exist_ok=True)
+
+    files = _doc_files(p)
+    workers = workers or os.cpu_count() or 1
+    window = window or max(4 * workers, 16)
+
+    with contextlib.ExitStack() as stack:
+        pool: Optional[ProcessPoolExecutor] = None
+        for i in range(0, len(files), window):
+            group = files[i : i + window]
+            results: Dict[Path, Dict] = {}
+            to_extract: List[Path] = []
+
+            for file in group:
+                if file.suffix.lower() in TEXT_SUFFIXES:
+                    t0 = time.perf_counter()
+                    text = file.read_text(encoding="utf-8", errors="ignore").strip()
+                    results[file] = {"id": str(file.relative_to(p)), "source": str(file), "text": text}
+                    _record(report, file, None, (time.perf_counter() - t0) * 1000.0, cached=False)
+                    continue
+
+                t0 = time.perf_counter()
+                doc = _read_cached(_cache_path(cache, file)) if cache is not None else None
+                if doc is not None:
+                    results[file] = doc
+                    _record(report, file, None, (time.perf_counter() - t0) * 1000.0, cached=True)
+                else:
+                    to_extract.append(file)
+
+            if to_extract and pool is None and workers > 1:
+                pool = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+
+            for file, doc, pages, ms in _extract_pdfs(to_extract, pool):
+                results[file] = doc
+                _record(report, file, pages, ms, cached=False)
+                if cache is not None:
+                    _write_cached(_cache_path(cache, file), doc)
+
+            for file in group:
+                if results[file]["text"]:
+                    yield results[file]
+
+
+def _read_cached(path: Path) -> Optional[Dict]:
+    """A cache entry, or None (a miss) when it is missing or unreadable, e.g. truncated by a crash."""
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cached(path: Path, doc: Dict) -> None:
+    # tmp + rename: readers see the whole entry or none of it
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(doc, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _run(pool: Optional[ProcessPoolExecutor], fn, *args) -> Future:
+    if pool is not None:
+        return pool.submit(fn, *args)
+    done: Future = Future()
+    done.set_result(fn(*args))
+    return done
+
+
+def _extract_pdfs(files: List[Path], pool: Optional[ProcessPoolExecutor]) -> List[Tuple[Path, Dict, int, float]]:
+    if not files:
+        return []
+
+    # First PDF_PAGES_PER_TASK pages of every file; the worker also reports the
+    # page count, and the rest is split into ranges as soon as it does, so one
+    # big PDF can use many cores and nothing is parsed serially up here.
+    heads = {_run(pool, extract_head, str(f), PDF_PAGES_PER_TASK): f for f in files}
+    rest: Dict[Future, Tuple[Path, int]] = {}
+    parts: Dict[Path, List[Tuple[int, List[str]]]] = {}
+    elapsed: Dict[Path, float] = {}
+    for fut in as_completed(heads):
+        file = heads[fut]
+        texts, ms, n = fut.result()
+        parts[file], elapsed[file] = [(0, texts)], ms
+        for start in range(PDF_PAGES_PER_TASK, n, PDF_PAGES_PER_TASK):
+            end = min(start + PDF_PAGES_PER_TASK, n)
+            rest[_run(pool, extract_pages, str(file), start, end)] = (file, start)
+    for fut, (file, start) in rest.items():
+        texts, ms = fut.result()
+        parts[file].append((start, texts))
+        elapsed[file] += ms
+
+    out = []
+    for file in files:
+        texts = [t for _, page_texts in sorted(parts[file], key=lambda p: p[0]) for t in page_texts]
+        doc = {"id": file.name, "source": str(file), "text": "\n".join(texts).strip()}
+        out.append((file, doc, len(texts), elapsed[file]))
+    return out
+
+
+def _record(report: Optional[List[Dict]], file: Path, pages: Optional[int], ms: float, cached: bool) -> None:
+    if report is not None:
+        report.append({"file": str(file), "pages": pages, "ms": round(ms, 2), "cached": cached})
@@ -0,0 +1,71 @@
+"""
+Maximal marginal relevance over retrieved candidates.
+
+Neighbouring chunks overlap (CHUNK_OVERLAP, resume sections), so the top FAISS
+hits are often near-copies of one another. MMR picks candidates one at a time,
+each maximizing
+
+    lambda * relevance(c) - (1 - lambda) * max similarity(c, already picked)
+
+Relevance is the hit's retrieval score (cosine with the query). Similarities
+come from the candidates' own vectors, read back from the store as a single
+(n, dim) matrix; one n x n product covers every pair.
+"""
+from typing import Dict, List, Tuple
+
+import numpy as np
+import structlog
+
+from app.core.config import MMR_K, MMR_LAMBDA
+from app.core.metrics import MMR_TOKENS_SAVED
+from app.rag.reranker import CANDIDATE_CHARS
+from app.rag.stores import Store
+
+log = structlog.get_logger()
+
+
+def mmr(relevance: np.ndarray, vecs: np.ndarray, k: int, lambda_: float = MMR_LAMBDA) -> List[int]:
+    """Indices of up to k rows of `vecs`, in pick order."""
+    n = len(vecs)
+    if n == 0 or k <= 0:
+        return []
+    sim = vecs @ vecs.T
+    picked = [int(np.argmax(relevance))]
+    redundancy = sim[picked[0]].copy()  # max similarity to anything picked so far
+    available = np.ones(n, dtype=bool)
+    available[picked[0]] = False
+
+    while len(picked) < min(k, n):
+        score = lambda_ * relevance - (1.0 - lambda_) * redundancy
+        score[~available] = -np.inf
+        i = int(np.argmax(score))
+        picked.append(i)
+        available[i] = False
+        np.maximum(redundancy, sim[i], out=redundancy)
+    return picked
+
+
+def diversify(hits: List[Dict], store: Store, k: int = MMR_K, lambda_: float = MMR_LAMBDA) -> Tuple[List[Dict], Dict]:
+    """
+    Reorder `hits` by MMR and keep the first k. Returns (hits, meta); meta
+    reports what was dropped and the rerank prompt tokens that saves.
+    """
+    if k <= 0 or len(hits) < 2:
+        return hits, {}
+    rows = [store.rows.get(h["chunk_id"]) for h in hits]
+    if None in rows:
+        # Collection was rebuilt since these hits were retrieved
+        log.warning("mmr_skipped", collection=store.name, reason="stale_hits")
+        return hits, {}
+
+    vecs = store.vectors_for(np.asarray(rows, dtype="int64"))
+    relevance = np.array([h["score"] for h in hits], dtype="float32")
+    order = mmr(relevance, vecs, k, lambda_)
+    kept = [hits[i] for i in order]
+
+    dropped = [hits[i] for i in sorted(set(range(len(hits))) - set(order))]
+    # ~4 chars/token: an estimate is enough for telemetry and can't fail the request
+    saved = sum(len(h["text"][:CANDIDATE_CHARS]) // 4 for h in dropped)
+    if saved:
+        MMR_TOKENS_SAVED.inc(saved)
+    return kept, {"mmr_lambda": lambda_, "mmr_dropped": len(dropped), "mmr_tokens_saved": saved}
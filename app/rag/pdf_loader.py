@@ -1,19 +1,39 @@
+import time
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Tuple
 
 from pypdf import PdfReader
 
 
+def extract_pages(path: str, start: int = 0, end: int | None = None) -> Tuple[List[str], float]:
+    """
+    Extract text for pages [start, end). Returns (page texts, elapsed ms).
+    Top-level function so it can run in a process pool.
+    """
+    t0 = time.perf_counter()
+    reader = PdfReader(path)
+    pages = reader.pages[start:end]
+    texts = [page.extract_text() or "" for page in pages]
+    return texts, (time.perf_counter() - t0) * 1000.0
+
+
+def extract_head(path: str, n: int) -> Tuple[List[str], float, int]:
+    """
+    extract_pages for the first n pages, plus the document's page count, so
+    the caller can split the rest into ranges without parsing the PDF itself.
+    """
+    t0 = time.perf_counter()
+    reader = PdfReader(path)
+    texts = [page.extract_text() or "" for page in reader.pages[:n]]
+    return texts, (time.perf_counter() - t0) * 1000.0, len(reader.pages)
+
+
 def load_pdf(path: str) -> Dict:
     p = Path(path)
-    reader = PdfReader(str(p))
-
-    text_parts = []
-    for page in reader.pages:
-        text_parts.append(page.extract_text() or "")
+    text_parts, _ = extract_pages(str(p))
 
     return {
         "id": p.name,
         "source": str(p),
         "text": "\n".join(text_parts).strip(),
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,239 @@
+"""
+Streaming index build: load -> chunk -> embed batch -> index.add -> append chunk.
+
+Only one document and one embedding batch are held at a time (plus the FAISS
+index itself). Work in progress lives in <out_dir>/.build/, append-only so a
+checkpoint costs one batch of I/O however large the index has grown:
+
+    vectors.f32    normalized float32 embeddings, one row per chunk
+    chunks.jsonl   one chunk per line
+    state.json     build parameters + progress, rewritten every
+                   INDEX_CHECKPOINT_EVERY batches after both files are fsynced
+
+An interrupted build resumes from the last checkpoint: both files are
+truncated to the `done` chunks it recorded, the index is rebuilt from
+vectors.f32, and the first `done` chunks of the (deterministic) chunk stream
+are skipped. The parameters include a manifest of the corpus (path, size,
+mtime), so a resume after files were added, removed or edited starts over.
+
+The build always accumulates a flat index; `storage` (INDEX_STORAGE) only
+decides how it is published — see app/rag/quantize.py.
+"""
+import json
+import os
+import shutil
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import faiss
+import numpy as np
+import structlog
+
+from app.core.config import (
+    CHUNK_OVERLAP_TOKENS,
+    CHUNK_TOKENS,
+    EMBED_DIMENSIONS,
+    INDEX_BATCH_SIZE,
+    INDEX_CHECKPOINT_EVERY,
+    INDEX_STORAGE,
+    OPENAI_EMBED_MODEL,
+)
+from app.rag.chunker import iter_chunks
+from app.rag.indexer import embed_texts
+from app.rag.loader import corpus_manifest, iter_documents
+from app.rag.quantize import export_index
+
+log = structlog.get_logger()
+
+Progress = Callable[[Dict], None]
+
+
+def _batched(items: Iterable[Dict], n: int) -> Iterator[List[Dict]]:
+    it = iter(items)
+    while batch := list(islice(it, n)):
+        yield batch
+
+
+def _write_json(path: Path, data: Dict) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _truncate_lines(path: Path, n: int) -> None:
+    """Keep the first n lines of `path` (drops chunks appended after the last checkpoint)."""
+    if not path.exists():
+        path.touch()
+        return
+    with open(path, "r+b") as f:
+        for i in range(n):
+            if not f.readline():
+                raise RuntimeError(f"{path} has only {i} lines, checkpoint expects {n}")
+        f.truncate(f.tell())
+
+
+def _truncate_rows(path: Path, n: int, row_bytes: int) -> None:
+    """Keep the first n rows of a raw vectors file."""
+    if not path.exists():
+        path.touch()
+    size = path.stat().st_size
+    if size < n * row_bytes:
+        raise RuntimeError(f"{path} has only {size // max(row_bytes, 1)} rows, checkpoint expects {n}")
+    os.truncate(path, n * row_bytes)
+
+
+def _load_vectors(path: Path, n: int, dim: int):
+    """Rebuild the flat index from the first n rows of vectors.f32."""
+    index = faiss.IndexFlatIP(dim)
+    rows = np.memmap(path, dtype="float32", mode="r", shape=(n, dim))
+    for start in range(0, n, 65536):
+        index.add(np.ascontiguousarray(rows[start : start + 65536]))
+    del rows
+    return index
+
+
+def _checkpoint(work: Path, files, state: Dict) -> None:
+    # Both files first, then state: what state.json calls done is always on disk
+    for f in files:
+        f.flush()
+        os.fsync(f.fileno())
+    state["updated_at"] = time.time()
+    _write_json(work / "state.json", state)
+
+
+def read_build_state(out_dir: str = "rag_store") -> Optional[Dict]:
+    path = Path(out_dir) / ".build" / "state.json"
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def build_index_streaming(
+    docs_dir: str = "docs",
+    out_dir: str = "rag_store",
+    max_tokens: int = CHUNK_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+    batch_size: int = INDEX_BATCH_SIZE,
+    checkpoint_every: int = INDEX_CHECKPOINT_EVERY,
+    storage: str = INDEX_STORAGE,
+    resume: bool = True,
+    progress: Optional[Progress] = None,
+    report: Optional[List[Dict]] = None,
+) -> Dict:
+    """
+    Build <out_dir>/index.faiss + chunks.json without materializing the corpus.
+    Returns the final state dict ({docs, chunks, seconds, ...}).
+    """
+    out = Path(out_dir)
+    work = out / ".build"
+    params = {
+        "docs_dir": str(Path(docs_dir).resolve()),
+        "chunk_tokens": max_tokens,
+        "overlap_tokens": overlap_tokens,
+        "embed_model": OPENAI_EMBED_MODEL,
+        "dimensions": EMBED_DIMENSIONS or None,
+        "manifest": corpus_manifest(docs_dir),
+    }
+
+    prev = read_build_state(out_dir) if resume else None
+    if prev is not None and prev.get("params") != params:
+        log.warning("index_build_params_changed", previous=prev.get("params"), current=params)
+        prev = None
+    if prev is None and work.exists():
+        shutil.rmtree(work)
+    work.mkdir(parents=True, exist_ok=True)
+
+    index = None
+    done = prev.get("done", 0) if prev is not None else 0
+    dim = prev.get("dim") if prev is not None else None
+    if not dim:
+        done = 0
+    _truncate_lines(work / "chunks.jsonl", done)
+    _truncate_rows(work / "vectors.f32", done, 4 * (dim or 0))
+    if done:
+        index = _load_vectors(work / "vectors.f32", done, dim)
+
+    state = {
+        "params": params,
+        "status": "running",
+        "done": done,
+        "dim": dim,
+        "resumed_from": done,
+        "docs": 0,
+        "started_at": time.time(),
+        "updated_at": time.time(),
+    }
+    if done:
+        log.info("index_build_resume", chunks_done=done)
+
+    def counted(docs: Iterator[Dict]) -> Iterator[Dict]:
+        for d in docs:
+            state["docs"] += 1
+            yield d
+
+    docs = counted(iter_documents(docs_dir, report=report))
+    chunks = islice(iter_chunks(docs, max_tokens=max_tokens, overlap_tokens=overlap_tokens), done, None)
+
+    start = time.perf_counter()
+    with open(work / "chunks.jsonl", "a", encoding="utf-8") as chunks_file, open(
+        work / "vectors.f32", "ab"
+    ) as vectors_file:
+        for n, batch in enumerate(_batched(chunks, batch_size), start=1):
+            vectors = embed_texts([c["text"] for c in batch])
+            faiss.normalize_L2(vectors)
+            if index is None:
+                index = faiss.IndexFlatIP(vectors.shape[1])
+                state["dim"] = vectors.shape[1]
+            index.add(vectors)
+
+            vectors_file.write(np.ascontiguousarray(vectors, dtype="float32").tobytes())
+            for c in batch:
+                chunks_file.write(json.dumps(c, ensure_ascii=False) + "\n")
+            state["done"] = index.ntotal
+
+            if n % checkpoint_every == 0:
+                elapsed = time.perf_counter() - start
+                state["chunks_per_s"] = round((state["done"] - done) / elapsed, 1) if elapsed else None
+                _checkpoint(work, (chunks_file, vectors_file), state)
+                if progress:
+                    progress(dict(state))
+
+        if index is None:
+            raise ValueError(f"No chunks produced from {docs_dir}")
+        _checkpoint(work, (chunks_file, vectors_file), state)
+
+    # Publish: index files and chunks.json are swapped in only once all are complete.
+    # A load in between sees store.json disagree with index.faiss and retries
+    # (quantize.read_index).
+    files = export_index(index, out, storage, meta={k: params[k] for k in ("embed_model", "dimensions")})
+    with open(work / "chunks.jsonl", encoding="utf-8") as src, open(
+        out / "chunks.json.tmp", "w", encoding="utf-8"
+    ) as dst:
+        dst.write("[\n")
+        for i, line in enumerate(src):
+            dst.write(("" if i == 0 else ",\n") + line.rstrip("\n"))
+        dst.write("\n]\n")
+    for name in files:
+        if name != "index.faiss":
+            os.replace(out / f"{name}.tmp", out / name)
+    os.replace(out / "chunks.json.tmp", out / "chunks.json")
+    # Last: the index mtime is what tells a running server to reload
+    os.replace(out / "index.faiss.tmp", out / "index.faiss")
+    if "vectors.npy" not in files:  # only once nothing can pair it with a compact index
+        (out / "vectors.npy").unlink(missing_ok=True)
+    shutil.rmtree(work)
+
+    elapsed = time.perf_counter() - start
+    state.update(
+        status="done",
+        storage=storage,
+        chunks=index.ntotal,
+        seconds=round(elapsed, 2),
+        chunks_per_s=round((index.ntotal - done) / elapsed, 1) if elapsed else None,
+    )
+    if progress:
+        progress(dict(state))
+    log.info("index_build_done", docs=state["docs"], chunks=index.ntotal, seconds=state["seconds"])
+    return state
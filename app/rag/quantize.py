@@ -0,0 +1,202 @@
+"""
+Compact index storage (INDEX_STORAGE) with exact re-scoring.
+
+    flat    IndexFlatIP, float32 codes (4 bytes/dim) — the original layout
+    fp16    IndexScalarQuantizer QT_fp16 (2 bytes/dim)
+    sq8     IndexScalarQuantizer QT_8bit (1 byte/dim, trained on a sample)
+    binary  IndexBinaryFlat over the sign bits (1 bit/dim), Hamming distance
+
+For anything but flat, the build also writes vectors.npy (normalized float32)
+next to index.faiss. Only the compact index is held in memory: it picks
+RESCORE_FACTOR * k candidates, which are then re-scored exactly against
+vectors.npy. That file is memory-mapped, so only the rows touched are read.
+store.json records the layout; a store without one is flat.
+
+Publishing a store in place replaces several files one by one (index.faiss
+last). store.json also records the index file's size, so a load that lands
+between the renames sees files from two builds and retries instead of
+pairing e.g. a binary layout with the previous float index.
+"""
+import json
+import math
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+STORAGE_KINDS = ("flat", "fp16", "sq8", "binary")
+# A load that catches a publish half-way retries for up to ~1s
+PUBLISH_RETRIES = 20
+PUBLISH_RETRY_S = 0.05
+TRAIN_SAMPLE = 65536
+EXPORT_BLOCK = 65536
+
+
+def binarize(vecs: np.ndarray) -> np.ndarray:
+    """Sign bits, packed 8 dims per byte (the IndexBinaryFlat code)."""
+    return np.packbits(vecs > 0, axis=1)
+
+
+def fit_dims(q: np.ndarray, d: int) -> np.ndarray:
+    """
+    text-embedding-3 vectors can be shortened: truncate, then re-normalize
+    (what the `dimensions` parameter does server-side). Lets a full-size query
+    search a store built with EMBED_DIMENSIONS.
+    """
+    if q.shape[1] == d:
+        return q
+    if q.shape[1] < d:
+        raise ValueError(f"Query has {q.shape[1]} dims but the index has {d}")
+    q = np.ascontiguousarray(q[:, :d])
+    faiss.normalize_L2(q)
+    return q
+
+
+# -------------------------
+# Build
+# -------------------------
+def _blocks(flat: faiss.Index) -> Iterator[Tuple[int, np.ndarray]]:
+    for start in range(0, flat.ntotal, EXPORT_BLOCK):
+        yield start, flat.reconstruct_n(start, min(EXPORT_BLOCK, flat.ntotal - start))
+
+
+def compact_index(storage: str, flat: faiss.Index):
+    """Re-encode a flat index as `storage`, block by block."""
+    d = flat.d
+    if storage == "binary":
+        if d % 8:
+            raise ValueError(f"binary storage needs dims divisible by 8, got {d}")
+        index = faiss.IndexBinaryFlat(d)
+        for _, block in _blocks(flat):
+            index.add(binarize(block))
+        return index
+
+    qtype = {"fp16": faiss.ScalarQuantizer.QT_fp16, "sq8": faiss.ScalarQuantizer.QT_8bit}[storage]
+    index = faiss.IndexScalarQuantizer(d, qtype, faiss.METRIC_INNER_PRODUCT)
+    if not index.is_trained:
+        # Per-dimension ranges from a random sample
+        rng = np.random.default_rng(0)
+        sample = np.sort(rng.choice(flat.ntotal, min(flat.ntotal, TRAIN_SAMPLE), replace=False))
+        index.train(flat.reconstruct_batch(sample))
+    for _, block in _blocks(flat):
+        index.add(block)
+    return index
+
+
+def export_index(flat: faiss.Index, out: Path, storage: str, meta: Optional[Dict] = None) -> List[str]:
+    """
+    Write index.faiss, store.json and (compact layouts) vectors.npy under `out`
+    as *.tmp files; the caller os.replace()s them into place together with
+    chunks.json. Returns the final file names.
+    """
+    if storage not in STORAGE_KINDS:
+        raise ValueError(f"Unknown index storage: {storage} (expected one of {', '.join(STORAGE_KINDS)})")
+    files = ["index.faiss", "store.json"]
+
+    if storage == "flat":
+        faiss.write_index(flat, str(out / "index.faiss.tmp"))
+    else:
+        compact = compact_index(storage, flat)
+        write = faiss.write_index_binary if storage == "binary" else faiss.write_index
+        write(compact, str(out / "index.faiss.tmp"))
+
+        vectors = np.lib.format.open_memmap(
+            out / "vectors.npy.tmp", mode="w+", dtype="float32", shape=(flat.ntotal, flat.d)
+        )
+        for start, block in _blocks(flat):
+            vectors[start : start + len(block)] = block
+        vectors.flush()
+        del vectors
+        files.append("vectors.npy")
+
+    info = {
+        "storage": storage,
+        "dim": flat.d,
+        "vectors": flat.ntotal,
+        "index_bytes": (out / "index.faiss.tmp").stat().st_size,
+        **(meta or {}),
+    }
+    (out / "store.json.tmp").write_text(json.dumps(info, indent=2), encoding="utf-8")
+    return files
+
+
+# -------------------------
+# Load + search
+# -------------------------
+class StorePublishing(RuntimeError):
+    """The store's files are mid-replacement (they come from two builds)."""
+
+
+def read_meta(store_dir: Path) -> Dict:
+    path = store_dir / "store.json"
+    if not path.exists():
+        return {"storage": "flat"}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _read_once(store_dir: Path) -> Tuple[object, Optional[np.ndarray], Dict]:
+    meta = read_meta(store_dir)
+    storage = meta.get("storage", "flat")
+    path = store_dir / "index.faiss"
+    if "index_bytes" in meta and path.stat().st_size != meta["index_bytes"]:
+        raise StorePublishing(f"{path} does not match store.json")
+    index = faiss.read_index_binary(str(path)) if storage == "binary" else faiss.read_index(str(path))
+    vectors = None if storage == "flat" else np.load(store_dir / "vectors.npy", mmap_mode="r")
+    counts = {index.ntotal, meta.get("vectors", index.ntotal), index.ntotal if vectors is None else len(vectors)}
+    if len(counts) > 1:
+        raise StorePublishing(f"{store_dir} files are from different builds")
+    return index, vectors, meta
+
+
+def read_index(store_dir: Path) -> Tuple[object, Optional[np.ndarray], Dict]:
+    """(index, memory-mapped exact vectors or None for flat, store.json)"""
+    for _ in range(PUBLISH_RETRIES):
+        try:
+            return _read_once(store_dir)
+        except RuntimeError:  # StorePublishing, or faiss reading the wrong index kind
+            time.sleep(PUBLISH_RETRY_S)
+    return _read_once(store_dir)
+
+
+def first_pass(index, storage: str, q: np.ndarray, n: int, params=None) -> np.ndarray:
+    """Candidate ids from the compact index (approximate order)."""
+    if storage == "binary":
+        _, ids = index.search(binarize(q), n)
+    else:
+        _, ids = index.search(q, n, params=params)
+    return ids
+
+
+def filtered_first_pass(index, q: np.ndarray, n: int, allowed: np.ndarray) -> np.ndarray:
+    """
+    first_pass for a binary index restricted to `allowed` ids (sorted).
+    IndexBinaryFlat takes no IDSelector, so the Hamming scan is oversampled by
+    the filter's selectivity (2x for slack) and non-matching ids dropped;
+    rows may come back with fewer than n candidates (padded with -1).
+    """
+    fetch = min(index.ntotal, math.ceil(2 * n * index.ntotal / max(len(allowed), 1)))
+    _, ids = index.search(binarize(q), fetch)
+    out = np.full((len(q), n), -1, dtype="int64")
+    for r in range(len(q)):
+        keep = ids[r][np.isin(ids[r], allowed)][:n]
+        out[r, : len(keep)] = keep
+    return out
+
+
+def rescore(vectors: np.ndarray, q: np.ndarray, candidates: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact inner products for each row's candidates; returns the top k like index.search."""
+    scores = np.zeros((len(q), k), dtype="float32")
+    ids = np.full((len(q), k), -1, dtype="int64")
+    for r in range(len(q)):
+        cand = candidates[r]
+        # Ascending ids read the memory map front to back
+        cand = np.sort(cand[cand != -1])
+        if not len(cand):
+            continue
+        exact = np.asarray(vectors[cand]) @ q[r]
+        top = np.argsort(-exact, kind="stable")[:k]
+        scores[r, : len(top)] = exact[top]
+        ids[r, : len(top)] = cand[top]
+    return scores, ids
@@ -0,0 +1,234 @@
+"""
+Versioned builds and atomic publication of a collection.
+
+    <collection>/versions/<version>/   index.faiss, chunks.json, ... + build.json
+    <collection>/CURRENT               the active version, replaced atomically
+
+A build writes a fresh version directory (with the streaming pipeline's
+checkpoints, so an interrupted build resumes into the same directory). It
+then makes it live by replacing CURRENT. Readers resolve CURRENT once per
+load, so a query can never mix an index from one build with chunks from
+another. The previous KEEP_VERSIONS - 1 versions are kept; older ones are
+removed.
+
+start_rebuild() runs the build in a separate process (embedding and indexing
+never touch the server's event loop or GIL). The server only loads the
+finished version, in the background (see StoreCache). The child holds an
+flock on <collection>/.rebuild.lock, so one build per collection runs at a
+time across all server workers. Status is read from disk for the same
+reason.
+"""
+import asyncio
+import fcntl
+import json
+import multiprocessing
+import os
+import secrets
+import shutil
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import structlog
+
+from app.core.config import INDEX_BATCH_SIZE, INDEX_STORAGE, KEEP_VERSIONS
+from app.rag.pipeline import build_index_streaming, read_build_state
+from app.rag.stores import CollectionNotFound, active_version, collection_dir, collection_exists, stores
+
+log = structlog.get_logger()
+
+EXIT_BUSY = 3
+
+
+class RebuildRunning(RuntimeError):
+    pass
+
+
+@contextmanager
+def _build_lock(root: Path, wait_s: float = 0.0) -> Iterator[None]:
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / ".rebuild.lock", "a") as f:
+        give_up = time.monotonic() + wait_s
+        while True:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                # A status probe holds it for microseconds; a build holds it for minutes
+                if time.monotonic() >= give_up:
+                    raise RebuildRunning(root.name) from None
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def is_building(name: str) -> bool:
+    root = collection_dir(name)
+    if not (root / ".rebuild.lock").exists():
+        return False
+    try:
+        with _build_lock(root):
+            return False
+    except RebuildRunning:
+        return True
+
+
+def list_versions(name: str) -> List[str]:
+    versions = collection_dir(name) / "versions"
+    return sorted(p.name for p in versions.iterdir() if p.is_dir()) if versions.is_dir() else []
+
+
+def _pending_version(name: str) -> Optional[str]:
+    """Newest version with an unfinished build, to resume into."""
+    root = collection_dir(name)
+    active = active_version(name)[1] if collection_exists(name) else None
+    for version in reversed(list_versions(name)):
+        d = root / "versions" / version
+        if version != active and (d / ".build").exists() and not (d / "build.json").exists():
+            return version
+    return None
+
+
+def new_version() -> str:
+    # Sortable by time, unique across concurrent callers
+    return time.strftime("%Y%m%dT%H%M%S") + "-" + secrets.token_hex(2)
+
+
+def activate(name: str, version: str) -> None:
+    """Make `version` live: atomically replace CURRENT."""
+    root = collection_dir(name)
+    if not (root / "versions" / version / "index.faiss").exists():
+        raise FileNotFoundError(f"{name} has no finished version {version}")
+    tmp = root / "CURRENT.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, root / "CURRENT")
+    log.info("collection_activated", collection=name, version=version)
+
+
+def prune_versions(name: str, keep: int = KEEP_VERSIONS) -> List[str]:
+    """Remove finished versions older than the newest `keep`, never the active one."""
+    root = collection_dir(name)
+    active = active_version(name)[1]
+    finished = [v for v in list_versions(name) if (root / "versions" / v / "build.json").exists()]
+    removed = [v for v in finished[: max(0, len(finished) - keep)] if v != active]
+    for v in removed:
+        shutil.rmtree(root / "versions" / v, ignore_errors=True)
+    return removed
+
+
+def build_version(
+    name: str,
+    docs_dir: str,
+    storage: str = INDEX_STORAGE,
+    batch_size: int = INDEX_BATCH_SIZE,
+    resume: bool = True,
+    progress=None,
+    report=None,
+) -> Dict:
+    """Build `docs_dir` into a new version of `name`, then activate it. Runs in the caller's process."""
+    root = collection_dir(name)
+    with _build_lock(root, wait_s=2.0):
+        version = (_pending_version(name) if resume else None) or new_version()
+        out = root / "versions" / version
+        state = build_index_streaming(
+            docs_dir,
+            out_dir=str(out),
+            batch_size=batch_size,
+            storage=storage,
+            resume=resume,
+            progress=progress,
+            report=report,
+        )
+        state["version"] = version
+        (out / "build.json").write_text(json.dumps(state, indent=2), encoding="utf-8")
+        activate(name, version)
+        prune_versions(name)
+    return state
+
+
+def _worker(name: str, docs_dir: str, storage: str) -> None:
+    try:
+        build_version(name, docs_dir, storage=storage)
+    except RebuildRunning:
+        raise SystemExit(EXIT_BUSY)
+
+
+# Builds started by this server process: name -> (process, started_at, docs_dir)
+_running: Dict[str, tuple] = {}
+
+
+def start_rebuild(name: str, docs_dir: str, storage: str = INDEX_STORAGE) -> Dict:
+    """Start a build in a child process and return immediately."""
+    if not Path(docs_dir).is_dir():
+        raise FileNotFoundError(f"No such docs directory: {docs_dir}")
+    current = _running.get(name)
+    if (current is not None and current[0].is_alive()) or is_building(name):
+        raise RebuildRunning(name)
+
+    # spawn: a clean interpreter, not a fork of the server with its threads and sockets
+    proc = multiprocessing.get_context("spawn").Process(
+        target=_worker, args=(name, docs_dir, storage), name=f"rebuild-{name}"
+    )
+    proc.start()
+    _running[name] = (proc, time.time(), docs_dir)
+    log.info("rebuild_started", collection=name, pid=proc.pid, docs_dir=docs_dir, storage=storage)
+    return {"collection": name, "pid": proc.pid, "docs_dir": docs_dir, "storage": storage}
+
+
+def rebuild_status(name: str) -> Dict:
+    """Active version, what this worker serves, and the newest build's progress."""
+    try:
+        active: Optional[str] = active_version(name)[1]
+    except CollectionNotFound:
+        active = None
+    out: Dict = {
+        "collection": name,
+        "active_version": active,
+        "resident_version": stores.resident_version(name),
+        "building": is_building(name),
+        "versions": list_versions(name),
+    }
+
+    latest = out["versions"][-1] if out["versions"] else None
+    if latest is not None:
+        d = collection_dir(name) / "versions" / latest
+        build = d / "build.json"
+        state = json.loads(build.read_text(encoding="utf-8")) if build.exists() else read_build_state(str(d))
+        out["build"] = {"version": latest, **(state or {"status": "starting"})}
+
+    current = _running.get(name)
+    if current is not None:
+        proc, started_at, docs_dir = current
+        out["process"] = {
+            "pid": proc.pid,
+            "alive": proc.is_alive(),
+            "exitcode": proc.exitcode,
+            "started_at": started_at,
+            "docs_dir": docs_dir,
+        }
+        if proc.is_alive():
+            out["process"]["status"] = "running"
+        elif proc.exitcode == 0:
+            out["process"]["status"] = "done"
+        else:
+            out["process"]["status"] = "busy" if proc.exitcode == EXIT_BUSY else "failed"
+    return out
+
+
+async def wait_and_warm(name: str, poll_s: float = 1.0) -> None:
+    """Wait for this process's build of `name`, then load the new version before queries ask for it."""
+    current = _running.get(name)
+    if current is None:
+        return
+    proc = current[0]
+    while proc.is_alive():
+        await asyncio.sleep(poll_s)
+    if proc.exitcode == 0:
+        # A resident store triggers a background swap; a cold one is loaded here
+        await asyncio.to_thread(stores.get, name)
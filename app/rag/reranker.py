@@ -1,10 +1,12 @@
 from __future__ import annotations
-from typing import List, Dict
+from typing import List, Dict, Optional
 
-from app.core.llm_client import LLMClient
-
-llm = LLMClient()
+from app.core.bulkhead import UpstreamUnavailable
+from app.core.clients import get_llm
+from app.core.deadline import DeadlineExceeded
 
+# Sent as the system message, unchanged on every call, so it stays in the
+# provider's prompt cache; only the question and candidates vary.
 SYSTEM = """You are a strict reranker.
 You will be given a QUESTION and CANDIDATE PASSAGES.
 Return ONLY a JSON array of integers: the best passage indices in descending relevance.
@@ -12,15 +14,19 @@ Rules:
 - Choose up to N indices.
 - Prefer passages that directly answer the question.
 - Do not invent indices.
+Return JSON like: [3, 0, 5]
 """
 
-async def rerank(question: str, candidates: List[Dict], top_n: int = 5, request_id: str = "rerank") -> List[Dict]:
+CANDIDATE_CHARS = 400  # each passage is cut to this many characters in the prompt
+
+def rerank_prompt(question: str, candidates: List[Dict], top_n: int) -> str:
+    """The per-request user message; everything static lives in SYSTEM."""
     # build compact list for model
     items = []
     for i, c in enumerate(candidates):
-        items.append(f"{i}: {c['text'][:400]}")  # keep short to reduce tokens
+        items.append(f"{i}: {c['text'][:CANDIDATE_CHARS]}")  # keep short to reduce tokens
 
-    prompt = f"""
+    return f"""
 QUESTION:
 {question}
 
@@ -28,15 +34,31 @@ CANDIDATES:
 {chr(10).join(items)}
 
 N={top_n}
-
-Return JSON like: [3, 0, 5]
 """.strip()
 
+
+async def rerank(
+    question: str,
+    candidates: List[Dict],
+    top_n: int = 5,
+    request_id: str = "rerank",
+    deadline: Optional[float] = None,
+) -> List[Dict]:
+    """Falls back to the incoming (FAISS) order if the deadline passes or the chat upstream is unavailable."""
+    prompt = rerank_prompt(question, candidates, top_n)
+
     # Use your existing chat_with_tools but with no tools needed
-    reply, _ = await llm.chat_with_tools(
-        f"{SYSTEM}\n\n{prompt}",
-        request_id=request_id,
-    )
+    try:
+        reply, _ = await get_llm().chat_with_tools(
+            prompt,
+            request_id=request_id,
+            deadline=deadline,
+            system=SYSTEM,
+            cache_key="rerank",
+        )
+    except (DeadlineExceeded, UpstreamUnavailable):
+        # Keep the retrieval order rather than fail the whole answer
+        return candidates[:top_n]
 
     # Parse JSON safely
     import json
@@ -19,9 +19,10 @@ def chunk_resume(text: str, max_chars: int = 900) -> List[str]:
 
     current_heading = ""
     current = []
+    size = 0  # running len of the lines in `current`
 
     def flush():
-        nonlocal current, current_heading
+        nonlocal current, current_heading, size
         if current:
             body = "\n".join(current).strip()
             if current_heading:
@@ -29,6 +30,7 @@ def chunk_resume(text: str, max_chars: int = 900) -> List[str]:
             else:
                 blocks.append(body)
         current = []
+        size = 0
 
     for line in lines:
         if is_heading(line):
@@ -37,9 +39,10 @@ def chunk_resume(text: str, max_chars: int = 900) -> List[str]:
         else:
             if line.strip():
                 current.append(line)
+                size += len(line)
 
         # if block becomes too big, flush
-        if sum(len(x) for x in current) + len(current_heading) > max_chars:
+        if size + len(current_heading) > max_chars:
             flush()
 
     flush()
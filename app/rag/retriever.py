@@ -1,57 +1,168 @@
-import json
-from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import List, Dict, Mapping, Optional, Tuple
 
 import numpy as np
 import faiss
-from openai import OpenAI
 
-from app.core.config import OPENAI_API_KEY, OPENAI_EMBED_MODEL
+from app.core.config import (
+    OPENAI_EMBED_MODEL,
+    EMBED_BATCH_MAX_SIZE,
+    EMBED_BATCH_MAX_WAIT_MS,
+    DEFAULT_COLLECTION,
+    RESCORE_FACTOR,
+)
+from app.core.bulkhead import bulkheads
+from app.core.clients import get_openai, get_async_openai
+from app.core.deadline import with_deadline
+from app.core.tracing import span
+from app.core.metrics import Gauge
+from app.rag.embed_batcher import EmbeddingBatcher
+from app.rag.indexer import embed_kwargs
+from app.rag.quantize import filtered_first_pass, first_pass, fit_dims, rescore
+from app.rag.stores import Store, get_store, normalize_filters
 
 
 def embed_query(query: str) -> np.ndarray:
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    resp = client.embeddings.create(model=OPENAI_EMBED_MODEL, input=[query])
+    client = get_openai()
+    resp = client.embeddings.create(model=OPENAI_EMBED_MODEL, input=[query], **embed_kwargs())
     vec = np.array(resp.data[0].embedding, dtype="float32").reshape(1, -1)
     faiss.normalize_L2(vec)
     return vec
 
 
-def _resolve_store_dir(store_dir: str) -> Path:
-    p = Path(store_dir)
-    if p.is_absolute():
-        return p
+async def aembed_texts(texts: List[str], deadline: Optional[float] = None) -> np.ndarray:
+    """
+    Async batch embedding; rows are L2-normalized. deadline bounds both the
+    wait for an embeddings slot and the call itself (DeadlineExceeded).
+    """
+    client = get_async_openai()
+    async with bulkheads["embeddings"].slot(deadline):
+        resp = await with_deadline(
+            client.embeddings.create(model=OPENAI_EMBED_MODEL, input=texts, **embed_kwargs()), deadline, "embeddings"
+        )
+    vectors = np.array([e.embedding for e in resp.data], dtype="float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+_batcher: Optional[EmbeddingBatcher] = None
+
 
-    # Keep default store location stable regardless of current working directory.
-    project_root = Path(__file__).resolve().parents[2]
-    return project_root / p
+def get_embed_batcher() -> EmbeddingBatcher:
+    global _batcher
+    if _batcher is None:
+        _batcher = EmbeddingBatcher(aembed_texts, max_batch=EMBED_BATCH_MAX_SIZE, max_wait_ms=EMBED_BATCH_MAX_WAIT_MS)
+    return _batcher
 
 
-def load_store(store_dir: str = "rag_store") -> Tuple[faiss.Index, List[Dict]]:
-    resolved_dir = _resolve_store_dir(store_dir)
-    index = faiss.read_index(str(resolved_dir / "index.faiss"))
-    chunks = json.loads((resolved_dir / "chunks.json").read_text(encoding="utf-8"))
-    return index, chunks
+Gauge(
+    "embed_batcher",
+    "Query-embedding micro-batcher counters.",
+    ["stat"],
+    lambda: [((k,), v) for k, v in get_embed_batcher().stats().items()] if _batcher is not None else [],
+)
 
 
-def retrieve(query: str, k: int = 5, store_dir: str = "rag_store") -> List[Dict]:
-    index, chunks = load_store(store_dir)
-    q = embed_query(query)
-    scores, ids = index.search(q, k)
+async def aembed_query(query: str) -> np.ndarray:
+    """
+    Like embed_query, but concurrent callers are micro-batched into a single
+    embeddings request.
+    """
+    return await get_embed_batcher().embed(query)
 
+
+def _hits(chunks: List[Dict], scores: np.ndarray, ids: np.ndarray) -> List[Dict]:
     results = []
-    for rank, idx in enumerate(ids[0]):
+    for rank, idx in enumerate(ids):
         if idx == -1:
             continue
         c = chunks[int(idx)]
         results.append(
             {
                 "rank": rank + 1,
-                "score": float(scores[0][rank]),
+                "score": float(scores[rank]),
                 "chunk_id": c["chunk_id"],
                 "doc_id": c["doc_id"],
                 "source": c["source"],
                 "text": c["text"],
             }
         )
-    return results
\ No newline at end of file
+    return results
+
+
+def search_store(
+    store: Store, query_vecs: np.ndarray, k: int, filters: Optional[Mapping] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    index.search, restricted to chunks matching `filters` ({doc_id, source,
+    doc_type}: value or list of values). The restriction is an IDSelector
+    applied inside the scan, so k hits come back however selective it is.
+
+    Compact stores (fp16/sq8/binary) fetch RESCORE_FACTOR * k candidates and
+    return them re-scored against the exact vectors, so scores stay cosines.
+    """
+    q = fit_dims(np.ascontiguousarray(query_vecs, dtype="float32"), store.dim)
+    allowed, params = store.search_params(normalize_filters(filters))
+    if params is not None and len(allowed) == 0:
+        return np.zeros((len(q), k), dtype="float32"), np.full((len(q), k), -1, dtype="int64")
+
+    if store.vectors is None:
+        if params is None:
+            return store.index.search(q, k)
+        return store.index.search(q, min(k, len(allowed)), params=params)
+
+    fetch = min(k * RESCORE_FACTOR, store.index.ntotal)
+    if params is not None and len(allowed) <= fetch:
+        # Few enough matches to score them all exactly
+        return rescore(store.vectors, q, np.broadcast_to(allowed, (len(q), len(allowed))), k)
+    if params is not None and store.storage == "binary":
+        # Binary indexes take no IDSelector: oversampled Hamming pass, then post-filter
+        candidates = filtered_first_pass(store.index, q, fetch, allowed)
+    else:
+        candidates = first_pass(store.index, store.storage, q, fetch, params)
+    return rescore(store.vectors, q, candidates, k)
+
+
+def retrieve(
+    query: str,
+    k: int = 5,
+    collection: str = DEFAULT_COLLECTION,
+    query_vec: Optional[np.ndarray] = None,
+    filters: Optional[Mapping] = None,
+    store: Optional[Store] = None,
+) -> List[Dict]:
+    """
+    query_vec: a normalized embedding of `query` computed earlier in the request
+    (e.g. by route_node), so we don't pay for a second embeddings call.
+    filters: see search_store.
+    store: the Store returned by ensure_loaded(collection); looked up when omitted.
+    """
+    if store is None:
+        with span("load_store", collection=collection):
+            store = get_store(collection)
+    if query_vec is not None:
+        q = query_vec
+    else:
+        with span("embed"):
+            q = embed_query(query)
+    with span("faiss_search", k=k, filtered=bool(filters)):
+        scores, ids = search_store(store, q, k, filters)
+    return _hits(store.chunks, scores[0], ids[0])
+
+
+def search_vectors(
+    query_vecs: np.ndarray,
+    k: int = 5,
+    collection: str = DEFAULT_COLLECTION,
+    filters: Optional[Mapping] = None,
+    store: Optional[Store] = None,
+) -> List[List[Dict]]:
+    """
+    Batch search: one index.search over an (n, dim) matrix of normalized query
+    vectors. Returns one hit list per row. store: as in retrieve.
+    """
+    if store is None:
+        with span("load_store", collection=collection):
+            store = get_store(collection)
+    with span("faiss_search", k=k, batch=len(query_vecs), filtered=bool(filters)):
+        scores, ids = search_store(store, query_vecs, k, filters)
+    return [_hits(store.chunks, scores[i], ids[i]) for i in range(len(ids))]
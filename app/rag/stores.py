@@ -0,0 +1,338 @@
+"""
+Named vector collections, loaded on first use and kept resident under a
+memory budget (STORE_MEMORY_BUDGET_MB) with LRU eviction.
+
+"default" is RAG_STORE_DIR (rag_store/), any other collection is
+COLLECTIONS_DIR/<name>/ — each built independently with
+`python -m app.rag.build_index --collection <name> --docs <dir>`.
+
+Builds go to <collection>/versions/<version>/ and are published by atomically
+replacing <collection>/CURRENT (see app/rag/rebuild.py), so index and chunks
+always come from the same build. A directory without CURRENT holds a single
+unversioned store (its version is the index.faiss mtime).
+
+When the active version changes, queries keep getting the resident store
+while the new one loads in a background thread; it is swapped in once ready.
+Compact layouts (see app/rag/quantize.py) count only the resident index and
+chunks against the budget; their exact vectors stay memory-mapped.
+"""
+import asyncio
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+import faiss
+import numpy as np
+import structlog
+
+from app.core.config import COLLECTIONS_DIR, DEFAULT_COLLECTION, RAG_STORE_DIR, STORE_MEMORY_BUDGET_MB
+from app.core.metrics import Gauge
+from app.core.tracing import span
+from app.rag.quantize import read_index
+
+log = structlog.get_logger()
+
+COLLECTION_NAME = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")
+
+
+class CollectionNotFound(KeyError):
+    pass
+
+
+def _resolve_store_dir(store_dir: str) -> Path:
+    p = Path(store_dir)
+    if p.is_absolute():
+        return p
+
+    # Keep default store location stable regardless of current working directory.
+    project_root = Path(__file__).resolve().parents[2]
+    return project_root / p
+
+
+def _active(root: Path) -> Tuple[Path, str]:
+    """(directory holding the live index + chunks, its version) for a collection root."""
+    try:
+        version = (root / "CURRENT").read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return root, str((root / "index.faiss").stat().st_mtime_ns)
+    return root / "versions" / version, version
+
+
+def load_store(store_dir: str = RAG_STORE_DIR) -> Tuple[faiss.Index, List[Dict]]:
+    resolved_dir, _ = _active(_resolve_store_dir(store_dir))
+    index, _, _ = read_index(resolved_dir)
+    chunks = json.loads((resolved_dir / "chunks.json").read_text(encoding="utf-8"))
+    return index, chunks
+
+
+def collection_dir(name: str) -> Path:
+    if name == DEFAULT_COLLECTION:
+        return _resolve_store_dir(RAG_STORE_DIR)
+    if not COLLECTION_NAME.match(name):
+        raise CollectionNotFound(name)
+    return _resolve_store_dir(COLLECTIONS_DIR) / name
+
+
+def active_version(name: str) -> Tuple[Path, str]:
+    """(directory, version) currently published for `name`."""
+    try:
+        return _active(collection_dir(name))
+    except FileNotFoundError:
+        raise CollectionNotFound(name) from None
+
+
+def collection_exists(name: str) -> bool:
+    try:
+        active_version(name)
+    except CollectionNotFound:
+        return False
+    return True
+
+
+def list_collections() -> List[str]:
+    names = [DEFAULT_COLLECTION] if collection_exists(DEFAULT_COLLECTION) else []
+    root = _resolve_store_dir(COLLECTIONS_DIR)
+    if root.is_dir():
+        names += sorted(p.name for p in root.iterdir() if COLLECTION_NAME.match(p.name) and collection_exists(p.name))
+    return names
+
+
+# -------------------------
+# Metadata filters
+# -------------------------
+FILTER_FIELDS = ("doc_id", "source", "doc_type")
+MAX_CACHED_SELECTORS = 256
+
+Filters = Dict[str, Tuple[str, ...]]
+
+
+def doc_type(chunk: Dict) -> str:
+    return Path(chunk["source"]).suffix.lower().lstrip(".") or "unknown"
+
+
+def normalize_filters(filters: Optional[Mapping[str, Union[str, Iterable[str]]]]) -> Filters:
+    """{"doc_type": "pdf", "doc_id": ["a", "b"]} -> {"doc_id": ("a", "b"), "doc_type": ("pdf",)}"""
+    out: Filters = {}
+    for key, values in (filters or {}).items():
+        if key not in FILTER_FIELDS:
+            raise ValueError(f"Unknown filter field: {key} (expected one of {', '.join(FILTER_FIELDS)})")
+        if values is None:
+            continue
+        values = (values,) if isinstance(values, str) else tuple(values)
+        out[key] = tuple(sorted(set(values)))
+    return dict(sorted(out.items()))
+
+
+@dataclass
+class Store:
+    name: str
+    index: faiss.Index
+    chunks: List[Dict]
+    nbytes: int
+    version: str  # build version (or index.faiss mtime_ns for an unversioned store)
+    storage: str = "flat"
+    vectors: Optional[np.ndarray] = None  # exact float32 rows (memory-mapped) for compact storage
+    # field -> value -> sorted int64 ids, precomputed once per load
+    facets: Dict[str, Dict[str, np.ndarray]] = field(init=False)
+    rows: Dict[str, int] = field(init=False, repr=False)  # chunk_id -> index row
+    _selectors: "OrderedDict[tuple, Tuple[np.ndarray, faiss.IDSelector]]" = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        lists: Dict[str, Dict[str, List[int]]] = {f: {} for f in FILTER_FIELDS}
+        self.rows = {}
+        for i, c in enumerate(self.chunks):
+            self.rows[c["chunk_id"]] = i
+            lists["doc_id"].setdefault(c["doc_id"], []).append(i)
+            lists["source"].setdefault(c["source"], []).append(i)
+            lists["doc_type"].setdefault(doc_type(c), []).append(i)
+        self.facets = {f: {v: np.asarray(ids, dtype="int64") for v, ids in d.items()} for f, d in lists.items()}
+        self._selectors = OrderedDict()
+
+    def select_ids(self, filters: Filters) -> np.ndarray:
+        """Ids matching every field (any of the values within a field)."""
+        ids: Optional[np.ndarray] = None
+        for key, values in filters.items():
+            facet = self.facets[key]
+            matched = [facet[v] for v in values if v in facet]
+            field_ids = np.unique(np.concatenate(matched)) if matched else np.empty(0, dtype="int64")
+            ids = field_ids if ids is None else np.intersect1d(ids, field_ids, assume_unique=True)
+        return np.arange(self.index.ntotal, dtype="int64") if ids is None else ids
+
+    @property
+    def dim(self) -> int:
+        return self.index.d
+
+    def vectors_for(self, rows: np.ndarray) -> np.ndarray:
+        """Normalized float32 vectors of the given index rows, as one (n, dim) matrix."""
+        if self.vectors is not None:
+            return np.asarray(self.vectors[rows], dtype="float32")
+        return self.index.reconstruct_batch(rows)
+
+    def search_params(self, filters: Filters) -> Tuple[np.ndarray, Optional[faiss.SearchParameters]]:
+        """(matching ids, SearchParameters restricting the scan to them); None when unfiltered."""
+        if not filters:
+            return np.empty(0, dtype="int64"), None
+        key = tuple(filters.items())
+        cached = self._selectors.get(key)
+        if cached is None:
+            ids = self.select_ids(filters)
+            cached = (ids, faiss.IDSelectorBatch(ids))
+            self._selectors[key] = cached
+            if len(self._selectors) > MAX_CACHED_SELECTORS:
+                self._selectors.popitem(last=False)
+        else:
+            self._selectors.move_to_end(key)
+        ids, selector = cached
+        return ids, faiss.SearchParameters(sel=selector)
+
+
+class StoreCache:
+    def __init__(self, budget_bytes: int) -> None:
+        self.budget_bytes = budget_bytes
+        self._stores: "OrderedDict[str, Store]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: Dict[str, threading.Lock] = {}
+        self._refreshing: set = set()
+        self.hits = 0
+        self.loads = 0
+        self.swaps = 0
+        self.evictions = 0
+
+    def is_resident(self, name: str) -> bool:
+        # Any version counts: a stale store keeps serving while its successor loads
+        return name in self._stores
+
+    def get(self, name: str) -> Store:
+        path, version = active_version(name)
+        with self._lock:
+            store = self._stores.get(name)
+            if store is not None:
+                self._stores.move_to_end(name)
+                self.hits += 1
+                if store.version != version:
+                    self._refresh_in_background(name, path, version)
+                return store
+            loading = self._loading.setdefault(name, threading.Lock())
+
+        # One loader per collection; others wait for it instead of loading twice
+        with loading:
+            with self._lock:
+                store = self._stores.get(name)
+                if store is not None:
+                    self._stores.move_to_end(name)
+                    self.hits += 1
+                    return store
+            store = self._load(name, path, version)
+            with self._lock:
+                self._stores[name] = store
+                self._stores.move_to_end(name)
+                self.loads += 1
+                self._evict(keep=name)
+            return store
+
+    def _refresh_in_background(self, name: str, path: Path, version: str) -> None:
+        # Called with self._lock held
+        if name in self._refreshing:
+            return
+        self._refreshing.add(name)
+        threading.Thread(
+            target=self._refresh, args=(name, path, version), name=f"store-refresh-{name}", daemon=True
+        ).start()
+
+    def _refresh(self, name: str, path: Path, version: str) -> None:
+        try:
+            store = self._load(name, path, version)
+            with self._lock:
+                old = self._stores.get(name)
+                self._stores[name] = store
+                self._stores.move_to_end(name)
+                self.loads += 1
+                self.swaps += 1
+                self._evict(keep=name)
+            log.info("store_swapped", collection=name, version=version, previous=old.version if old else None)
+        except Exception as e:
+            # Keep serving the resident version; the next query retries
+            log.error("store_refresh_failed", collection=name, version=version, error=str(e))
+        finally:
+            with self._lock:
+                self._refreshing.discard(name)
+
+    def _load(self, name: str, d: Path, version: str) -> Store:
+        start = time.perf_counter()
+        index, vectors, meta = read_index(d)
+        chunks = json.loads((d / "chunks.json").read_text(encoding="utf-8"))
+        # On-disk size is a close proxy for resident size (index codes + chunk text)
+        nbytes = (d / "index.faiss").stat().st_size + (d / "chunks.json").stat().st_size
+        storage = meta.get("storage", "flat")
+        log.info(
+            "store_loaded",
+            collection=name,
+            version=version,
+            storage=storage,
+            vectors=index.ntotal,
+            mb=round(nbytes / 1e6, 1),
+            ms=round((time.perf_counter() - start) * 1000.0, 1),
+        )
+        return Store(
+            name=name, index=index, chunks=chunks, nbytes=nbytes, version=version, storage=storage, vectors=vectors
+        )
+
+    def _evict(self, keep: str) -> None:
+        while self.resident_bytes() > self.budget_bytes and len(self._stores) > 1:
+            name, store = next(iter(self._stores.items()))
+            if name == keep:
+                break
+            del self._stores[name]
+            self.evictions += 1
+            log.info("store_evicted", collection=name, mb=round(store.nbytes / 1e6, 1))
+
+    def resident_bytes(self) -> int:
+        return sum(s.nbytes for s in self._stores.values())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stores.clear()
+
+    def resident(self) -> List[str]:
+        return list(self._stores)
+
+    def resident_version(self, name: str) -> Optional[str]:
+        store = self._stores.get(name)
+        return store.version if store is not None else None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "resident": len(self._stores),
+            "resident_bytes": self.resident_bytes(),
+            "hits": self.hits,
+            "loads": self.loads,
+            "swaps": self.swaps,
+            "evictions": self.evictions,
+        }
+
+
+stores = StoreCache(int(STORE_MEMORY_BUDGET_MB * 1024 * 1024))
+
+Gauge(
+    "vector_store",
+    "Resident collections and LRU counters.",
+    ["stat"],
+    lambda: [((k,), v) for k, v in stores.stats().items()],
+)
+
+
+def get_store(name: str = DEFAULT_COLLECTION) -> Store:
+    return stores.get(name)
+
+
+async def ensure_loaded(name: str = DEFAULT_COLLECTION) -> Store:
+    """Load a cold collection in a worker thread so the event loop keeps serving. Returns the store."""
+    if not stores.is_resident(name):
+        with span("store_load", collection=name):
+            return await asyncio.to_thread(stores.get, name)
+    return stores.get(name)
@@ -1,17 +1,29 @@
 from __future__ import annotations
 
-from typing import TypedDict, List, Dict, Optional, Literal
+import asyncio
+import re
+from typing import Any, AsyncIterator, TypedDict, List, Dict, Optional, Literal, Tuple
 import structlog
 
-from langgraph.graph import StateGraph, END
-
-from app.rag.retriever import retrieve
+from app.rag.retriever import retrieve, aembed_query, aembed_texts, search_vectors
+from app.rag.stores import ensure_loaded, normalize_filters
 from app.core.guardrails import is_unsafe_user_input
 from app.core.rate_limit import RateLimiter
-from app.core.llm_client import LLMClient
+from app.core.single_flight import SingleFlight
+from app.core.bulkhead import UpstreamUnavailable
+from app.core.clients import get_llm
 from app.core.tool_client import ToolClient
-from app.core.config import TOP_K, MIN_SCORE, RETRIEVE_K, RERANK_TOP_N, MIN_SCORE
+from app.core.config import (
+    TOP_K, MIN_SCORE, RETRIEVE_K, RERANK_TOP_N, BATCH_CONCURRENCY,
+    REQUEST_TIMEOUT_S, RERANK_MIN_BUDGET_S, ANSWER_MIN_BUDGET_S,
+    CHAT_RATE_LIMIT, CHAT_RATE_WINDOW_S, DEFAULT_COLLECTION,
+)
+from app.core.deadline import DeadlineExceeded, deadline_after, has_budget, remaining, with_deadline
+from app.core.tracing import span, start_trace, finish_trace, traced_node
+from app.core.metrics import Gauge, QA_REQUESTS, RATE_LIMITED, GUARDRAIL_BLOCKS
 from app.rag.reranker import rerank
+from app.rag.mmr import diversify
+from app.workflows.route_classifier import get_route_classifier
 from pathlib import Path
 
 log = structlog.get_logger()
@@ -23,10 +35,17 @@ class QAState(TypedDict, total=False):
     request_id: str
     user_message: str
     client_key: str
+    deadline: float                # absolute time.monotonic(); every node/call must finish by then
+    collection: str                # vector collection to search (see app/rag/stores.py)
+    filters: Dict[str, Any]        # metadata filters for retrieval (doc_id / source / doc_type)
 
     route: Route
 
+    # Normalized query embedding, computed once in route_node and reused
+    query_vec: Any
+
     # RAG
+    candidates: List[Dict]         # RETRIEVE_K hits from the single FAISS search
     retrieved: List[Dict]          # your retrieve() returns dicts with text/source/etc.
 
     # Tools (MCP)
@@ -38,66 +57,127 @@ class QAState(TypedDict, total=False):
     meta: Dict
 
 
-llm = LLMClient()
 tools = ToolClient()
-limiter = RateLimiter(max_requests=2, window_seconds=60)
+limiter = RateLimiter(max_requests=CHAT_RATE_LIMIT, window_seconds=CHAT_RATE_WINDOW_S)
+flights = SingleFlight()
+
+Gauge(
+    "qa_singleflight",
+    "Single-flight coalescing of identical /chat questions.",
+    ["stat"],
+    lambda: [((k,), v) for k, v in flights.stats().items()],
+)
+
+
+def _unsafe_input() -> QAState:
+    GUARDRAIL_BLOCKS.inc()
+    return {
+        "route": "blocked",
+        "answer": "I can’t help with that request.",
+        "citations": [],
+        "meta": {"blocked": True, "reason": "unsafe_input"},
+    }
+
+
+def _rate_limited() -> QAState:
+    return {
+        "route": "blocked",
+        "answer": "Too many requests. Please slow down.",
+        "citations": [],
+        "meta": {"blocked": True, "reason": "rate_limited"},
+    }
 
 
 # -------------------------
 # Node 1: Guard + Route
+# (per-client rate limiting happens in run_qa_workflow)
 # -------------------------
 async def route_node(state: QAState) -> QAState:
     msg = state["user_message"]
-    client_key = state.get("client_key", "unknown")
-
-    if not limiter.allow(client_key):
-        return {
-            "route": "blocked",
-            "answer": "Too many requests. Please slow down.",
-            "citations": [],
-            "meta": {"blocked": True, "reason": "rate_limited"},
-        }
 
     # quick safety gate (cheap)
     if is_unsafe_user_input(msg):
-        return {
-            "route": "blocked",
-            "answer": "I can’t help with that request.",
-            "citations": [],
-            "meta": {"blocked": True, "reason": "unsafe_input"},
-        }
-
-    m = msg.lower()
+        return _unsafe_input()
 
-    # 🔥 Retrieval-based routing (best)
+    # Embed and search once: the same vector and hits drive routing and rag_node.
+    # (run_qa_batch precomputes both for a whole batch.)
+    query_vec = state.get("query_vec")
+    candidates = state.get("candidates")
+    out_of_time: Dict[str, Any] = {}
     try:
-        candidates = retrieve(msg, k=TOP_K)
+        if query_vec is None:
+            with span("embed"):
+                query_vec = await with_deadline(aembed_query(msg), state.get("deadline"), "query embedding")
+        if candidates is None:
+            if not has_budget(state.get("deadline"), ANSWER_MIN_BUDGET_S):
+                raise DeadlineExceeded("no budget left for retrieval")
+            collection = state.get("collection", DEFAULT_COLLECTION)
+            store = await ensure_loaded(collection)
+            candidates = retrieve(
+                msg,
+                k=max(TOP_K, RETRIEVE_K),
+                collection=collection,
+                query_vec=query_vec,
+                filters=state.get("filters"),
+                store=store,
+            )
         top_score = candidates[0]["score"] if candidates else 0.0
+    except DeadlineExceeded:
+        # rag_node must not retrieve without budget either; it answers timed out
+        top_score = 0.0
+        out_of_time = {"retrieval_skipped": "deadline"}
+    except UpstreamUnavailable:
+        # Circuit open / overloaded: shed the request (429/503 + Retry-After) rather
+        # than route by keywords into a downstream call that fails the same way
+        raise
     except Exception:
         top_score = 0.0
 
-    if top_score >= MIN_SCORE:
-        return {"route": "rag", "meta": {"route": "rag", "top_score": top_score}}
-
-    # Heuristic routing (cheap + predictable).
-    # Later we can replace this with a tiny LLM classifier node.
-    is_math = any(x in m for x in ["*", "multiply", "add", "sum", "plus"])
-    is_knowledge = any(x in m for x in [
-        "policy", "sop", "document", "docs", "on-call", "runbook", "guide",
-        "resume", "cv", "profile", "experience", "skills", "projects", "education",
-        "summary", "strengths", "achievements"
-    ])
+    classifier = get_route_classifier()
+    if classifier is not None and query_vec is not None:
+        with span("classify"):
+            route, route_score = classifier.classify(query_vec)
+        # Documents cover it even though it reads like small talk
+        if route == "llm" and top_score >= MIN_SCORE:
+            route = "rag"
+        return {
+            "route": route,
+            "query_vec": query_vec,
+            "candidates": candidates,
+            "meta": {"route": route, "route_score": round(route_score, 4), "top_score": top_score, **out_of_time},
+        }
 
-    if is_math and is_knowledge:
-        route: Route = "hybrid"
-    elif is_math:
-        route = "tool"
-    elif is_knowledge:
+    # Fallback when the classifier isn't loaded (e.g. startup embedding failed)
+    if top_score >= MIN_SCORE:
         route = "rag"
+        meta = {"route": route, "top_score": top_score}
     else:
-        route = "llm"
+        route = _keyword_route(msg)
+        meta = {"route": route}
+    return {"route": route, "query_vec": query_vec, "candidates": candidates, "meta": {**meta, **out_of_time}}
+
+
+MATH_WORDS = {"multiply", "times", "add", "sum", "plus", "product", "total"}
+KNOWLEDGE_WORDS = {
+    "policy", "sop", "document", "docs", "on-call", "runbook", "guide",
+    "resume", "cv", "profile", "experience", "skills", "projects", "education",
+    "summary", "strengths", "achievements",
+}
 
-    return {"route": route, "meta": {"route": route}}
+
+def _keyword_route(msg: str) -> Route:
+    # Whole-word matching so "add" doesn't match "address"
+    words = set(re.findall(r"[a-z][a-z-]*", msg.lower()))
+    is_math = bool(words & MATH_WORDS) or bool(re.search(r"\d\s*[*x+]\s*\d", msg))
+    is_knowledge = bool(words & KNOWLEDGE_WORDS)
+
+    if is_math and is_knowledge:
+        return "hybrid"
+    if is_math:
+        return "tool"
+    if is_knowledge:
+        return "rag"
+    return "llm"
 
 
 # -------------------------
@@ -107,8 +187,27 @@ async def rag_node(state: QAState) -> QAState:
     q = state["user_message"]
     request_id = state["request_id"]
 
-    # 1) Retrieve more candidates
-    candidates = retrieve(q, k=RETRIEVE_K)
+    deadline = state.get("deadline")
+
+    # 1) Retrieve more candidates (already fetched by route_node when possible)
+    candidates = state.get("candidates")
+    if candidates is None and not has_budget(deadline, ANSWER_MIN_BUDGET_S):
+        meta = {**state.get("meta", {}), "retrieval_skipped": "deadline"}
+        return {"retrieved": [], "citations": [], "meta": meta}
+    if candidates is None:
+        try:
+            query_vec = state.get("query_vec")
+            if query_vec is None:
+                with span("embed"):
+                    query_vec = await with_deadline(aembed_query(q), deadline, "query embedding")
+            collection = state.get("collection", DEFAULT_COLLECTION)
+            store = await ensure_loaded(collection)
+            candidates = retrieve(
+                q, k=RETRIEVE_K, collection=collection, query_vec=query_vec, filters=state.get("filters"), store=store
+            )
+        except DeadlineExceeded:
+            candidates = []
+    candidates = candidates[:RETRIEVE_K]
 
     # 2) Keep only candidates above MIN_SCORE
     strong = [r for r in candidates if r["score"] >= MIN_SCORE]
@@ -116,10 +215,28 @@ async def rag_node(state: QAState) -> QAState:
     if not strong:
         return {"retrieved": [], "citations": [], "meta": {**state.get("meta", {}), "no_context_found": True}}
 
-    # 3) Rerank down to best N
-    top = await rerank(q, strong, top_n=RERANK_TOP_N, request_id=f"{request_id}:rerank")
-
-    # 4) Clean citations (just filename, not full path)
+    # 3) Drop near-duplicate neighbours before anything reads their text.
+    #    (The store may have been evicted since retrieval: reload it off the loop.)
+    store = await ensure_loaded(state.get("collection", DEFAULT_COLLECTION))
+    with span("mmr", candidates=len(strong)):
+        strong, mmr_meta = diversify(strong, store)
+
+    # 4) Rerank down to best N. When time is short keep FAISS order instead,
+    #    and never let the rerank eat the budget reserved for the answer.
+    rerank_skipped = not has_budget(deadline, RERANK_MIN_BUDGET_S)
+    if rerank_skipped:
+        top = strong[:RERANK_TOP_N]
+    else:
+        with span("rerank", candidates=len(strong)):
+            top = await rerank(
+                q,
+                strong,
+                top_n=RERANK_TOP_N,
+                request_id=f"{request_id}:rerank",
+                deadline=deadline - ANSWER_MIN_BUDGET_S if deadline is not None else None,
+            )
+
+    # 5) Clean citations (just filename, not full path)
     citations = []
     for i, r in enumerate(top, start=1):
         citations.append({
@@ -138,6 +255,8 @@ async def rag_node(state: QAState) -> QAState:
             "rerank_top_n": RERANK_TOP_N,
             "min_score": MIN_SCORE,
             "retrieval_count": len(top),
+            **mmr_meta,
+            **({"rerank_skipped": "deadline"} if rerank_skipped else {}),
         },
     }
     
@@ -153,7 +272,12 @@ async def tool_node(state: QAState) -> QAState:
     user_message = state["user_message"]
 
     # This will auto-call tools (add/multiply) when needed and return final answer.
-    answer, meta = await llm.chat_with_tools(user_message, request_id=request_id)
+    try:
+        answer, meta = await get_llm().chat_with_tools(
+            user_message, request_id=request_id, deadline=state.get("deadline"), cache_key="chat"
+        )
+    except DeadlineExceeded:
+        return _timed_out(state)
     return {"answer": answer, "meta": {**state.get("meta", {}), **meta}}
 
 
@@ -172,37 +296,51 @@ async def blocked_node(state: QAState) -> QAState:
 # -------------------------
 # Node 4: Synthesize using RAG context
 # -------------------------
+# System prompts are constants (never formatted per request) so the provider's
+# prompt cache can reuse them; context and question go in the user message.
+RAG_SYSTEM = """You MUST answer using ONLY the provided context.
+- If the answer is not explicitly present in the context, reply exactly:
+"I don't know based on the provided documents."
+- When you use a piece of context, cite it as [1], [2] etc based on the context rank."""
+
+HYBRID_SYSTEM = """You are a helpful assistant.
+- Use the provided context for policy/process facts.
+- Use tools for exact calculations if needed.
+- If something is missing from context, say you don't know.
+- Answer with citations like [1], [2] when you use context."""
+
+
+def rag_prompt(question: str, retrieved: List[Dict]) -> str:
+    context = "\n\n".join(f"[{i}] ({Path(r['source']).name}) {r['text']}" for i, r in enumerate(retrieved, start=1))
+    return f"Context:\n{context}\n\nQuestion:\n{question}"
+
+
+def hybrid_prompt(question: str, retrieved: List[Dict]) -> str:
+    context = "\n\n".join(f"[{r['rank']}] ({r['source']}) {r['text']}" for r in retrieved)
+    return f"Context:\n{context}\n\nUser question:\n{question}"
+
+
 async def rag_synthesize_node(state: QAState) -> QAState:
     request_id = state["request_id"]
     q = state["user_message"]
     retrieved = state.get("retrieved", [])
 
+    if not retrieved and state.get("meta", {}).get("retrieval_skipped") == "deadline":
+        return _timed_out(state)
     if not retrieved:
         return {
             "answer": "I don't know based on the provided documents.",
             "meta": {**state.get("meta", {}), "no_context_found": True},
         }
 
-    context_parts = []
-    for i, r in enumerate(retrieved, start=1):
-        src = Path(r["source"]).name
-        context_parts.append(f"[{i}] ({src}) {r['text']}")
-    context = "\n\n".join(context_parts)
-
-    prompt = f"""
-        You MUST answer using ONLY the provided context.
-        - If the answer is not explicitly present in the context, reply exactly:
-        "I don't know based on the provided documents."
-        - When you use a piece of context, cite it as [1], [2] etc based on the context rank.
-
-        Context:
-        {context}
-
-        Question:
-        {q}
-        """.strip()
+    prompt = rag_prompt(q, retrieved)
 
-    answer, meta = await llm.chat_with_tools(prompt, request_id=request_id)
+    try:
+        answer, meta = await get_llm().chat_with_tools(
+            prompt, request_id=request_id, deadline=state.get("deadline"), system=RAG_SYSTEM, cache_key="rag_answer"
+        )
+    except DeadlineExceeded:
+        return _timed_out(state, retrieved)
     return {"answer": answer, "meta": {**state.get("meta", {}), **meta}}
 
 
@@ -219,90 +357,266 @@ async def hybrid_node(state: QAState) -> QAState:
     q = state["user_message"]
     retrieved = state.get("retrieved", [])
 
+    if not retrieved and state.get("meta", {}).get("retrieval_skipped") == "deadline":
+        return _timed_out(state)
     if not retrieved:
         return {
             "answer": "I don't know based on the provided documents.",
             "meta": {**state.get("meta", {}), "no_context_found": True},
         }
 
-    context = "\n\n".join(
-        [f"[{r['rank']}] ({r['source']}) {r['text']}" for r in retrieved]
-    )
-
-    prompt = f"""
-You are a helpful assistant.
-- Use the provided context for policy/process facts.
-- Use tools for exact calculations if needed.
-- If something is missing from context, say you don't know.
+    prompt = hybrid_prompt(q, retrieved)
 
-Context:
-{context}
+    try:
+        answer, meta = await get_llm().chat_with_tools(
+            prompt,
+            request_id=request_id,
+            deadline=state.get("deadline"),
+            system=HYBRID_SYSTEM,
+            cache_key="hybrid_answer",
+        )
+    except DeadlineExceeded:
+        return _timed_out(state, retrieved)
+    return {"answer": answer, "meta": {**state.get("meta", {}), **meta}}
 
-User question:
-{q}
 
-Answer with citations like [1], [2] when you use context.
-""".strip()
+def _timed_out(state: QAState, retrieved: Optional[List[Dict]] = None) -> QAState:
+    """
+    Graceful degradation when the request deadline passes mid-answer:
+    return the best passages we already have instead of an error.
+    """
+    meta = {**state.get("meta", {}), "deadline_exceeded": True, "partial": True}
+    if not retrieved:
+        return {"answer": "Sorry, I ran out of time answering this. Please try again.", "meta": meta}
 
-    answer, meta = await llm.chat_with_tools(prompt, request_id=request_id)
-    return {"answer": answer, "meta": {**state.get("meta", {}), **meta}}
+    lines = ["I ran out of time writing a full answer. The most relevant passages are:"]
+    for i, r in enumerate(retrieved[:3], start=1):
+        lines.append(f"[{i}] {r['text'][:300].strip()}")
+    return {"answer": "\n".join(lines), "meta": meta}
 
 
 # -------------------------
-# Build graph
+# Build graph (compiled on first use, or during app startup)
 # -------------------------
-graph = StateGraph(QAState)
-
-graph.add_node("route", route_node)
-graph.add_node("blocked", blocked_node)
-graph.add_node("rag_retrieve", rag_node)
-graph.add_node("tool_answer", tool_node)
-graph.add_node("rag_answer", rag_synthesize_node)
-graph.add_node("hybrid_answer", hybrid_node)
-
-graph.set_entry_point("route")
-
-# Conditional routing
-graph.add_conditional_edges(
-    "route",
-    lambda s: s.get("route", "llm"),
-    {
-        "blocked": "blocked",
-        "rag": "rag_retrieve",
-        "tool": "tool_answer",
-        "hybrid": "rag_retrieve",
-        "llm": "tool_answer",  # tool_answer uses llm.chat_with_tools; it will just answer without tools if none needed
-    },
-)
+_workflow = None
 
-# After retrieval: decide rag vs hybrid
-graph.add_conditional_edges(
-    "rag_retrieve",
-    lambda s: s.get("route", "rag"),
-    {
-        "rag": "rag_answer",
-        "hybrid": "hybrid_answer",
-    },
-)
 
-graph.add_edge("tool_answer", END)
-graph.add_edge("rag_answer", END)
-graph.add_edge("hybrid_answer", END)
-graph.add_edge("blocked", END)
+def _build_workflow():
+    from langgraph.graph import StateGraph, END
 
-workflow = graph.compile()
+    graph = StateGraph(QAState)
 
+    graph.add_node("route", traced_node("route", route_node))
+    graph.add_node("blocked", traced_node("blocked", blocked_node))
+    graph.add_node("rag_retrieve", traced_node("rag_retrieve", rag_node))
+    graph.add_node("tool_answer", traced_node("tool_answer", tool_node))
+    graph.add_node("rag_answer", traced_node("rag_answer", rag_synthesize_node))
+    graph.add_node("hybrid_answer", traced_node("hybrid_answer", hybrid_node))
 
-# Public API
-async def run_qa_workflow(user_message: str, request_id: str, client_key: str) -> QAState:
-    result: QAState = await workflow.ainvoke(
-        {"user_message": user_message, "request_id": request_id, "client_key": client_key}
+    graph.set_entry_point("route")
+
+    # Conditional routing
+    graph.add_conditional_edges(
+        "route",
+        lambda s: s.get("route", "llm"),
+        {
+            "blocked": "blocked",
+            "rag": "rag_retrieve",
+            "tool": "tool_answer",
+            "hybrid": "rag_retrieve",
+            "llm": "tool_answer",  # tool_answer uses llm.chat_with_tools; it will just answer without tools if none needed
+        },
+    )
+
+    # After retrieval: decide rag vs hybrid
+    graph.add_conditional_edges(
+        "rag_retrieve",
+        lambda s: s.get("route", "rag"),
+        {
+            "rag": "rag_answer",
+            "hybrid": "hybrid_answer",
+        },
     )
+
+    graph.add_edge("tool_answer", END)
+    graph.add_edge("rag_answer", END)
+    graph.add_edge("hybrid_answer", END)
+    graph.add_edge("blocked", END)
+
+    return graph.compile()
+
+
+def get_workflow():
+    global _workflow
+    if _workflow is None:
+        _workflow = _build_workflow()
+    return _workflow
+
+
+def _flight_key(user_message: str, collection: str = DEFAULT_COLLECTION, filters: Optional[Dict] = None) -> tuple:
+    # Everything that can change the graph's output besides client identity.
+    return (" ".join(user_message.lower().split()), collection, tuple(normalize_filters(filters).items()))
+
+
+async def _execute_workflow(
+    user_message: str,
+    request_id: str,
+    client_key: str,
+    deadline: Optional[float] = None,
+    **initial: Any,
+) -> QAState:
+    if deadline is None:
+        deadline = deadline_after(REQUEST_TIMEOUT_S)
+
+    trace, token = start_trace(request_id)
+    try:
+        with span("request"):
+            result: QAState = await get_workflow().ainvoke(
+                {
+                    "user_message": user_message,
+                    "request_id": request_id,
+                    "client_key": client_key,
+                    "deadline": deadline,
+                    **initial,
+                }
+            )
+    finally:
+        finish_trace(trace, token)
+    result["meta"] = {**result.get("meta", {}), "route": result.get("route"), "timings": trace.timings()}
+    QA_REQUESTS.inc(route=result.get("route", "unknown"))
     log.info(
     "qa_complete",
     request_id=request_id,
     route=result.get("route"),
     latency=result.get("meta", {}).get("latency_ms"),
     cost=result.get("meta", {}).get("cost_estimate_usd"),
+    budget_left_ms=round(remaining(deadline) * 1000.0, 1),
     )
-    return result
\ No newline at end of file
+    return result
+
+
+# Public API
+async def run_qa_workflow(
+    user_message: str,
+    request_id: str,
+    client_key: str,
+    deadline: Optional[float] = None,
+    collection: str = DEFAULT_COLLECTION,
+    filters: Optional[Dict[str, Any]] = None,
+) -> QAState:
+    """
+    Identical questions already in flight (same collection and filters) are
+    coalesced into one graph execution; every caller gets the result back
+    under its own request_id.
+
+    filters: {doc_id, source, doc_type}: value or list of values; retrieval
+    only considers matching chunks (see app.rag.retriever.search_store).
+
+    deadline: absolute time.monotonic() (default: now + REQUEST_TIMEOUT_S).
+    A joining caller waits for the shared result only until its own deadline,
+    then gets a timed-out answer while the execution continues for the rest.
+    """
+    # Rate limiting is per client, so it happens before requests are coalesced.
+    if not limiter.allow(client_key):
+        RATE_LIMITED.inc(endpoint="chat")
+        return {"request_id": request_id, **_rate_limited()}
+
+    if deadline is None:
+        deadline = deadline_after(REQUEST_TIMEOUT_S)
+    key = _flight_key(user_message, collection, filters)
+    joining = flights.in_flight(key)
+    try:
+        result, shared = await flights.do(
+            key,
+            lambda: _execute_workflow(
+                user_message,
+                request_id=request_id,
+                client_key=client_key,
+                deadline=deadline,
+                collection=collection,
+                filters=filters or {},
+            ),
+            timeout=remaining(deadline),
+        )
+    except asyncio.TimeoutError:
+        if not joining:
+            raise
+        log.warning("qa_coalesced_timeout", request_id=request_id, **flights.stats())
+        return {"request_id": request_id, "citations": [], **_timed_out({"meta": {"coalesced": True}})}
+    if not shared:
+        return result
+
+    log.info("qa_coalesced", request_id=request_id, leader_request_id=result.get("request_id"), **flights.stats())
+    return {
+        **result,
+        "request_id": request_id,
+        "client_key": client_key,
+        "citations": list(result.get("citations", [])),
+        "meta": {**result.get("meta", {}), "coalesced": True, "leader_request_id": result.get("request_id")},
+    }
+
+
+async def run_qa_batch(
+    user_messages: List[str],
+    request_id: str,
+    client_key: str,
+    concurrency: int = BATCH_CONCURRENCY,
+    collection: str = DEFAULT_COLLECTION,
+    filters: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[Tuple[int, QAState]]:
+    """
+    Bulk question answering. Yields (index, result) as each question finishes,
+    not in input order. Item i runs under request_id f"{request_id}:{i}".
+
+    - every question counts against the client's rate limit, like a /chat
+      request; questions over the limit come back rate limited
+    - unsafe questions are blocked before anything is sent upstream
+    - the remaining questions are embedded in one call and searched with one index.search
+    - at most `concurrency` graph executions run at a time
+    - each question gets its own REQUEST_TIMEOUT_S deadline once it starts
+    """
+    admitted: List[int] = []
+    for i, msg in enumerate(user_messages):
+        if not limiter.allow(client_key):
+            RATE_LIMITED.inc(endpoint="chat_batch")
+            yield i, {"request_id": f"{request_id}:{i}", **_rate_limited()}
+        elif is_unsafe_user_input(msg):
+            yield i, {"request_id": f"{request_id}:{i}", **_unsafe_input()}
+        else:
+            admitted.append(i)
+    if not admitted:
+        return
+
+    # Precompute embeddings + candidates; on failure each run embeds on its own.
+    precomputed: Dict[int, Dict[str, Any]] = {i: {} for i in admitted}
+    try:
+        # Bounded like one question, so a saturated embeddings bulkhead can't hold the batch back
+        vecs = await aembed_texts([user_messages[i] for i in admitted], deadline=deadline_after(REQUEST_TIMEOUT_S))
+        store = await ensure_loaded(collection)
+        hits = search_vectors(vecs, k=max(TOP_K, RETRIEVE_K), collection=collection, filters=filters, store=store)
+        for row, i in enumerate(admitted):
+            precomputed[i] = {"query_vec": vecs[row : row + 1], "candidates": hits[row]}
+    except Exception as e:
+        log.warning("batch_precompute_failed", request_id=request_id, error=str(e))
+
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_one(i: int) -> Tuple[int, QAState]:
+        item_id = f"{request_id}:{i}"
+        async with sem:
+            try:
+                return i, await _execute_workflow(
+                    user_messages[i], item_id, client_key, collection=collection, filters=filters or {}, **precomputed[i]
+                )
+            except Exception as e:
+                log.error("batch_item_failed", request_id=item_id, error=str(e))
+                return i, {"request_id": item_id, "answer": "", "citations": [], "meta": {"error": str(e)}}
+
+    tasks = [asyncio.ensure_future(run_one(i)) for i in admitted]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Client went away mid-stream: stop the remaining work
+        for t in tasks:
+            t.cancel()
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.rag.indexer import embed_texts
+
+# Labelled example utterances per route.
+# Each route is represented by the normalized mean (centroid) of its examples,
+# so adding a few more examples here is how routing gets tuned.
+ROUTE_EXAMPLES: Dict[str, List[str]] = {
+    "rag": [
+        "What are my key skills?",
+        "Summarize my experience in 3 bullets.",
+        "What companies have I worked for?",
+        "Which certifications do I have?",
+        "What is my education background?",
+        "Describe the projects listed in the resume.",
+        "How does the on-call rotation work?",
+        "Who do escalations go to?",
+        "What does the on-call runbook say?",
+        "What does the product do?",
+        "What is in the SOP document?",
+        "Show the profile summary from the CV.",
+    ],
+    "tool": [
+        "Multiply 12 and 7",
+        "What is 45 + 17?",
+        "Add 300 and 451",
+        "Calculate 19 * 23",
+        "What is the sum of 8 and 13?",
+        "Compute 1024 times 3",
+        "What's 7 plus 5?",
+        "Multiply 250 by 4",
+        "What is the sum of 4, 8, 15, 16, 23 and 42?",
+        "Multiply these together: 2, 3, 5, 7, 11",
+        "Dot product of [1, 2, 3] and [4, 5, 6]",
+    ],
+    "hybrid": [
+        "How many years of experience do I have multiplied by 12 months?",
+        "Add 5 to the number of years of experience in my resume.",
+        "If on-call rotation is weekly, how many rotations are there in 3 years? Multiply it out.",
+        "Multiply the number of companies I worked for by 2.",
+        "Sum the years I spent at each company in my resume.",
+        "How many certifications do I have times 3?",
+    ],
+    "llm": [
+        "Hello!",
+        "What is the population of Mars?",
+        "Tell me a joke.",
+        "Explain what a vector database is.",
+        "Write a haiku about the ocean.",
+        "What is the capital of France?",
+        "How are you today?",
+        "Translate 'good morning' into Spanish.",
+    ],
+}
+
+
+def _normalize_rows(m: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return m / norms
+
+
+class RouteClassifier:
+    """
+    Nearest-centroid classifier over query embeddings.
+    `centroids` is a small (n_routes, dim) float32 matrix of unit vectors,
+    so classifying a (normalized) query is a single mat-vec product.
+    """
+
+    def __init__(self, labels: List[str], centroids: np.ndarray) -> None:
+        self.labels = labels
+        self.centroids = np.ascontiguousarray(centroids, dtype="float32")
+
+    @classmethod
+    def from_examples(
+        cls,
+        examples: Dict[str, List[str]] = ROUTE_EXAMPLES,
+        embed: Callable[[List[str]], np.ndarray] = embed_texts,
+    ) -> "RouteClassifier":
+        labels = list(examples.keys())
+        texts: List[str] = []
+        owners: List[int] = []
+        for i, label in enumerate(labels):
+            texts.extend(examples[label])
+            owners.extend([i] * len(examples[label]))
+
+        # One embeddings call for all examples
+        vectors = _normalize_rows(np.asarray(embed(texts), dtype="float32"))
+        owner_ids = np.asarray(owners)
+
+        centroids = np.stack([vectors[owner_ids == i].mean(axis=0) for i in range(len(labels))])
+        return cls(labels, _normalize_rows(centroids))
+
+    def scores(self, query_vec: np.ndarray) -> np.ndarray:
+        return self.centroids @ query_vec.reshape(-1).astype("float32", copy=False)
+
+    def classify(self, query_vec: np.ndarray) -> Tuple[str, float]:
+        s = self.scores(query_vec)
+        best = int(np.argmax(s))
+        return self.labels[best], float(s[best])
+
+
+_classifier: Optional[RouteClassifier] = None
+
+
+def init_route_classifier() -> RouteClassifier:
+    """Embed the labelled examples once (called from the app lifespan)."""
+    global _classifier
+    _classifier = RouteClassifier.from_examples()
+    return _classifier
+
+
+def get_route_classifier() -> Optional[RouteClassifier]:
+    return _classifier
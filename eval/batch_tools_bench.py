@@ -0,0 +1,168 @@
+"""
+Batch math tools: LLM turns, tool calls and latency per list-math request.
+
+    python eval/batch_tools_bench.py                               # local tool fallback
+    python eval/batch_tools_bench.py --mcp-url http://127.0.0.1:8001/mcp
+    python eval/batch_tools_bench.py --lengths 3,5,8,20,100 --chat-latency-ms 300
+
+Sends "What is the sum/product of <n numbers>?" through LLMClient.chat_with_tools
+against the fake OpenAI server (eval/fake_openai.py), once with the full TOOLS
+and once with only the scalar add/multiply tools offered. With batch tools the
+fake model calls sum/product once with the whole list; with scalar tools it
+folds the list one call per turn, so a request needs n-1 tool turns and runs
+into the 5-turn / MAX_TOOL_CALLS_PER_REQUEST limits past a handful of values.
+
+Tool calls go to --mcp-url (start app/mcp/math_server.py) or, by default, to
+an unreachable URL so ToolClient answers from its local implementations.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from math import prod
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from fake_openai import SETTINGS, serve_in_thread
+
+SCALAR_TOOLS = ("add", "multiply")
+
+
+def questions(lengths, per_length: int, seed: int = 7):
+    """(op, length, question, expected) for every length; products stay small."""
+    rng = random.Random(seed)
+    out = []
+    for n in lengths:
+        for i in range(per_length):
+            if i % 2 == 0:
+                values = [rng.randint(1, 999) for _ in range(n)]
+                op, expected = "sum", sum(values)
+            else:
+                values = [rng.choice((1, 1, 2)) for _ in range(n)]
+                op, expected = "product", prod(values)
+            out.append((op, n, f"What is the {op} of {', '.join(map(str, values))}?", expected))
+    return out
+
+
+def pct(values, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+async def run_pass(llm, requests) -> list:
+    rows = []
+    for op, n, question, expected in requests:
+        start = time.perf_counter()
+        try:
+            answer, meta = await llm.chat_with_tools(question, request_id="batch_tools_bench")
+            error = None
+        except Exception as e:
+            answer, meta, error = "", {}, f"{type(e).__name__}: {e}"
+        tools_used = meta.get("tools_used", [])
+        rows.append(
+            {
+                "op": op,
+                "length": n,
+                "ok": error is None and bool(tools_used),
+                "correct": error is None and str(expected) in answer,
+                "llm_turns": meta.get("llm_turns", 0),
+                "tool_calls": len(tools_used),
+                "latency_ms": (time.perf_counter() - start) * 1000.0,
+                "error": error,
+            }
+        )
+    return rows
+
+
+def summarize(rows) -> dict:
+    latencies = [r["latency_ms"] for r in rows]
+    errors = sorted({r["error"].split(":")[0] for r in rows if r["error"]})
+    return {
+        "requests": len(rows),
+        "correct_rate": round(sum(r["correct"] for r in rows) / len(rows), 4),
+        "mean_llm_turns": round(statistics.mean(r["llm_turns"] for r in rows), 2),
+        "mean_tool_calls": round(statistics.mean(r["tool_calls"] for r in rows), 2),
+        "mean_latency_ms": round(statistics.mean(latencies), 2),
+        "p95_latency_ms": round(pct(latencies, 0.95), 2),
+        "errors": errors,
+    }
+
+
+async def bench(args) -> dict:
+    from app.core import llm_client
+    from app.core.clients import close_clients, get_llm, init_clients
+    from app.core.db import init_db
+
+    init_db()
+    init_clients()
+    llm = get_llm()
+    requests = questions(args.lengths, args.per_length)
+
+    full_tools = llm_client.TOOLS
+    scalar_tools = [t for t in full_tools if t["function"]["name"] in SCALAR_TOOLS]
+    results = []
+    try:
+        for mode, tools in (("scalar", scalar_tools), ("batch", full_tools)):
+            llm_client.TOOLS = tools
+            rows = await run_pass(llm, requests)
+            for n in args.lengths:
+                results.append({"tools": mode, "length": n, **summarize([r for r in rows if r["length"] == n])})
+            results.append({"tools": mode, "length": "all", **summarize(rows)})
+    finally:
+        llm_client.TOOLS = full_tools
+        await close_clients()
+    return {
+        "mcp_url": os.environ["MCP_URL"],
+        "chat_latency_ms": SETTINGS["chat_latency_ms"],
+        "per_length": args.per_length,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lengths", default="3,5,8,20,100", help="comma-separated list lengths")
+    parser.add_argument("--per-length", type=int, default=10, help="questions per length (half sums, half products)")
+    parser.add_argument("--chat-latency-ms", type=float, default=50.0, help="fake model time per turn")
+    parser.add_argument("--mcp-url", default="http://127.0.0.1:9/mcp", help="default: unreachable -> local tools")
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+    args.lengths = [int(n) for n in args.lengths.split(",") if n.strip()]
+
+    SETTINGS["chat_latency_ms"] = args.chat_latency_ms
+    SETTINGS["per_token_ms"] = 0.0
+    server = serve_in_thread(port=args.port)
+
+    # Before app.core.config is imported
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+    os.environ["MCP_URL"] = args.mcp_url
+    os.chdir(tempfile.mkdtemp(prefix="batch_tools_bench_"))  # app_logs.db goes here
+
+    try:
+        summary = asyncio.run(bench(args))
+    finally:
+        server.should_exit = True
+
+    print(f"{'tools':<8}{'length':>7}{'correct':>9}{'turns':>7}{'calls':>7}{'mean ms':>10}{'p95 ms':>10}")
+    for r in summary["results"]:
+        print(
+            f"{r['tools']:<8}{r['length']:>7}{r['correct_rate'] * 100:>8.0f}%{r['mean_llm_turns']:>7}"
+            f"{r['mean_tool_calls']:>7}{r['mean_latency_ms']:>10.1f}{r['p95_latency_ms']:>10.1f}"
+        )
+    print("\nJSON summary:")
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Chunker scaling benchmark on synthetic multi-megabyte documents.
+
+    python eval/chunker_bench.py --sizes-mb 0.5 1 2 4 8
+
+For each size: wall time of the character chunker, the previous resume chunker
+(re-summing the block on every line, kept here for comparison), the current
+resume chunker and the token-aware chunker, plus ms/MB so linear scaling shows
+up as a flat column. Also reports how far each chunker's output strays from
+the target size when measured in embedding-model tokens.
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from synthetic_corpus import paragraph
+
+from app.core.config import CHUNK_OVERLAP, CHUNK_OVERLAP_TOKENS, CHUNK_SIZE, CHUNK_TOKENS
+from app.rag.chunker import chunk_text, chunk_tokens, count_tokens, get_encoder
+from app.rag.resume_chunker import chunk_resume, is_heading
+
+
+def legacy_chunk_resume(text: str, max_chars: int = 900) -> List[str]:
+    """chunk_resume before running-size accounting (block size re-summed per line)."""
+    lines = [l.rstrip() for l in text.splitlines()]
+    blocks: List[str] = []
+    current_heading = ""
+    current = []
+
+    def flush():
+        nonlocal current
+        if current:
+            body = "\n".join(current).strip()
+            blocks.append((current_heading + "\n" + body).strip() if current_heading else body)
+        current = []
+
+    for line in lines:
+        if is_heading(line):
+            flush()
+            current_heading = line.strip()
+        elif line.strip():
+            current.append(line)
+        if sum(len(x) for x in current) + len(current_heading) > max_chars:
+            flush()
+    flush()
+    return [b for b in blocks if b]
+
+
+def make_document(mb: float, rng: random.Random) -> str:
+    """Markdown-ish text: headings, paragraphs and short resume-style lines."""
+    parts, size, section = [], 0, 0
+    while size < mb * 1_000_000:
+        section += 1
+        block = f"## Section {section}\n\n{paragraph(rng, 8)}\n\n" + "\n".join(
+            f"- {paragraph(rng, 1)}" for _ in range(6)
+        )
+        parts.append(block)
+        size += len(block) + 2
+    return "\n\n".join(parts)
+
+
+def timed(fn, text: str, repeat: int) -> tuple[list, float]:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn(text)
+        best = min(best, time.perf_counter() - start)
+    return out, best * 1000.0
+
+
+def token_spread(chunks: List[str]) -> dict:
+    sizes = [count_tokens(c) for c in chunks]
+    return {"chunks": len(sizes), "min": min(sizes), "p50": int(statistics.median(sizes)), "max": max(sizes)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[0.5, 1, 2, 4, 8])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    get_encoder()  # load the BPE ranks outside the timed region
+    rng = random.Random(7)
+    chunkers = {
+        "chars": lambda t: chunk_text(t, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP),
+        "resume_legacy": lambda t: legacy_chunk_resume(t, max_chars=CHUNK_SIZE),
+        "resume": lambda t: chunk_resume(t, max_chars=CHUNK_SIZE),
+        "tokens": lambda t: [c for c, _ in chunk_tokens(t, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS)],
+    }
+
+    rows, spread = [], {}
+    for mb in args.sizes_mb:
+        text = make_document(mb, rng)
+        row = {"mb": mb}
+        for name, fn in chunkers.items():
+            chunks, ms = timed(fn, text, args.repeat)
+            row[f"{name}_ms"] = round(ms, 1)
+            row[f"{name}_ms_per_mb"] = round(ms / mb, 1)
+            if mb == args.sizes_mb[0]:
+                spread[name] = token_spread(chunks)
+        rows.append(row)
+
+    names = list(chunkers)
+    print(f"{'MB':>6}" + "".join(f"{n + ' ms/MB':>22}" for n in names))
+    for row in rows:
+        print(f"{row['mb']:>6}" + "".join(f"{row[n + '_ms_per_mb']:>22}" for n in names))
+
+    print("\nJSON summary:")
+    print(
+        json.dumps(
+            {
+                "target": {"chars": CHUNK_SIZE, "tokens": CHUNK_TOKENS},
+                "timings": rows,
+                "chunk_tokens_at_smallest_size": spread,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Cold vs. warm query latency for named collections.
+
+    python eval/collections_bench.py --collections 4 --md 2000 --budget-mb 100
+
+Builds `--collections` synthetic collections with the fake embeddings server,
+then measures retrieve() latency for:
+  cold      first query against each collection (includes loading it)
+  warm      repeat queries against a resident collection
+  rotating  round-robin over all collections with the memory budget set by
+            --budget-mb, so collections are evicted and reloaded
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import numpy as np
+
+from fake_openai import SETTINGS, fake_embedding, serve_in_thread
+from synthetic_corpus import make_corpus
+
+QUESTIONS = [
+    "how does the incident escalation runbook work",
+    "which database index cache is used",
+    "solar wind battery analytics dashboard",
+]
+
+
+def timed_ms(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000.0
+
+
+def summary(values) -> dict:
+    return {
+        "n": len(values),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--collections", type=int, default=4)
+    parser.add_argument("--md", type=int, default=2000, help="markdown notes per collection")
+    parser.add_argument("--budget-mb", type=float, default=None, help="default: room for about half the collections")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+
+    SETTINGS["latency_ms"] = 0.0
+    server = serve_in_thread(port=args.port)
+    tmp = Path(tempfile.mkdtemp(prefix="collections_bench_"))
+
+    # Must be set before app.core.config is imported
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+    os.environ["COLLECTIONS_DIR"] = str(tmp / "collections")
+    os.environ["EXTRACT_CACHE_DIR"] = str(tmp / "cache")
+
+    try:
+        from app.rag.pipeline import build_index_streaming
+        from app.rag.retriever import retrieve
+        from app.rag.stores import collection_dir, stores
+
+        names = [f"team{i}" for i in range(args.collections)]
+        sizes = {}
+        for i, name in enumerate(names):
+            docs = make_corpus(tmp / "docs" / name, n_pdfs=0, pages_per_pdf=0, n_md=args.md, seed=i)
+            build_index_streaming(str(docs), out_dir=str(collection_dir(name)))
+            d = collection_dir(name)
+            sizes[name] = (d / "index.faiss").stat().st_size + (d / "chunks.json").stat().st_size
+
+        total = sum(sizes.values())
+        budget = int(args.budget_mb * 1e6) if args.budget_mb else total // 2
+        dim = stores.get(names[0]).index.d
+        stores.clear()
+        vecs = [fake_embedding(q, dim).reshape(1, -1) for q in QUESTIONS]
+
+        def query(name: str, i: int) -> None:
+            retrieve(QUESTIONS[i % len(QUESTIONS)], k=15, collection=name, query_vec=vecs[i % len(vecs)])
+
+        stores.budget_bytes = total * 2  # everything fits: cold loads, then a pure warm path
+        cold = [timed_ms(lambda n=n: query(n, 0)) for n in names]
+        warm = [timed_ms(lambda i=i: query(names[0], i)) for i in range(args.queries)]
+
+        stores.budget_bytes = budget
+        stores.clear()
+        before = dict(stores.stats())
+        rotating = [timed_ms(lambda i=i: query(names[i % len(names)], i)) for i in range(args.queries)]
+        after = stores.stats()
+
+        print(
+            json.dumps(
+                {
+                    "collections": {n: round(b / 1e6, 2) for n, b in sizes.items()},
+                    "budget_mb": round(stores.budget_bytes / 1e6, 2),
+                    "cold": summary(cold),
+                    "warm": summary(warm),
+                    "rotating": {
+                        **summary(rotating),
+                        "loads": after["loads"] - before["loads"],
+                        "evictions": after["evictions"] - before["evictions"],
+                    },
+                },
+                indent=2,
+            )
+        )
+    finally:
+        server.should_exit = True
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Concurrent query-embedding benchmark: one embeddings call per query vs. the
+micro-batcher, both against the local fake OpenAI server.
+
+    python eval/embed_batch_bench.py --concurrency 200 --latency-ms 40
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import numpy as np
+
+from fake_openai import SETTINGS, STATS, reset_stats, serve_in_thread
+
+
+async def run(label: str, embed_one, n: int) -> dict:
+    latencies = []
+
+    async def one(i: int):
+        start = time.perf_counter()
+        await embed_one(f"question number {i} about the on-call runbook")
+        latencies.append((time.perf_counter() - start) * 1000.0)
+
+    reset_stats()
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    wall = time.perf_counter() - start
+
+    return {
+        "mode": label,
+        "requests": n,
+        "upstream_calls": STATS["embedding_calls"],
+        "throughput_rps": round(n / wall, 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+    }
+
+
+async def bench(args) -> None:
+    from app.rag.embed_batcher import EmbeddingBatcher
+    from app.rag.retriever import aembed_texts
+
+    async def unbatched(q: str):
+        return await aembed_texts([q])
+
+    batcher = EmbeddingBatcher(aembed_texts, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+
+    # Warm the connection path once so neither mode pays for it
+    await aembed_texts(["warmup"])
+
+    results = [
+        await run("unbatched", unbatched, args.concurrency),
+        await run("micro-batched", batcher.embed, args.concurrency),
+    ]
+    results[1]["batcher"] = batcher.stats()
+    # Added latency for a lone request: the batching window it waits out
+    single = await run("micro-batched-single", batcher.embed, 1)
+    results.append(single)
+
+    print(json.dumps({"upstream_latency_ms": SETTINGS["latency_ms"], "results": results}, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--per-item-ms", type=float, default=0.05)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+
+    SETTINGS["latency_ms"] = args.latency_ms
+    SETTINGS["per_item_ms"] = args.per_item_ms
+    server = serve_in_thread(port=args.port)
+
+    # Must be set before app.core.config is imported
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+    try:
+        asyncio.run(bench(args))
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
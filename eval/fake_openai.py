@@ -0,0 +1,307 @@
+"""
+Local stand-in for the OpenAI API used by the benchmarks.
+
+Embeddings are deterministic hashed bag-of-words vectors, so texts that share
+words get similar vectors and retrieval still behaves sensibly offline.
+
+Chat completions answer after chat_latency_ms + per_token_ms * completion_tokens.
+With tools offered, "add/multiply <a> and <b>" style questions get a tool call
+first (disable with --no-tool-calls); rerank prompts get a JSON index list.
+"sum/product of 3, 4, 5, ..." questions get one sum/product call when those
+tools are offered, else one add/multiply call per turn folding the list.
+
+A simulated prompt cache (disable with --no-prompt-cache) reports
+usage.prompt_tokens_details.cached_tokens the way OpenAI does: the longest
+previously seen prefix of tools + messages, once it reaches 1024 tokens, in
+128-token steps (tokens here are words * 1.3, like prompt_tokens).
+
+--error-rate answers that share of embeddings/chat calls with a 503. Any
+SETTINGS value can be changed while running with POST /fake/settings, e.g.
+{"error_rate": 1.0} for an outage and {"error_rate": 0} to end it.
+
+Run standalone:
+    python eval/fake_openai.py --port 8099 --latency-ms 50
+then point the app at it with OPENAI_BASE_URL=http://127.0.0.1:8099/v1
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import uuid
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+SETTINGS: Dict[str, float] = {
+    "latency_ms": 20.0,     # fixed cost per upstream call
+    "per_item_ms": 0.0,     # extra cost per embedded text
+    "dim": 1536,
+    "chat_latency_ms": 300.0,  # time to first token
+    "per_token_ms": 2.0,       # generation cost per completion token
+    "completion_tokens": 80,
+    "tool_calls": 1.0,         # 0 disables tool calls
+    "prompt_cache": 1.0,       # 0 disables the simulated prompt cache
+    "error_rate": 0.0,         # share of calls answered 503 (after the usual latency)
+}
+
+STATS: Dict[str, int] = {
+    "embedding_calls": 0,
+    "embedding_items": 0,
+    "chat_calls": 0,
+    "tool_call_turns": 0,
+    "prompt_tokens": 0,
+    "completion_tokens": 0,
+    "cached_tokens": 0,
+    "errors": 0,
+}
+
+CACHE_MIN_TOKENS = 1024
+CACHE_STEP_TOKENS = 128
+CACHE_MAX_ENTRIES = 100_000
+_prefix_cache: "OrderedDict[str, None]" = OrderedDict()
+
+_LIST_MATH = re.compile(
+    r"\b(sum|total|add up|product|multiply)\b(?: of| together)?\W*(-?\d+(?:(?:\s*,\s*(?:and\s+)?|\s+and\s+)-?\d+){2,})",
+    re.IGNORECASE,
+)
+_MATH = re.compile(r"\b(add|sum|plus|multiply|times|product)\b\D*?(-?\d+)\D+?(-?\d+)", re.IGNORECASE)
+
+app = FastAPI(title="Fake OpenAI")
+
+
+def fake_embedding(text: str, dim: int) -> np.ndarray:
+    vec = np.zeros(dim, dtype="float32")
+    for word in re.findall(r"\w+", text.lower()):
+        h = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+        vec[h % dim] += 1.0 if (h >> 63) == 0 else -1.0
+    norm = np.linalg.norm(vec)
+    if norm == 0:
+        vec[0] = 1.0
+        return vec
+    return vec / norm
+
+
+def _injected_error() -> Optional[JSONResponse]:
+    if SETTINGS["error_rate"] <= 0 or random.random() >= SETTINGS["error_rate"]:
+        return None
+    STATS["errors"] += 1
+    return JSONResponse(
+        status_code=503,
+        content={"error": {"message": "injected upstream error", "type": "server_error", "code": None}},
+    )
+
+
+@app.post("/fake/settings")
+async def update_settings(request: Request) -> dict:
+    """Change SETTINGS while running, e.g. {"error_rate": 1.0} to simulate an outage."""
+    for k, v in (await request.json()).items():
+        if k in SETTINGS:
+            SETTINGS[k] = float(v)
+    return SETTINGS
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request) -> dict:
+    body = await request.json()
+    texts: List[str] = body["input"] if isinstance(body["input"], list) else [body["input"]]
+    dim = int(body.get("dimensions") or SETTINGS["dim"])
+
+    STATS["embedding_calls"] += 1
+    STATS["embedding_items"] += len(texts)
+    await asyncio.sleep((SETTINGS["latency_ms"] + SETTINGS["per_item_ms"] * len(texts)) / 1000.0)
+    error = _injected_error()
+    if error is not None:
+        return error
+
+    tokens = sum(len(t.split()) for t in texts)
+    return {
+        "object": "list",
+        "model": body.get("model", "text-embedding-3-small"),
+        "data": [
+            {"object": "embedding", "index": i, "embedding": fake_embedding(t, dim).tolist()}
+            for i, t in enumerate(texts)
+        ],
+        "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+    }
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, list):  # content parts
+        return " ".join(p.get("text", "") for p in content if isinstance(p, dict))
+    return content or ""
+
+
+def _call(name: str, args: dict) -> dict:
+    return {
+        "id": f"call_{uuid.uuid4().hex[:12]}",
+        "type": "function",
+        "function": {"name": name, "arguments": json.dumps(args)},
+    }
+
+
+def _tool_call(message: str) -> Optional[dict]:
+    m = _MATH.search(message)
+    if not m:
+        return None
+    name = "multiply" if m.group(1).lower() in {"multiply", "times", "product"} else "add"
+    return _call(name, {"a": int(m.group(2)), "b": int(m.group(3))})
+
+
+def _list_call(body: dict) -> Optional[dict]:
+    """Next tool call for a "sum/product of <list>" question, None once the answer is due."""
+    messages = body["messages"]
+    question = next((_text(m.get("content")) for m in messages if m["role"] == "user"), "")
+    m = _LIST_MATH.search(question)
+    if not m:
+        return None
+    values = [int(v) for v in re.findall(r"-?\d+", m.group(2))]
+    op = "product" if m.group(1).lower() in {"product", "multiply"} else "sum"
+    offered = {t["function"]["name"] for t in body.get("tools") or []}
+    results = [_text(x.get("content")) for x in messages if x["role"] == "tool"]
+    if op in offered:
+        return None if results else _call(op, {"values": values})
+    # Scalar tools only: fold the list, one call per turn
+    if len(results) >= len(values) - 1:
+        return None
+    acc = int(results[-1]) if results else values[0]
+    return _call("multiply" if op == "product" else "add", {"a": acc, "b": values[len(results) + 1]})
+
+
+def _cached_tokens(body: dict) -> int:
+    """Longest cached prefix (in 128-token steps from 1024), then remember this prompt's prefixes."""
+    words = json.dumps(body.get("tools") or [], sort_keys=True).split()
+    for m in body["messages"]:
+        words += [m["role"] + ":"] + _text(m.get("content")).split()
+        words += json.dumps(m.get("tool_calls") or [], sort_keys=True).split()
+
+    h = hashlib.sha1()
+    cached, prefix_hit, pos = 0, True, 0
+    for tokens in range(CACHE_MIN_TOKENS, int(len(words) * 1.3) + 1, CACHE_STEP_TOKENS):
+        end = int(tokens / 1.3)
+        for w in words[pos:end]:
+            h.update(w.encode("utf-8") + b" ")
+        pos = end
+        key = h.hexdigest()
+        if prefix_hit and key in _prefix_cache:
+            cached = tokens
+            _prefix_cache.move_to_end(key)
+        else:
+            prefix_hit = False
+            _prefix_cache[key] = None
+    while len(_prefix_cache) > CACHE_MAX_ENTRIES:
+        _prefix_cache.popitem(last=False)
+    return cached
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request) -> dict:
+    body = await request.json()
+    messages: List[dict] = body["messages"]
+    last = messages[-1]
+    prompt_text = " ".join(_text(m.get("content")) for m in messages)
+    prompt_tokens = max(1, int(len(prompt_text.split()) * 1.3))
+
+    message: Dict[str, Any] = {"role": "assistant", "content": None}
+    finish = "stop"
+    tools_on = bool(body.get("tools")) and bool(SETTINGS["tool_calls"])
+    call = _tool_call(_text(last.get("content"))) if tools_on else None
+    list_call = _list_call(body) if tools_on and "strict reranker" not in prompt_text else None
+    if list_call is not None:
+        message["tool_calls"] = [list_call]
+        finish = "tool_calls"
+        completion_tokens = 20 + 4 * len(json.loads(list_call["function"]["arguments"]).get("values", []))
+        STATS["tool_call_turns"] += 1
+    elif last["role"] == "tool":
+        message["content"] = f"The result is {_text(last.get('content'))}."
+        completion_tokens = 8
+    elif "strict reranker" in prompt_text:
+        n = len(re.findall(r"^\d+: ", prompt_text, re.MULTILINE)) or 1
+        m = re.search(r"N=(\d+)", prompt_text)
+        top_n = int(m.group(1)) if m else 5
+        message["content"] = json.dumps(list(range(min(n, top_n))))
+        completion_tokens = 2 * min(n, top_n)
+    elif call is not None and last["role"] == "user":
+        message["tool_calls"] = [call]
+        finish = "tool_calls"
+        completion_tokens = 20
+        STATS["tool_call_turns"] += 1
+    else:
+        completion_tokens = int(SETTINGS["completion_tokens"])
+        message["content"] = " ".join(["Answer"] + ["lorem"] * (completion_tokens - 2) + ["[1]."])
+
+    cached_tokens = min(_cached_tokens(body), prompt_tokens) if SETTINGS["prompt_cache"] else 0
+    STATS["chat_calls"] += 1
+    STATS["prompt_tokens"] += prompt_tokens
+    STATS["completion_tokens"] += completion_tokens
+    STATS["cached_tokens"] += cached_tokens
+    await asyncio.sleep((SETTINGS["chat_latency_ms"] + SETTINGS["per_token_ms"] * completion_tokens) / 1000.0)
+    error = _injected_error()
+    if error is not None:
+        return error
+
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o-mini"),
+        "choices": [{"index": 0, "message": message, "finish_reason": finish, "logprobs": None}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+        },
+    }
+
+
+def reset_stats() -> None:
+    for k in STATS:
+        STATS[k] = 0
+    _prefix_cache.clear()
+
+
+def serve_in_thread(host: str = "127.0.0.1", port: int = 8099) -> uvicorn.Server:
+    """Start the fake server in a daemon thread; set `.should_exit = True` to stop it."""
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=SETTINGS["latency_ms"])
+    parser.add_argument("--per-item-ms", type=float, default=SETTINGS["per_item_ms"])
+    parser.add_argument("--chat-latency-ms", type=float, default=SETTINGS["chat_latency_ms"])
+    parser.add_argument("--per-token-ms", type=float, default=SETTINGS["per_token_ms"])
+    parser.add_argument("--completion-tokens", type=int, default=SETTINGS["completion_tokens"])
+    parser.add_argument("--no-tool-calls", action="store_true")
+    parser.add_argument("--no-prompt-cache", action="store_true")
+    parser.add_argument("--error-rate", type=float, default=SETTINGS["error_rate"])
+    args = parser.parse_args()
+
+    SETTINGS["latency_ms"] = args.latency_ms
+    SETTINGS["per_item_ms"] = args.per_item_ms
+    SETTINGS["chat_latency_ms"] = args.chat_latency_ms
+    SETTINGS["per_token_ms"] = args.per_token_ms
+    SETTINGS["completion_tokens"] = args.completion_tokens
+    SETTINGS["tool_calls"] = 0.0 if args.no_tool_calls else 1.0
+    SETTINGS["prompt_cache"] = 0.0 if args.no_prompt_cache else 1.0
+    SETTINGS["error_rate"] = args.error_rate
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
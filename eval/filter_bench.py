@@ -0,0 +1,130 @@
+"""
+Metadata-filtered search: IDSelector push-down vs. post-filtering.
+
+    python eval/filter_bench.py --vectors 200000 --dim 384 --docs 2000
+
+Random unit vectors spread over `--docs` documents. For each selectivity
+(share of chunks that match the filter) compares:
+  pushdown        search_store(..., filters=...) — IDSelectorBatch inside the scan
+  postfilter      one search for k * --overfetch hits, then filter in Python
+  postfilter_full keep doubling the over-fetch until k matches (or a full scan)
+Reports per-query latency and how many of the k hits each approach returned.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import faiss
+import numpy as np
+
+from app.rag.retriever import search_store
+from app.rag.stores import Store, normalize_filters
+
+
+def postfilter(index, q, k, allowed: set, fetch: int):
+    scores, ids = index.search(q, min(fetch, index.ntotal))
+    hits = [(s, i) for s, i in zip(scores[0], ids[0]) if i in allowed]
+    return hits[:k]
+
+
+def postfilter_full(index, q, k, allowed: set, start: int):
+    fetch = start
+    while True:
+        hits = postfilter(index, q, k, allowed, fetch)
+        if len(hits) >= k or fetch >= index.ntotal:
+            return hits
+        fetch *= 2
+
+
+def bench(fn, queries) -> tuple[list, float]:
+    out, times = [], []
+    for q in queries:
+        start = time.perf_counter()
+        out.append(fn(q))
+        times.append((time.perf_counter() - start) * 1000.0)
+    return out, float(np.percentile(times, 50))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=15)
+    parser.add_argument("--overfetch", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--selectivity", type=float, nargs="+", default=[0.5, 0.1, 0.01, 0.001])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    vecs = rng.standard_normal((args.vectors, args.dim), dtype="float32")
+    faiss.normalize_L2(vecs)
+    index = faiss.IndexFlatIP(args.dim)
+    index.add(vecs)
+
+    doc_of = rng.integers(0, args.docs, size=args.vectors)
+    chunks = [
+        {"chunk_id": f"doc{d}::chunk{i}", "doc_id": f"doc{d}", "source": f"docs/doc{d}.md", "text": ""}
+        for i, d in enumerate(doc_of)
+    ]
+    start = time.perf_counter()
+    store = Store(name="bench", index=index, chunks=chunks, nbytes=0, version="bench")
+    facets_ms = (time.perf_counter() - start) * 1000.0
+
+    queries = rng.standard_normal((args.queries, args.dim), dtype="float32")
+    faiss.normalize_L2(queries)
+    queries = [queries[i : i + 1] for i in range(args.queries)]
+    k = args.k
+
+    rows = []
+    for sel in args.selectivity:
+        n_docs = max(1, int(round(sel * args.docs)))
+        filters = {"doc_id": [f"doc{d}" for d in range(n_docs)]}
+        store_filters = normalize_filters(filters)
+        allowed = set(store.select_ids(store_filters).tolist())
+
+        start = time.perf_counter()
+        store.search_params(store_filters)
+        selector_ms = (time.perf_counter() - start) * 1000.0
+
+        push, push_ms = bench(lambda q: search_store(store, q, k, filters), queries)
+        post, post_ms = bench(lambda q: postfilter(index, q, k, allowed, k * args.overfetch), queries)
+        full, full_ms = bench(lambda q: postfilter_full(index, q, k, allowed, k * args.overfetch), queries)
+
+        rows.append(
+            {
+                "selectivity": round(len(allowed) / args.vectors, 5),
+                "matching_chunks": len(allowed),
+                "selector_build_ms": round(selector_ms, 2),
+                "pushdown_p50_ms": round(push_ms, 3),
+                "pushdown_hits": round(float(np.mean([(ids[0] != -1).sum() for _, ids in push])), 2),
+                "postfilter_p50_ms": round(post_ms, 3),
+                "postfilter_hits": round(float(np.mean([len(h) for h in post])), 2),
+                "postfilter_full_p50_ms": round(full_ms, 3),
+                "postfilter_full_hits": round(float(np.mean([len(h) for h in full])), 2),
+            }
+        )
+
+    print(f"{'selectivity':>12}{'pushdown ms':>13}{'hits':>6}{'post ms':>10}{'hits':>6}{'post-full ms':>14}")
+    for r in rows:
+        print(
+            f"{r['selectivity']:>12}{r['pushdown_p50_ms']:>13}{r['pushdown_hits']:>6}"
+            f"{r['postfilter_p50_ms']:>10}{r['postfilter_hits']:>6}{r['postfilter_full_p50_ms']:>14}"
+        )
+    print("\nJSON summary:")
+    print(
+        json.dumps(
+            {"vectors": args.vectors, "dim": args.dim, "k": k, "facets_build_ms": round(facets_ms, 1), "results": rows},
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
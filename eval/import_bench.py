@@ -0,0 +1,97 @@
+"""
+Cold-start import report based on `python -X importtime`.
+
+    python eval/import_bench.py                 # import app.main
+    python eval/import_bench.py --module app.workflows.qa_graph --top 25
+
+Runs the import in fresh interpreters (OPENAI_API_KEY unset, as on a fresh
+autoscaled worker or CI) and reports wall time plus the slowest top-level
+packages by cumulative import time.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def run_once(module: str) -> tuple[float, str]:
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    env.pop("OPENAI_API_KEY", None)
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000.0
+    if proc.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    return wall_ms, proc.stderr
+
+
+def top_level_cumulative(report: str) -> Dict[str, float]:
+    """Cumulative ms per top-level package (lines with no indentation)."""
+    out: Dict[str, float] = {}
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = [p.strip() for p in line[len("import time:"):].split("|")]
+        if not cumulative.isdigit():
+            continue  # header line
+        raw_name = line.rsplit("|", 1)[1]
+        if raw_name.startswith("  "):  # nested import, already counted in its parent
+            continue
+        root = name.split(".")[0]
+        out[root] = out.get(root, 0.0) + int(cumulative) / 1000.0
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    walls = []
+    report = ""
+    for _ in range(args.runs):
+        wall, report = run_once(args.module)
+        walls.append(wall)
+
+    per_pkg = top_level_cumulative(report)
+    top = sorted(per_pkg.items(), key=lambda kv: kv[1], reverse=True)[: args.top]
+    heavy = ["faiss", "numpy", "langgraph", "openai", "pypdf", "sqlalchemy", "mcp", "tiktoken"]
+
+    print(f"import {args.module}: wall median={statistics.median(walls):.1f} ms over {args.runs} runs")
+    print(f"{'package':<32}{'cumulative ms':>14}")
+    for name, ms in top:
+        print(f"{name:<32}{ms:>14.1f}")
+
+    print("\nJSON summary:")
+    print(
+        json.dumps(
+            {
+                "module": args.module,
+                "wall_ms_median": round(statistics.median(walls), 1),
+                "wall_ms_min": round(min(walls), 1),
+                "import_time_ms_total": round(sum(per_pkg.values()), 1),
+                "heavy_modules_imported": [m for m in heavy if m in per_pkg],
+                "top": {k: round(v, 1) for k, v in top},
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
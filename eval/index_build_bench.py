@@ -0,0 +1,148 @@
+"""
+Index build benchmark: the old all-in-memory build vs. the streaming pipeline,
+plus an interrupted-and-resumed build, against the local fake OpenAI server.
+
+    python eval/index_build_bench.py --md 20000 --pdfs 200 --pages 10
+    python eval/index_build_bench.py --md 100000 --skip-legacy   # corpus too big for the old path
+
+Peak memory is the tracemalloc peak (Python objects + numpy buffers); the FAISS
+index itself lives in C++ memory and is reported separately as ntotal * dim * 4.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from fake_openai import SETTINGS, STATS, reset_stats, serve_in_thread
+from synthetic_corpus import make_corpus
+
+
+def measured(fn):
+    reset_stats()
+    tracemalloc.start()
+    start = time.perf_counter()
+    out = fn()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, {
+        "seconds": round(seconds, 2),
+        "peak_mb": round(peak / 1e6, 1),
+        "embedding_calls": STATS["embedding_calls"],
+    }
+
+
+def legacy_build(docs_dir: str, out_dir: str) -> int:
+    # What build_index.main used to do: every stage fully materialized
+    from app.core.config import CHUNK_OVERLAP, CHUNK_SIZE
+    from app.rag.chunker import chunk_documents
+    from app.rag.indexer import build_faiss_index
+    from app.rag.loader import load_documents
+
+    docs = load_documents(docs_dir)
+    chunks = chunk_documents(docs, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP)
+    build_faiss_index(chunks, out_dir=out_dir)
+    return len(chunks)
+
+
+def interrupted_build(docs_dir: str, out_dir: str, batch_size: int) -> dict:
+    """Start build_index in a subprocess, kill it after a few checkpoints, then resume in-process."""
+    from app.rag.pipeline import build_index_streaming, read_build_state
+
+    env = {**os.environ, "INDEX_CHECKPOINT_EVERY": "2", "INDEX_BATCH_SIZE": str(batch_size)}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.rag.build_index", "--docs", docs_dir, "--out", out_dir],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    killed_at = 0
+    while proc.poll() is None:
+        state = read_build_state(out_dir)
+        if state and state["done"] >= 4 * batch_size:
+            proc.kill()
+            proc.wait()
+            killed_at = state["done"]
+            break
+        time.sleep(0.05)
+
+    state = build_index_streaming(docs_dir, out_dir=out_dir, batch_size=batch_size, checkpoint_every=2)
+    return {"killed_after_chunks": killed_at, "resumed_from": state["resumed_from"], "chunks": state["chunks"]}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--md", type=int, default=20000, help="markdown notes in the corpus")
+    parser.add_argument("--pdfs", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--latency-ms", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    SETTINGS["latency_ms"] = args.latency_ms
+    server = serve_in_thread(port=args.port)
+    tmp = Path(tempfile.mkdtemp(prefix="index_build_bench_"))
+
+    # Must be set before app.core.config is imported (the resume subprocess inherits them too)
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+    os.environ["EXTRACT_CACHE_DIR"] = str(tmp / "cache")
+
+    try:
+        docs_dir = str(make_corpus(tmp / "docs", n_pdfs=args.pdfs, pages_per_pdf=args.pages, n_md=args.md))
+        corpus_mb = sum(f.stat().st_size for f in Path(docs_dir).iterdir()) / 1e6
+
+        import faiss
+
+        from app.rag.pipeline import build_index_streaming
+
+        results = {"corpus": {"md": args.md, "pdfs": args.pdfs, "pages_per_pdf": args.pages, "mb": round(corpus_mb, 1)}}
+
+        if not args.skip_legacy:
+            n, stats = measured(lambda: legacy_build(docs_dir, str(tmp / "legacy")))
+            results["legacy"] = {"chunks": n, **stats}
+
+        progress = []
+        state, stats = measured(
+            lambda: build_index_streaming(
+                docs_dir, out_dir=str(tmp / "streaming"), batch_size=args.batch_size, progress=progress.append
+            )
+        )
+        index = faiss.read_index(str(tmp / "streaming" / "index.faiss"))
+        results["streaming"] = {
+            "chunks": state["chunks"],
+            "chunks_per_s": state["chunks_per_s"],
+            "checkpoints": len(progress) - 1,
+            "faiss_index_mb": round(index.ntotal * index.d * 4 / 1e6, 1),
+            **stats,
+        }
+
+        resumed = interrupted_build(docs_dir, str(tmp / "resumed"), args.batch_size)
+        straight = json.loads((tmp / "streaming" / "chunks.json").read_text(encoding="utf-8"))
+        again = json.loads((tmp / "resumed" / "chunks.json").read_text(encoding="utf-8"))
+        resumed["identical_to_uninterrupted"] = (
+            [c["chunk_id"] for c in straight] == [c["chunk_id"] for c in again]
+            and faiss.read_index(str(tmp / "resumed" / "index.faiss")).ntotal == index.ntotal
+        )
+        results["interrupted_and_resumed"] = resumed
+
+        print(json.dumps(results, indent=2))
+    finally:
+        server.should_exit = True
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+"""
+Offline load test for POST /chat.
+
+Starts eval/fake_openai.py and the real app (uvicorn app.main:app, with its
+own /mcp mount serving the math tools) as subprocesses, builds a FAISS store
+from docs/ with the fake embeddings, then drives /chat with a closed loop of
+`--concurrency` clients. No network access or API key needed.
+
+    python eval/load_test.py --concurrency 32 --requests 500
+    python eval/load_test.py --chat-latency-ms 800 --completion-tokens 200 --mix rag=1
+    python eval/load_test.py --json > run.json      # machine-readable, for diffing runs
+    python eval/load_test.py --concurrency 64 --chat-latency-ms 2000 --chat-concurrency 8
+    python eval/load_test.py --outage 5:10 --requests 2000   # upstream 503s from t=5s to t=15s
+
+Reports throughput, p50/p95/p99 latency (overall and per route), the
+per-node breakdown from meta.timings and the app process's peak RSS.
+Requests shed by the upstream bulkheads (429/503 with Retry-After, see
+app/core/bulkhead.py) are counted separately from errors, and the app's
+bulkhead gauges (limit, queue, breaker state) are read from /metrics at the end.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import httpx
+import numpy as np
+
+QUESTIONS: Dict[str, List[str]] = {
+    "rag": [
+        "What are my key skills?",
+        "What companies have I worked for?",
+        "How does the on-call escalation work?",
+        "What does the product do for customers?",
+        "Which cloud platforms have I used?",
+    ],
+    "tool": [
+        "Multiply 12 and 7",
+        "Add 1200 and 34",
+        "What is 45 times 19?",
+        "Sum 250 and 750",
+    ],
+    "llm": [
+        "Write a haiku about databases",
+        "Explain what a message queue is in one sentence",
+    ],
+}
+
+
+def parse_mix(raw: str) -> Dict[str, float]:
+    mix = {}
+    for pair in raw.split(","):
+        name, _, weight = pair.partition("=")
+        if name.strip() not in QUESTIONS:
+            raise SystemExit(f"unknown route in --mix: {name!r} (choose from {', '.join(QUESTIONS)})")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port: int, proc: subprocess.Popen, timeout_s: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"process exited early with code {proc.returncode}")
+        with socket.socket() as s:
+            if s.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.05)
+    raise SystemExit(f"port {port} did not open within {timeout_s}s")
+
+
+def peak_rss_mb(pid: int) -> Optional[float]:
+    # Linux only: high-water mark of the process's resident set.
+    # With --workers > 1 this is uvicorn's supervisor, not the workers.
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def pct(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    a = np.asarray(values)
+    return {
+        "p50": round(float(np.percentile(a, 50)), 1),
+        "p95": round(float(np.percentile(a, 95)), 1),
+        "p99": round(float(np.percentile(a, 99)), 1),
+        "max": round(float(a.max()), 1),
+    }
+
+
+def scrape(text: str, prefixes: tuple) -> Dict[str, float]:
+    """Prometheus text lines starting with any of `prefixes`, as {series: value}."""
+    out = {}
+    for line in text.splitlines():
+        if line.startswith(prefixes):
+            series, _, value = line.rpartition(" ")
+            out[series] = float(value)
+    return out
+
+
+def outcome(r: dict) -> str:
+    if r["status"] in (429, 503):
+        return "shed"
+    return "ok" if r["status"] == 200 and not r["error"] else "errors"
+
+
+def timeline(results: List[dict]) -> List[dict]:
+    seconds: Dict[int, Counter] = defaultdict(Counter)
+    for r in results:
+        seconds[int(r["t"])][outcome(r)] += 1
+    return [{"t": t, "ok": c["ok"], "shed": c["shed"], "errors": c["errors"]} for t, c in sorted(seconds.items())]
+
+
+async def outage(fake_url: str, start_s: float, duration_s: float, error_rate: float) -> None:
+    async with httpx.AsyncClient(base_url=fake_url) as fake:
+        await asyncio.sleep(start_s)
+        await fake.post("/fake/settings", json={"error_rate": 1.0})
+        await asyncio.sleep(duration_s)
+        await fake.post("/fake/settings", json={"error_rate": error_rate})
+
+
+async def drive(base_url: str, fake_url: str, args, mix: Dict[str, float]) -> dict:
+    rng = random.Random(args.seed)
+    routes, weights = zip(*mix.items())
+    plan = []
+    for i in range(args.requests):
+        route = rng.choices(routes, weights)[0]
+        q = rng.choice(QUESTIONS[route])
+        # Distinct text per request, otherwise identical in-flight questions are coalesced
+        plan.append((route, q if args.allow_coalescing else f"{q} (#{i})"))
+
+    results: List[dict] = []
+    next_i = 0
+
+    async def client(http: httpx.AsyncClient):
+        nonlocal next_i
+        while next_i < len(plan):
+            expected, message = plan[next_i]
+            next_i += 1
+            start = time.perf_counter()
+            retry_after = None
+            try:
+                r = await http.post("/chat", json={"message": message})
+                body = r.json() if r.headers.get("content-type", "").startswith("application/json") else {}
+                status = r.status_code
+                retry_after = r.headers.get("retry-after")
+            except httpx.HTTPError as e:
+                body, status = {"error": str(e)}, 0
+            meta = body.get("meta", {})
+            results.append(
+                {
+                    "expected": expected,
+                    "status": status,
+                    "t": start - load_start,
+                    "retry_after": float(retry_after) if retry_after else None,
+                    "ms": (time.perf_counter() - start) * 1000.0,
+                    "route": meta.get("route"),
+                    "timings": meta.get("timings", {}),
+                    "error": meta.get("error") or body.get("error"),
+                }
+            )
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout_s, limits=limits) as http:
+        # Warm up: first request pays for lazy imports, store load, classifier embeddings
+        await http.post("/chat", json={"message": "warmup: what are my key skills?"})
+        load_start = start = time.perf_counter()
+        injector = None
+        if args.outage:
+            begin, _, length = args.outage.partition(":")
+            injector = asyncio.create_task(outage(fake_url, float(begin), float(length or 10), args.error_rate))
+        await asyncio.gather(*(client(http) for _ in range(args.concurrency)))
+        wall = time.perf_counter() - start
+        if injector is not None:
+            injector.cancel()
+        upstreams = scrape(
+            (await http.get("/metrics")).text, ("upstream_bulkhead", "load_shed_total", "tool_fallbacks_total")
+        )
+
+    ok = [r for r in results if outcome(r) == "ok"]
+    shed = [r for r in results if outcome(r) == "shed"]
+    by_route: Dict[str, List[float]] = defaultdict(list)
+    nodes: Dict[str, List[float]] = defaultdict(list)
+    for r in ok:
+        by_route[r["route"] or "unknown"].append(r["ms"])
+        for name, ms in r["timings"].items():
+            nodes[name].append(ms)
+
+    return {
+        "requests": len(results),
+        "ok": len(ok),
+        "errors": len(results) - len(ok) - len(shed),
+        "shed": len(shed),
+        "status_counts": {str(k): v for k, v in sorted(Counter(r["status"] for r in results).items())},
+        "error_samples": sorted({str(r["error"] or r["status"]) for r in results if outcome(r) == "errors"})[:5],
+        "retry_after_s": pct([r["retry_after"] for r in shed if r["retry_after"] is not None]),
+        "shed_latency_ms": pct([r["ms"] for r in shed]),
+        "wall_s": round(wall, 2),
+        "throughput_rps": round(len(ok) / wall, 2) if wall else None,
+        "latency_ms": pct([r["ms"] for r in ok]),
+        "latency_ms_by_route": {k: {"n": len(v), **pct(v)} for k, v in sorted(by_route.items())},
+        # mean ms per request spent in each span (spans can nest: "request" contains the nodes)
+        "node_ms": {
+            k: {"mean": round(float(np.mean(v)), 1), **pct(v)}
+            for k, v in sorted(nodes.items(), key=lambda kv: -float(np.mean(kv[1])))
+        },
+        "routed_as_planned": round(sum(r["route"] == r["expected"] for r in ok) / len(ok), 3) if ok else None,
+        "upstreams": upstreams,
+        # ok / shed / error requests by the second they started in (shows an --outage and the recovery)
+        "per_second": timeline(results) if args.outage else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--mix", default="rag=3,tool=1,llm=1", help="route weights, e.g. rag=1,tool=1")
+    parser.add_argument("--allow-coalescing", action="store_true", help="send repeated identical questions")
+    parser.add_argument("--docs", default=str(ROOT / "docs"))
+    parser.add_argument("--store", default=None, help="existing store dir (default: build one from --docs)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the app")
+    parser.add_argument("--timeout-s", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=7)
+    # fake upstream
+    parser.add_argument("--embed-latency-ms", type=float, default=20.0)
+    parser.add_argument("--chat-latency-ms", type=float, default=300.0)
+    parser.add_argument("--per-token-ms", type=float, default=2.0)
+    parser.add_argument("--completion-tokens", type=int, default=80)
+    parser.add_argument("--no-tool-calls", action="store_true")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of upstream calls failing with 503")
+    parser.add_argument("--outage", default=None, help="START:SECONDS of 100%% upstream errors, from load start")
+    # app bulkheads (env of the app process)
+    parser.add_argument("--chat-concurrency", type=int, default=None, help="CHAT_CONCURRENCY for the app")
+    parser.add_argument("--embed-concurrency", type=int, default=None, help="EMBED_CONCURRENCY for the app")
+    parser.add_argument("--shed-queue-wait-ms", type=float, default=None, help="SHED_QUEUE_WAIT_MS for the app")
+    parser.add_argument("--json", action="store_true", help="print only the JSON summary")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    tmp = Path(tempfile.mkdtemp(prefix="load_test_"))
+    fake_port, app_port = free_port(), free_port()
+    procs: List[subprocess.Popen] = []
+    quiet = subprocess.DEVNULL
+
+    try:
+        fake_cmd = [
+            sys.executable, str(ROOT / "eval" / "fake_openai.py"), "--port", str(fake_port),
+            "--latency-ms", str(args.embed_latency_ms),
+            "--chat-latency-ms", str(args.chat_latency_ms),
+            "--per-token-ms", str(args.per_token_ms),
+            "--completion-tokens", str(args.completion_tokens),
+            "--error-rate", str(args.error_rate),
+        ] + (["--no-tool-calls"] if args.no_tool_calls else [])
+        procs.append(subprocess.Popen(fake_cmd, cwd=ROOT, stdout=quiet, stderr=quiet))
+        wait_for_port(fake_port, procs[-1])
+
+        # Set before app.* is imported here, and inherited by the app process
+        os.environ.update(
+            {
+                "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_port}/v1",
+                "OPENAI_API_KEY": "sk-fake",
+                "MCP_URL": f"http://127.0.0.1:{app_port}/mcp/",
+                "CHAT_RATE_LIMIT": str(10**9),
+                "EXTRACT_CACHE_DIR": str(tmp / "cache"),
+                "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+                "METRICS_DIR": "",
+            }
+        )
+        for env, value in (
+            ("CHAT_CONCURRENCY", args.chat_concurrency),
+            ("EMBED_CONCURRENCY", args.embed_concurrency),
+            ("SHED_QUEUE_WAIT_MS", args.shed_queue_wait_ms),
+        ):
+            if value is not None:
+                os.environ[env] = str(value)
+
+        store = args.store
+        if store is None:
+            from app.rag.pipeline import build_index_streaming
+
+            store = str(tmp / "store")
+            build_index_streaming(args.docs, out_dir=store)
+        os.environ["RAG_STORE_DIR"] = str(Path(store).resolve())
+
+        app_cmd = [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(app_port),
+            "--workers", str(args.workers), "--log-level", "warning", "--no-access-log",
+        ]
+        procs.append(subprocess.Popen(app_cmd, cwd=ROOT, stdout=quiet, stderr=None if not args.json else quiet))
+        wait_for_port(app_port, procs[-1])
+
+        summary = asyncio.run(drive(f"http://127.0.0.1:{app_port}", f"http://127.0.0.1:{fake_port}", args, mix))
+        summary["app_peak_rss_mb"] = peak_rss_mb(procs[-1].pid)
+        summary["config"] = {
+            "concurrency": args.concurrency,
+            "mix": mix,
+            "workers": args.workers,
+            "embed_latency_ms": args.embed_latency_ms,
+            "chat_latency_ms": args.chat_latency_ms,
+            "per_token_ms": args.per_token_ms,
+            "completion_tokens": args.completion_tokens,
+            "tool_calls": not args.no_tool_calls,
+            "error_rate": args.error_rate,
+            "outage": args.outage,
+            "chat_concurrency": args.chat_concurrency,
+            "embed_concurrency": args.embed_concurrency,
+            "shed_queue_wait_ms": args.shed_queue_wait_ms,
+        }
+
+        if not args.json:
+            lat = summary["latency_ms"]
+            print(
+                f"{summary['ok']}/{summary['requests']} ok ({summary['shed']} shed) in {summary['wall_s']}s "
+                f"→ {summary['throughput_rps']} req/s  "
+                f"p50={lat.get('p50')} p95={lat.get('p95')} p99={lat.get('p99')} ms  "
+                f"peak RSS={summary['app_peak_rss_mb']} MB"
+            )
+            print(f"\n{'node':<16}{'mean ms':>10}{'p95 ms':>10}")
+            for name, s in summary["node_ms"].items():
+                print(f"{name:<16}{s['mean']:>10}{s['p95']:>10}")
+            print("\nJSON summary:")
+        print(json.dumps(summary, indent=2))
+    finally:
+        for p in reversed(procs):
+            p.terminate()
+        for p in procs:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Document extraction benchmark on a synthetic corpus of PDFs.
+
+    python eval/loader_bench.py --pdfs 300 --pages 8
+
+Compares the old serial loop (load_pdf per file), the process-pool loader
+with a cold cache, and the same loader with a warm cache.
+"""
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from synthetic_corpus import make_corpus
+
+from app.rag.loader import load_documents
+from app.rag.pdf_loader import load_pdf
+
+
+def timed(fn):
+    start = time.perf_counter()
+    out = fn()
+    return out, (time.perf_counter() - start) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pdfs", type=int, default=300)
+    parser.add_argument("--pages", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="loader_bench_"))
+    try:
+        docs_dir = make_corpus(tmp / "docs", n_pdfs=args.pdfs, pages_per_pdf=args.pages)
+        cache_dir = tmp / "cache"
+
+        serial, serial_ms = timed(lambda: [load_pdf(str(f)) for f in sorted(docs_dir.glob("*.pdf"))])
+
+        report = []
+        cold, cold_ms = timed(
+            lambda: load_documents(str(docs_dir), workers=args.workers, cache_dir=str(cache_dir), report=report)
+        )
+        warm, warm_ms = timed(lambda: load_documents(str(docs_dir), workers=args.workers, cache_dir=str(cache_dir)))
+
+        assert [d["text"] for d in serial] == [d["text"] for d in cold] == [d["text"] for d in warm]
+
+        per_file = sorted(r["ms"] for r in report)
+        print(
+            json.dumps(
+                {
+                    "pdfs": args.pdfs,
+                    "pages_per_pdf": args.pages,
+                    "serial_ms": round(serial_ms, 1),
+                    "parallel_cold_ms": round(cold_ms, 1),
+                    "parallel_warm_cache_ms": round(warm_ms, 1),
+                    "speedup_cold": round(serial_ms / cold_ms, 2),
+                    "speedup_warm": round(serial_ms / warm_ms, 2),
+                    "per_file_extract_ms": {
+                        "p50": per_file[len(per_file) // 2],
+                        "max": per_file[-1],
+                    },
+                },
+                indent=2,
+            )
+        )
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
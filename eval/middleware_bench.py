@@ -0,0 +1,112 @@
+"""
+Per-request overhead of RequestContextMiddleware (pure ASGI) vs. the previous
+BaseHTTPMiddleware implementation, in-process with no network.
+
+    python eval/middleware_bench.py --requests 5000
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+
+from app.core.middleware import RequestContextMiddleware
+
+
+class LegacyRequestContextMiddleware(BaseHTTPMiddleware):
+    """The BaseHTTPMiddleware version this replaced, kept here for comparison."""
+
+    async def dispatch(self, request: Request, call_next):
+        request_id = request.headers.get("x-request-id") or str(uuid.uuid4())
+        start = time.perf_counter()
+        response = await call_next(request)
+        latency_ms = (time.perf_counter() - start) * 1000.0
+        request.state.request_id = request_id
+        request.state.latency_ms = round(latency_ms, 2)
+        response.headers["x-request-id"] = request_id
+        response.headers["x-latency-ms"] = str(round(latency_ms, 2))
+        return response
+
+
+def make_app(middleware) -> FastAPI:
+    app = FastAPI()
+    if middleware is not None:
+        app.add_middleware(middleware)
+
+    @app.get("/ping")
+    async def ping(request: Request) -> dict:
+        return {"request_id": getattr(request.state, "request_id", None)}
+
+    @app.get("/stream")
+    async def stream():
+        async def body():
+            for i in range(20):
+                yield f'{{"i": {i}}}\n'
+
+        return StreamingResponse(body(), media_type="application/x-ndjson")
+
+    return app
+
+
+async def measure(app: FastAPI, path: str, n: int) -> list:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(200):  # warmup
+            await client.get(path)
+        timings = []
+        for _ in range(n):
+            start = time.perf_counter()
+            r = await client.get(path, headers={"x-request-id": "bench"})
+            timings.append((time.perf_counter() - start) * 1e6)
+            r.raise_for_status()
+    return timings
+
+
+async def bench(n: int) -> None:
+    apps = {
+        "none": make_app(None),
+        "legacy_base_http": make_app(LegacyRequestContextMiddleware),
+        "pure_asgi": make_app(RequestContextMiddleware),
+    }
+
+    # request_id visible to the endpoint?
+    transport = httpx.ASGITransport(app=apps["pure_asgi"])
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        seen = (await client.get("/ping", headers={"x-request-id": "abc"})).json()["request_id"]
+
+    out = {"requests": n, "endpoint_sees_client_request_id": seen == "abc", "results": {}}
+    for path in ("/ping", "/stream"):
+        base = statistics.median(await measure(apps["none"], path, n))
+        for name in ("legacy_base_http", "pure_asgi"):
+            med = statistics.median(await measure(apps[name], path, n))
+            out["results"][f"{name} {path}"] = {
+                "median_us": round(med, 1),
+                "overhead_us": round(med - base, 1),
+            }
+        out["results"][f"none {path}"] = {"median_us": round(base, 1), "overhead_us": 0.0}
+
+    print(json.dumps(out, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(bench(args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+MMR diversification of retrieved candidates: redundancy, relevance kept, tokens saved.
+
+    python eval/mmr_bench.py                 # rag_store + cached OpenAI query embeddings
+    python eval/mmr_bench.py --fake          # fully offline (hashed embeddings)
+    python eval/mmr_bench.py --lambdas 1.0 0.7 0.5 --k 6
+
+For every golden question (eval/retrieval_golden.json) this runs what rag_node
+does before the reranker: top RETRIEVE_K, keep score >= MIN_SCORE, then
+app.rag.mmr.diversify. For each lambda it reports, averaged over questions:
+  candidates / kept        before and after MMR
+  tokens_saved             rerank prompt tokens of the dropped candidates
+  redundancy               mean of each kept candidate's highest similarity to another kept one
+  relevant_kept            share of the labelled chunks among the candidates that survive
+  relevant_in_top_n        share of labelled chunks in the first RERANK_TOP_N (the order used
+                           when the rerank is skipped for time)
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import faiss
+import numpy as np
+
+from retrieval_bench import GOLDEN, embed_cached, fake_embed, openai_embed, relevant_ids
+
+from app.core.config import MIN_SCORE, MMR_K, OPENAI_EMBED_MODEL, RERANK_TOP_N, RETRIEVE_K
+from app.rag.mmr import diversify
+from app.rag.retriever import _hits, load_store, search_store
+from app.rag.stores import Store
+
+
+def redundancy(store: Store, hits) -> float:
+    if len(hits) < 2:
+        return 0.0
+    vecs = store.vectors_for(np.asarray([store.rows[h["chunk_id"]] for h in hits], dtype="int64"))
+    sim = vecs @ vecs.T
+    np.fill_diagonal(sim, -np.inf)
+    return float(sim.max(axis=1).mean())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--store", default="rag_store")
+    parser.add_argument("--fake", action="store_true", help="offline hashed embeddings for chunks and queries")
+    parser.add_argument("--k", type=int, default=MMR_K, help="candidates kept by MMR")
+    parser.add_argument("--lambdas", type=float, nargs="+", default=[1.0, 0.9, 0.7, 0.5, 0.3])
+    args = parser.parse_args()
+
+    golden = json.loads(GOLDEN.read_text(encoding="utf-8"))
+    index, chunks = load_store(args.store)
+    questions = [g["question"] for g in golden]
+
+    if args.fake:
+        docs = fake_embed([c["text"] for c in chunks], index.d)
+        faiss.normalize_L2(docs)
+        index = faiss.IndexFlatIP(index.d)
+        index.add(docs)
+        queries = embed_cached(questions, "fake-hash", lambda t: fake_embed(t, index.d))
+    else:
+        queries = embed_cached(questions, OPENAI_EMBED_MODEL, openai_embed)
+    store = Store(name="bench", index=index, chunks=chunks, nbytes=0, version="bench")
+    labels, label_source = relevant_ids(golden, chunks)
+
+    strong = []
+    for i in range(len(queries)):
+        scores, ids = search_store(store, queries[i : i + 1], RETRIEVE_K)
+        strong.append([h for h in _hits(chunks, scores[0], ids[0]) if h["score"] >= MIN_SCORE])
+
+    def rel(hits, labelled) -> float:
+        return len({store.rows[h["chunk_id"]] for h in hits} & labelled) / len(labelled)
+
+    rows = []
+    for lam in args.lambdas:
+        saved, before, after, red, kept_rel, top_rel = [], [], [], [], [], []
+        for hits, labelled in zip(strong, labels):
+            kept, meta = diversify(hits, store, k=args.k, lambda_=lam)
+            before.append(len(hits))
+            after.append(len(kept))
+            saved.append(meta.get("mmr_tokens_saved", 0))
+            red.append(redundancy(store, kept))
+            found = {store.rows[h["chunk_id"]] for h in hits} & labelled
+            if found:
+                kept_rel.append(rel(kept, found))
+                top_rel.append(rel(kept[:RERANK_TOP_N], labelled))
+        rows.append(
+            {
+                "lambda": lam,
+                "candidates": round(float(np.mean(before)), 2),
+                "kept": round(float(np.mean(after)), 2),
+                "tokens_saved": round(float(np.mean(saved)), 1),
+                "redundancy": round(float(np.mean(red)), 4),
+                "relevant_kept": round(float(np.mean(kept_rel)), 4) if kept_rel else None,
+                "relevant_in_top_n": round(float(np.mean(top_rel)), 4) if top_rel else None,
+            }
+        )
+
+    print(f"{'lambda':>7}{'cands':>7}{'kept':>6}{'tok saved':>11}{'redund.':>9}{'rel kept':>10}{'rel top-n':>11}")
+    for r in rows:
+        print(
+            f"{r['lambda']:>7}{r['candidates']:>7}{r['kept']:>6}{r['tokens_saved']:>11}{r['redundancy']:>9}"
+            f"{str(r['relevant_kept']):>10}{str(r['relevant_in_top_n']):>11}"
+        )
+    print("\nJSON summary:")
+    print(
+        json.dumps(
+            {
+                "embeddings": "fake-hash" if args.fake else OPENAI_EMBED_MODEL,
+                "questions": len(golden),
+                "labels_from": label_source,
+                "retrieve_k": RETRIEVE_K,
+                "min_score": MIN_SCORE,
+                "mmr_k": args.k,
+                "results": rows,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Provider prompt caching: cached share of prompt tokens and cost, old vs. new prompt layout.
+
+    python eval/prompt_cache_bench.py                    # golden questions, rag_store chunks
+    python eval/prompt_cache_bench.py --candidates 30
+
+Runs against the fake OpenAI server (eval/fake_openai.py), which simulates
+OpenAI's prefix cache (>= 1024 tokens, 128-token steps). For every golden
+question it sends what one /chat request sends: a rerank call, then the
+answer call, plus a hybrid answer with a math follow-up that takes a tool
+turn. Two layouts:
+  inline   instructions inside the user message, after the generic system
+           prompt (how the prompts were built before)
+  static   instructions as constant system prompts, the request's context and
+           question in the user message, prompt_cache_key per prompt kind
+Two passes per layout: "distinct" (each question once, cold cache) and
+"repeat" (the same questions again). Token counts and cost come from the
+meta returned by LLMClient.chat_with_tools, i.e. what the app records.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from fake_openai import SETTINGS, reset_stats, serve_in_thread
+
+GOLDEN = Path(__file__).resolve().parent / "retrieval_golden.json"
+
+# The prompts as they were built before the static layout, for comparison
+LEGACY_RAG = """
+You MUST answer using ONLY the provided context.
+- If the answer is not explicitly present in the context, reply exactly:
+"I don't know based on the provided documents."
+- When you use a piece of context, cite it as [1], [2] etc based on the context rank.
+
+Context:
+{context}
+
+Question:
+{question}
+""".strip()
+
+LEGACY_HYBRID = """
+You are a helpful assistant.
+- Use the provided context for policy/process facts.
+- Use tools for exact calculations if needed.
+- If something is missing from context, say you don't know.
+
+Context:
+{context}
+
+User question:
+{question}
+
+Answer with citations like [1], [2] when you use context.
+""".strip()
+
+
+def context_of(retrieved) -> str:
+    return "\n\n".join(f"[{r['rank']}] ({r['source']}) {r['text']}" for r in retrieved)
+
+
+def calls_for(layout: str, question: str, candidates, retrieved, top_n: int):
+    """(user_message, chat_with_tools kwargs) for one request's LLM calls."""
+    from app.rag.reranker import SYSTEM, rerank_prompt
+    from app.workflows.qa_graph import HYBRID_SYSTEM, RAG_SYSTEM, hybrid_prompt, rag_prompt
+
+    math_question = f"{question} Also multiply 12 and 7."
+    if layout == "static":
+        return [
+            ("rerank", rerank_prompt(question, candidates, top_n), {"system": SYSTEM, "cache_key": "rerank"}),
+            ("rag", rag_prompt(question, retrieved), {"system": RAG_SYSTEM, "cache_key": "rag_answer"}),
+            (
+                "hybrid",
+                hybrid_prompt(math_question, retrieved),
+                {"system": HYBRID_SYSTEM, "cache_key": "hybrid_answer"},
+            ),
+        ]
+    legacy_system = SYSTEM.replace("Return JSON like: [3, 0, 5]\n", "")
+    rerank_text = f"{legacy_system}\n\n{rerank_prompt(question, candidates, top_n)}\n\nReturn JSON like: [3, 0, 5]"
+    return [
+        ("rerank", rerank_text, {}),
+        ("rag", LEGACY_RAG.format(context=context_of(retrieved), question=question), {}),
+        ("hybrid", LEGACY_HYBRID.format(context=context_of(retrieved), question=math_question), {}),
+    ]
+
+
+async def run_pass(llm, layout: str, requests, top_n: int) -> dict:
+    totals = {"calls": 0, "llm_turns": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+    by_kind: dict = {}
+    for question, candidates, retrieved in requests:
+        for kind, message, kwargs in calls_for(layout, question, candidates, retrieved, top_n):
+            _, meta = await llm.chat_with_tools(message, request_id="prompt_cache_bench", **kwargs)
+            totals["calls"] += 1
+            for k in ("llm_turns", "prompt_tokens", "cached_tokens", "completion_tokens"):
+                totals[k] += meta.get(k, 0)
+            kind_row = by_kind.setdefault(kind, {"prompt_tokens": 0, "cached_tokens": 0})
+            kind_row["prompt_tokens"] += meta.get("prompt_tokens", 0)
+            kind_row["cached_tokens"] += meta.get("cached_tokens", 0)
+    return {**totals, "by_kind": by_kind}
+
+
+def priced(row: dict) -> dict:
+    from app.core.config import OPENAI_MODEL
+    from app.core.costs import estimate_cost
+
+    share = row["cached_tokens"] / row["prompt_tokens"] if row["prompt_tokens"] else 0.0
+    for kind in row["by_kind"].values():
+        kind["cached_share"] = round(kind["cached_tokens"] / kind["prompt_tokens"], 4) if kind["prompt_tokens"] else 0.0
+    return {
+        **row,
+        "cached_share": round(share, 4),
+        "cost_usd": estimate_cost(OPENAI_MODEL, row["prompt_tokens"], row["completion_tokens"], row["cached_tokens"]),
+        "cost_usd_uncached": estimate_cost(OPENAI_MODEL, row["prompt_tokens"], row["completion_tokens"]),
+    }
+
+
+async def bench(args) -> dict:
+    from app.core.clients import close_clients, get_llm, init_clients
+    from app.core.db import init_db
+
+    init_db()
+    init_clients()
+    llm = get_llm()
+
+    golden = json.loads(GOLDEN.read_text(encoding="utf-8"))
+    chunks = json.loads((Path(args.store) / "chunks.json").read_text(encoding="utf-8"))
+    rng = random.Random(7)
+    requests = []
+    for g in golden[: args.questions]:
+        # Layout is what is measured; any chunks make a realistically sized prompt
+        candidates = rng.sample(chunks, min(args.candidates, len(chunks)))
+        retrieved = [
+            {"rank": i, "source": Path(c.get("source", "")).name, "text": c["text"]}
+            for i, c in enumerate(candidates[: args.top_n], start=1)
+        ]
+        requests.append((g["question"], candidates, retrieved))
+
+    results = []
+    try:
+        for layout in ("inline", "static"):
+            reset_stats()
+            for name in ("distinct", "repeat"):
+                row = await run_pass(llm, layout, requests, args.top_n)
+                results.append({"layout": layout, "pass": name, **priced(row)})
+    finally:
+        await close_clients()
+    return {"questions": len(requests), "candidates": args.candidates, "top_n": args.top_n, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--store", default=str(ROOT / "rag_store"))
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--candidates", type=int, default=15, help="passages in the rerank prompt")
+    parser.add_argument("--top-n", type=int, default=5, help="passages in the answer prompt")
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+    args.store = str(Path(args.store).resolve())
+
+    SETTINGS["chat_latency_ms"] = 0.0
+    SETTINGS["per_token_ms"] = 0.0
+    server = serve_in_thread(port=args.port)
+
+    # Before app.core.config is imported; tools fall back to local math without MCP
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+    os.environ["MCP_URL"] = "http://127.0.0.1:9/mcp"
+    os.chdir(tempfile.mkdtemp(prefix="prompt_cache_bench_"))  # app_logs.db goes here
+
+    try:
+        summary = asyncio.run(bench(args))
+    finally:
+        server.should_exit = True
+
+    print(
+        f"{'layout':<8}{'pass':<10}{'prompt tok':>12}{'cached tok':>12}{'cached %':>10}"
+        f"{'cost $':>11}{'uncached $':>12}"
+    )
+    for r in summary["results"]:
+        print(
+            f"{r['layout']:<8}{r['pass']:<10}{r['prompt_tokens']:>12}{r['cached_tokens']:>12}"
+            f"{r['cached_share'] * 100:>9.1f}%{r['cost_usd']:>11.5f}{r['cost_usd_uncached']:>12.5f}"
+        )
+    print("\nJSON summary:")
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
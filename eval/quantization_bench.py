@@ -0,0 +1,164 @@
+"""
+Compact vector storage vs. IndexFlatIP: memory, search latency, recall.
+
+    python eval/quantization_bench.py --vectors 100000 --dim 1536 --dims 1536 512 256
+    python eval/quantization_bench.py --store rag_store          # vectors of a built store
+    RESCORE_FACTOR=10 python eval/quantization_bench.py          # wider candidate pool
+
+Synthetic data is clustered unit vectors; queries are noisy copies of the
+cluster centres. With --store, queries are noisy copies of stored vectors.
+Each (dims, storage) pair is published with app.rag.quantize.export_index and
+searched through search_store, exactly as the app would serve it. Reduced
+dims are emulated the way the `dimensions` parameter works: truncate, then
+re-normalize. That is only meaningful for text-embedding-3 vectors (use
+--store); on synthetic data it just shows the cost of dropping dimensions.
+
+Ground truth is exact float32 search at full dims. Reports per layout:
+  resident_mb       index.faiss — what stays in memory
+  mapped_mb         vectors.npy — memory-mapped, read only for re-scored rows
+  recall@k          search_store result vs. ground truth
+  first_pass_recall the compact index's own top k, before re-scoring
+  p50/p95 ms        per-query search_store latency
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import faiss
+import numpy as np
+
+from app.core.config import RESCORE_FACTOR
+from app.rag.quantize import STORAGE_KINDS, export_index, first_pass, read_index
+from app.rag.retriever import load_store, search_store
+from app.rag.stores import Store
+
+
+def synthetic(n: int, dim: int, clusters: int, n_queries: int, rng) -> tuple[np.ndarray, np.ndarray]:
+    centres = rng.standard_normal((clusters, dim), dtype="float32")
+    faiss.normalize_L2(centres)
+    noise = 0.6 / np.sqrt(dim)
+
+    def around(m: int) -> np.ndarray:
+        return centres[rng.integers(0, clusters, size=m)] + noise * rng.standard_normal((m, dim), dtype="float32")
+
+    return around(n), around(n_queries)
+
+
+def from_store(store_dir: str, n_queries: int, rng) -> tuple[np.ndarray, np.ndarray]:
+    index, _ = load_store(store_dir)
+    docs = index.reconstruct_n(0, index.ntotal)
+    picks = docs[rng.integers(0, len(docs), size=n_queries)]
+    queries = picks + 0.5 / np.sqrt(docs.shape[1]) * rng.standard_normal(picks.shape, dtype="float32")
+    return docs, queries
+
+
+def shorten(vecs: np.ndarray, d: int) -> np.ndarray:
+    out = np.ascontiguousarray(vecs[:, :d], dtype="float32")
+    faiss.normalize_L2(out)
+    return out
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    return float(np.mean([len(set(f[f != -1]) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--store", default=None, help="benchmark the vectors of a built (flat) store")
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--clusters", type=int, default=2000)
+    parser.add_argument("--dims", type=int, nargs="+", default=None, help="default: full dims, 512, 256")
+    parser.add_argument("--storage", nargs="+", default=list(STORAGE_KINDS), choices=STORAGE_KINDS)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    if args.store:
+        docs, queries = from_store(args.store, args.queries, rng)
+    else:
+        docs, queries = synthetic(args.vectors, args.dim, args.clusters, args.queries, rng)
+    faiss.normalize_L2(docs)
+    faiss.normalize_L2(queries)
+    full = docs.shape[1]
+    dims = [d for d in (args.dims or [full, 512, 256]) if d <= full]
+
+    exact = faiss.IndexFlatIP(full)
+    exact.add(docs)
+    _, truth = exact.search(queries, args.k)
+    chunks = [{"chunk_id": f"c{i}", "doc_id": f"d{i}", "source": f"d{i}.md", "text": ""} for i in range(len(docs))]
+
+    tmp = Path(tempfile.mkdtemp(prefix="quantization_bench_"))
+    rows = []
+    try:
+        for d in dims:
+            flat = faiss.IndexFlatIP(d)
+            flat.add(shorten(docs, d))
+            q = shorten(queries, d)
+            for storage in args.storage:
+                out = tmp / f"{storage}_{d}"
+                out.mkdir()
+                start = time.perf_counter()
+                for name in export_index(flat, out, storage):
+                    os.replace(out / f"{name}.tmp", out / name)
+                build_ms = (time.perf_counter() - start) * 1000.0
+
+                index, vectors, _ = read_index(out)
+                store = Store(
+                    name=out.name, index=index, chunks=chunks, nbytes=0, version="bench", storage=storage, vectors=vectors
+                )
+                search_store(store, q[:1], args.k)  # warm up
+
+                found, times = [], []
+                for i in range(len(q)):
+                    start = time.perf_counter()
+                    _, ids = search_store(store, q[i : i + 1], args.k)
+                    times.append((time.perf_counter() - start) * 1000.0)
+                    found.append(ids[0])
+
+                row = {
+                    "dims": d,
+                    "storage": storage,
+                    "resident_mb": round((out / "index.faiss").stat().st_size / 1e6, 2),
+                    "mapped_mb": round((out / "vectors.npy").stat().st_size / 1e6, 2) if vectors is not None else 0.0,
+                    f"recall@{args.k}": round(recall(np.array(found), truth), 4),
+                    "p50_ms": round(float(np.percentile(times, 50)), 3),
+                    "p95_ms": round(float(np.percentile(times, 95)), 3),
+                    "build_ms": round(build_ms, 1),
+                }
+                if vectors is not None:
+                    row["first_pass_recall"] = round(recall(first_pass(index, storage, q, args.k), truth), 4)
+                rows.append(row)
+                del store, index, vectors
+                shutil.rmtree(out)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    rk = f"recall@{args.k}"
+    print(f"{'dims':>6} {'storage':<8}{'resident MB':>13}{'mapped MB':>11}{rk:>11}{'1st pass':>10}{'p50 ms':>9}")
+    for r in rows:
+        print(
+            f"{r['dims']:>6} {r['storage']:<8}{r['resident_mb']:>13}{r['mapped_mb']:>11}{r[rk]:>11}"
+            f"{r.get('first_pass_recall', ''):>10}{r['p50_ms']:>9}"
+        )
+    print("\nJSON summary:")
+    print(
+        json.dumps(
+            {"vectors": len(docs), "full_dims": full, "k": args.k, "rescore_factor": RESCORE_FACTOR, "results": rows},
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
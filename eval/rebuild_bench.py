@@ -0,0 +1,149 @@
+"""
+Hot swap under load: query a collection continuously while it is rebuilt.
+
+    python eval/rebuild_bench.py --md 3000 --threads 4
+
+Builds version 1 of a synthetic collection against the fake embeddings
+server, then starts rebuild (app.rag.rebuild.start_rebuild, a worker process)
+from a different corpus while `--threads` threads keep calling retrieve().
+Each query is tagged by the store version that answered it. Reports
+per-phase latency (before the rebuild, while building, around the swap,
+after), failed queries, and how long the worker kept serving the old version
+after CURRENT moved.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import numpy as np
+
+from fake_openai import SETTINGS, fake_embedding, serve_in_thread
+from synthetic_corpus import make_corpus
+
+QUESTIONS = [
+    "how does the incident escalation runbook work",
+    "which database index cache is used",
+    "solar wind battery analytics dashboard",
+]
+
+
+def summary(values) -> dict:
+    if not values:
+        return {"n": 0}
+    return {
+        "n": len(values),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "max_ms": round(float(np.max(values)), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--md", type=int, default=3000, help="markdown notes per corpus")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--after-s", type=float, default=3.0, help="keep querying this long after the swap")
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+
+    SETTINGS["latency_ms"] = 0.0
+    server = serve_in_thread(port=args.port)
+    tmp = Path(tempfile.mkdtemp(prefix="rebuild_bench_"))
+
+    # Must be set before app.core.config is imported (the rebuild worker inherits them)
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+    os.environ["COLLECTIONS_DIR"] = str(tmp / "collections")
+    os.environ["EXTRACT_CACHE_DIR"] = str(tmp / "cache")
+
+    try:
+        from app.rag.rebuild import build_version, rebuild_status, start_rebuild
+        from app.rag.retriever import retrieve
+        from app.rag.stores import active_version, get_store
+
+        name = "bench"
+        old_docs = make_corpus(tmp / "docs_v1", n_pdfs=0, pages_per_pdf=0, n_md=args.md, seed=1)
+        new_docs = make_corpus(tmp / "docs_v2", n_pdfs=0, pages_per_pdf=0, n_md=args.md, seed=2)
+        v1 = build_version(name, str(old_docs))["version"]
+        dim = get_store(name).dim
+        vecs = [fake_embedding(q, dim).reshape(1, -1) for q in QUESTIONS]
+
+        samples = []  # (t, ms, version or None on error)
+        errors = []
+        stop = threading.Event()
+
+        def worker(seed: int) -> None:
+            i = seed
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    retrieve(QUESTIONS[i % len(QUESTIONS)], k=15, collection=name, query_vec=vecs[i % len(vecs)])
+                    version = get_store(name).version
+                except Exception as e:
+                    errors.append(repr(e))
+                    version = None
+                samples.append((time.perf_counter(), (time.perf_counter() - start) * 1000.0, version))
+                i += 1
+
+        threads = [threading.Thread(target=worker, args=(s,), daemon=True) for s in range(args.threads)]
+        for t in threads:
+            t.start()
+
+        time.sleep(1.0)
+        t_start = time.perf_counter()
+        start_rebuild(name, str(new_docs))
+        while active_version(name)[1] == v1:
+            if rebuild_status(name)["process"]["status"] in ("failed", "busy"):
+                raise SystemExit("rebuild worker failed; see its log output")
+            time.sleep(0.05)
+        t_published = time.perf_counter()
+        while get_store(name).version == v1:
+            time.sleep(0.001)
+        t_swapped = time.perf_counter()
+        time.sleep(args.after_s)
+        stop.set()
+        for t in threads:
+            t.join()
+
+        def phase(lo: float, hi: float):
+            return [ms for t, ms, _ in samples if lo <= t < hi]
+
+        swap_window = 0.5
+        print(
+            json.dumps(
+                {
+                    "threads": args.threads,
+                    "queries": len(samples),
+                    "failed": len(errors),
+                    "queries_by_version": dict(Counter(v for _, _, v in samples)),
+                    "errors": sorted(set(errors))[:5],
+                    "build_s": round(t_published - t_start, 2),
+                    "served_old_after_publish_ms": round((t_swapped - t_published) * 1000.0, 1),
+                    "before": summary(phase(0, t_start)),
+                    "building": summary(phase(t_start, t_published)),
+                    "swap": summary(phase(t_published - swap_window, t_swapped + swap_window)),
+                    "after": summary(phase(t_swapped + swap_window, float("inf"))),
+                    "status": rebuild_status(name),
+                },
+                indent=2,
+                default=str,
+            )
+        )
+    finally:
+        server.should_exit = True
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
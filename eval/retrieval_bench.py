@@ -0,0 +1,260 @@
+"""
+Retrieval quality-and-speed benchmark over a labelled golden set.
+
+    python eval/retrieval_bench.py                       # rag_store + OpenAI query embeddings (cached)
+    python eval/retrieval_bench.py --fake                # fully offline: hashed embeddings for docs and queries
+    python eval/retrieval_bench.py --distractors 200000  # pad the index to compare ANN index types at scale
+
+Golden set: eval/retrieval_golden.json, question -> relevant chunk_ids (empty
+for questions the corpus can't answer). Each entry also lists evidence
+strings; if the store was chunked differently and the labelled ids don't
+exist, chunks containing the evidence count as relevant instead.
+
+Document vectors are read back from the FAISS index, and query embeddings are
+cached under .cache/retrieval_bench/, so after the first run nothing is
+embedded again.
+
+Reports, per index type: recall@k, MRR, nDCG@k, overlap with exact search,
+per-query search latency and serialized index size; then a RETRIEVE_K x
+MIN_SCORE sweep of the candidate set the QA graph would hand to the reranker.
+"""
+import argparse
+import hashlib
+import json
+import math
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Set
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import faiss
+import numpy as np
+
+from app.core.config import MIN_SCORE, OPENAI_EMBED_MODEL, RETRIEVE_K
+from app.rag.retriever import load_store
+
+GOLDEN = Path(__file__).resolve().parent / "retrieval_golden.json"
+CACHE_DIR = ROOT / ".cache" / "retrieval_bench"
+KS = (1, 3, 5, 10)
+
+
+# -------------------------
+# Embeddings (cached)
+# -------------------------
+def embed_cached(texts: List[str], model: str, embed_many) -> np.ndarray:
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    paths = [CACHE_DIR / (hashlib.sha256(f"{model}|{t}".encode("utf-8")).hexdigest()[:24] + ".npy") for t in texts]
+    missing = [i for i, p in enumerate(paths) if not p.exists()]
+    if missing:
+        vecs = embed_many([texts[i] for i in missing])
+        for i, v in zip(missing, vecs):
+            np.save(paths[i], np.asarray(v, dtype="float32"))
+    out = np.stack([np.load(p) for p in paths]).astype("float32")
+    faiss.normalize_L2(out)
+    return out
+
+
+def openai_embed(texts: List[str]) -> np.ndarray:
+    from app.rag.indexer import embed_texts
+
+    return embed_texts(texts)
+
+
+def fake_embed(texts: List[str], dim: int) -> np.ndarray:
+    from fake_openai import fake_embedding
+
+    return np.stack([fake_embedding(t, dim) for t in texts])
+
+
+# -------------------------
+# Labels
+# -------------------------
+def _norm(s: str) -> str:
+    return re.sub(r"\s+", " ", s)
+
+
+def relevant_ids(golden: List[Dict], chunks: List[Dict]) -> tuple[List[Set[int]], str]:
+    pos = {c["chunk_id"]: i for i, c in enumerate(chunks)}
+    labelled = [cid for g in golden for cid in g["chunk_ids"]]
+    if all(cid in pos for cid in labelled):
+        return [{pos[cid] for cid in g["chunk_ids"]} for g in golden], "chunk_ids"
+
+    texts = [_norm(c["text"]) for c in chunks]
+    out = []
+    for g in golden:
+        ev = [_norm(e) for e in g["evidence"]]
+        out.append({i for i, t in enumerate(texts) if any(e in t for e in ev)})
+    return out, "evidence"
+
+
+# -------------------------
+# Metrics
+# -------------------------
+def rank_metrics(ids: np.ndarray, rel: Set[int]) -> Dict[str, float]:
+    ranked = [int(i) for i in ids if i != -1]
+    out: Dict[str, float] = {}
+    for k in KS:
+        top = ranked[:k]
+        hits = [1.0 if i in rel else 0.0 for i in top]
+        out[f"recall@{k}"] = sum(hits) / len(rel)
+        dcg = sum(h / math.log2(r + 2) for r, h in enumerate(hits))
+        ideal = sum(1.0 / math.log2(r + 2) for r in range(min(len(rel), k)))
+        out[f"ndcg@{k}"] = dcg / ideal
+    first = next((r for r, i in enumerate(ranked) if i in rel), None)
+    out["mrr"] = 0.0 if first is None else 1.0 / (first + 1)
+    return out
+
+
+def build_index(kind: str, vectors: np.ndarray, args) -> faiss.Index:
+    d = vectors.shape[1]
+    if kind == "flat":
+        index = faiss.IndexFlatIP(d)
+    elif kind == "hnsw":
+        index = faiss.IndexHNSWFlat(d, args.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = 80
+        index.hnsw.efSearch = args.ef_search
+    elif kind == "ivf":
+        nlist = max(1, min(args.nlist or int(4 * math.sqrt(len(vectors))), len(vectors) // 39 or 1))
+        index = faiss.IndexIVFFlat(faiss.IndexFlatIP(d), d, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+        index.nprobe = min(args.nprobe, nlist)
+    else:
+        raise SystemExit(f"unknown index type {kind!r}")
+    index.add(vectors)
+    return index
+
+
+def evaluate(index: faiss.Index, queries: np.ndarray, labels: List[Set[int]], k: int, exact_ids=None) -> Dict:
+    latencies, all_ids, all_scores = [], [], []
+    for i in range(len(queries)):
+        start = time.perf_counter()
+        scores, ids = index.search(queries[i : i + 1], k)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+        all_ids.append(ids[0])
+        all_scores.append(scores[0])
+
+    per_query = [rank_metrics(ids, rel) for ids, rel in zip(all_ids, labels) if rel]
+    quality = {m: round(float(np.mean([q[m] for q in per_query])), 4) for m in per_query[0]}
+
+    out = {
+        **quality,
+        "search_ms_p50": round(float(np.percentile(latencies, 50)), 3),
+        "search_ms_p95": round(float(np.percentile(latencies, 95)), 3),
+        "index_mb": round(faiss.serialize_index(index).nbytes / 1e6, 2),
+    }
+    if exact_ids is not None:
+        # ANN vs exact: share of the exact top-10 the index also returns
+        overlap = [len(set(a[:10]) & set(b[:10])) / 10 for a, b in zip(all_ids, exact_ids)]
+        out["overlap_with_flat@10"] = round(float(np.mean(overlap)), 4)
+    return {"metrics": out, "ids": all_ids, "scores": all_scores}
+
+
+def sweep(ids: List[np.ndarray], scores: List[np.ndarray], labels: List[Set[int]], ks, thresholds) -> List[Dict]:
+    """What rag_node would pass on: top RETRIEVE_K, then score >= MIN_SCORE."""
+    rows = []
+    for k in ks:
+        for t in thresholds:
+            recall, passed, negative_hits = [], [], []
+            for row_ids, row_scores, rel in zip(ids, scores, labels):
+                kept = {int(i) for i, s in zip(row_ids[:k], row_scores[:k]) if i != -1 and s >= t}
+                passed.append(len(kept))
+                if rel:
+                    recall.append(len(kept & rel) / len(rel))
+                else:
+                    negative_hits.append(1.0 if kept else 0.0)
+            rows.append(
+                {
+                    "RETRIEVE_K": k,
+                    "MIN_SCORE": t,
+                    "current": k == RETRIEVE_K and abs(t - MIN_SCORE) < 1e-9,
+                    "recall": round(float(np.mean(recall)), 4),
+                    "avg_candidates": round(float(np.mean(passed)), 2),
+                    "unanswerable_with_candidates": round(float(np.mean(negative_hits)), 4) if negative_hits else None,
+                }
+            )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--store", default="rag_store")
+    parser.add_argument("--fake", action="store_true", help="offline hashed embeddings for chunks and queries")
+    parser.add_argument("--index-types", nargs="+", default=["flat", "hnsw", "ivf"])
+    parser.add_argument("--distractors", type=int, default=0, help="random unit vectors added to the index")
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--nlist", type=int, default=0, help="IVF lists (default 4*sqrt(N))")
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--retrieve-k", type=int, nargs="+", default=[5, 10, 15, 20, 30])
+    parser.add_argument("--min-score", type=float, nargs="+", default=[0.0, 0.15, 0.2, 0.25, 0.3, 0.35, 0.4])
+    args = parser.parse_args()
+
+    golden = json.loads(GOLDEN.read_text(encoding="utf-8"))
+    store, chunks = load_store(args.store)
+    questions = [g["question"] for g in golden]
+
+    if args.fake:
+        model = "fake-hash"
+        docs = fake_embed([c["text"] for c in chunks], store.d)
+        queries = embed_cached(questions, model, lambda t: fake_embed(t, store.d))
+    else:
+        model = OPENAI_EMBED_MODEL
+        docs = store.reconstruct_n(0, store.ntotal)
+        queries = embed_cached(questions, model, openai_embed)
+
+    docs = np.ascontiguousarray(docs, dtype="float32")
+    faiss.normalize_L2(docs)
+    if args.distractors:
+        rng = np.random.default_rng(7)
+        noise = rng.standard_normal((args.distractors, docs.shape[1]), dtype="float32")
+        faiss.normalize_L2(noise)
+        docs = np.vstack([docs, noise])
+
+    labels, label_source = relevant_ids(golden, chunks)
+    k = max(max(KS), max(args.retrieve_k))
+
+    results, exact = {}, None
+    for kind in args.index_types:
+        start = time.perf_counter()
+        index = build_index(kind, docs, args)
+        build_ms = (time.perf_counter() - start) * 1000.0
+        r = evaluate(index, queries, labels, k, exact_ids=None if exact is None else exact["ids"])
+        r["metrics"]["build_ms"] = round(build_ms, 1)
+        results[kind] = r
+        if kind == "flat":
+            exact = r
+
+    print(f"{'index':<8}{'recall@5':>10}{'mrr':>8}{'ndcg@5':>8}{'p50 ms':>9}{'p95 ms':>9}{'MB':>9}")
+    for kind, r in results.items():
+        m = r["metrics"]
+        print(
+            f"{kind:<8}{m['recall@5']:>10}{m['mrr']:>8}{m['ndcg@5']:>8}"
+            f"{m['search_ms_p50']:>9}{m['search_ms_p95']:>9}{m['index_mb']:>9}"
+        )
+
+    base = exact or next(iter(results.values()))
+    print("\nJSON summary:")
+    print(
+        json.dumps(
+            {
+                "embeddings": model,
+                "vectors": int(docs.shape[0]),
+                "dim": int(docs.shape[1]),
+                "questions": len(golden),
+                "unanswerable": sum(1 for rel in labels if not rel),
+                "labels_from": label_source,
+                "index_types": {kind: r["metrics"] for kind, r in results.items()},
+                "retrieve_k_min_score_sweep": sweep(base["ids"], base["scores"], labels, args.retrieve_k, args.min_score),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
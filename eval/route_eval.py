@@ -0,0 +1,86 @@
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import numpy as np
+
+from app.rag.indexer import embed_texts
+from app.workflows.route_classifier import RouteClassifier
+from app.workflows.qa_graph import _keyword_route
+
+# Held-out labelled questions (not in ROUTE_EXAMPLES)
+LABELLED: List[Dict] = [
+    {"question": "What programming languages do I know?", "route": "rag"},
+    {"question": "Where did I work in 2023?", "route": "rag"},
+    {"question": "What is my home address?", "route": "rag"},
+    {"question": "Who handles escalations during on-call?", "route": "rag"},
+    {"question": "What is this product for?", "route": "rag"},
+    {"question": "List my Azure certifications.", "route": "rag"},
+    {"question": "What is 98 * 76?", "route": "tool"},
+    {"question": "Add 1234 and 4321", "route": "tool"},
+    {"question": "multiply 33 by 3", "route": "tool"},
+    {"question": "What do you get if you add 9 and 10?", "route": "tool"},
+    {"question": "Take my years of experience and multiply by 52 weeks.", "route": "hybrid"},
+    {"question": "Add the number of skills listed in my resume to 10.", "route": "hybrid"},
+    {"question": "What is the population of Mars?", "route": "llm"},
+    {"question": "Give me a fun fact about octopuses.", "route": "llm"},
+    {"question": "What's the weather usually like in Paris in spring?", "route": "llm"},
+    {"question": "Hi there, who are you?", "route": "llm"},
+]
+
+
+def main():
+    t0 = time.perf_counter()
+    clf = RouteClassifier.from_examples()
+    build_ms = (time.perf_counter() - t0) * 1000.0
+
+    questions = [c["question"] for c in LABELLED]
+    vecs = np.asarray(embed_texts(questions), dtype="float32")
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+
+    # Warm up, then time classify() alone (the part added to route_node)
+    clf.classify(vecs[0])
+    timings_us = []
+    correct = 0
+    keyword_correct = 0
+    confusion: Dict[str, Dict[str, int]] = {}
+    for case, v in zip(LABELLED, vecs):
+        start = time.perf_counter()
+        pred, score = clf.classify(v)
+        timings_us.append((time.perf_counter() - start) * 1e6)
+
+        kw = _keyword_route(case["question"])
+        correct += pred == case["route"]
+        keyword_correct += kw == case["route"]
+        confusion.setdefault(case["route"], {}).setdefault(pred, 0)
+        confusion[case["route"]][pred] += 1
+
+        status = "PASS" if pred == case["route"] else "FAIL"
+        print(f"[{status}] {case['question']!r}: expected={case['route']} predicted={pred} ({score:.3f}) keyword={kw}")
+
+    total = len(LABELLED)
+    summary = {
+        "centroid_matrix_shape": list(clf.centroids.shape),
+        "build_ms": round(build_ms, 2),
+        "accuracy": round(correct / total, 4),
+        "keyword_accuracy": round(keyword_correct / total, 4),
+        "classify_p50_us": round(float(np.percentile(timings_us, 50)), 2),
+        "classify_p99_us": round(float(np.percentile(timings_us, 99)), 2),
+        "confusion": confusion,
+    }
+
+    print("\n----------------------------")
+    print(f"Classifier accuracy: {correct}/{total}")
+    print(f"Keyword accuracy:    {keyword_correct}/{total}")
+    print("\nJSON summary:")
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Synthetic document corpora for the indexing benchmarks (no external deps).
+"""
+import random
+from pathlib import Path
+from typing import List
+
+WORDS = (
+    "incident escalation runbook rotation latency deploy rollback service alert pager "
+    "customer product feature release database index cache queue worker retry timeout "
+    "kubernetes azure kafka microservice dashboard renewable solar wind battery analytics"
+).split()
+
+
+def paragraph(rng: random.Random, sentences: int = 5) -> str:
+    out = []
+    for _ in range(sentences):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(8, 16))]
+        out.append(" ".join(words).capitalize() + ".")
+    return " ".join(out)
+
+
+def _escape(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(path: Path, pages: List[List[str]]) -> None:
+    """Write a minimal valid PDF with one Helvetica text line per list entry."""
+    objects: List[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # pages tree, filled in below
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for lines in pages:
+        ops = ["BT", "/F1 9 Tf", "40 760 Td", "11 TL"]
+        for line in lines:
+            ops.append(f"({_escape(line)}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1", errors="replace")
+        content_no = len(objects) + 2
+        page_no = len(objects) + 1
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_no} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        kids.append(f"{page_no} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+
+
+def make_corpus(out_dir: Path, n_pdfs: int, pages_per_pdf: int, n_md: int = 0, seed: int = 7) -> Path:
+    rng = random.Random(seed)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for i in range(n_pdfs):
+        pages = []
+        for _ in range(pages_per_pdf):
+            text = paragraph(rng, sentences=12)
+            # ~90 chars per PDF line
+            pages.append([text[j : j + 90] for j in range(0, len(text), 90)])
+        make_pdf(out_dir / f"doc_{i:05d}.pdf", pages)
+    for i in range(n_md):
+        body = "\n\n".join(f"## Section {k}\n{paragraph(rng)}" for k in range(6))
+        (out_dir / f"note_{i:05d}.md").write_text(f"# Note {i}\n\n{body}\n", encoding="utf-8")
+    return out_dir
@@ -1,5 +1,94 @@
-def main():
-    print("Hello from ai-engineer-capstone!")
+"""
+Production launcher for the API.
+
+    python main.py                                   # 127.0.0.1:8000, one worker
+    python main.py --host 0.0.0.0 --workers 4
+    python main.py --drain-s 10 --graceful-timeout 30
+    python main.py --reload                          # development
+
+Runs uvicorn with uvloop and httptools when they are installed (they are part
+of uvicorn[standard]). Each worker warms up in the app lifespan before it
+accepts connections: graph compile, default store, route classifier and the
+WARMUP_QUERIES (embedded and searched). GET /ready turns 200 once that is done
+and back to 503 during a drain; GET /live stays 200 while the process runs.
+
+On SIGTERM a worker first drains: /ready answers 503 for --drain-s while
+requests are still served, so a load balancer stops routing to it. Then
+uvicorn stops accepting and gives in-flight requests --graceful-timeout
+seconds. SIGINT (Ctrl-C) skips the drain. Flags override the matching
+environment variables, which the workers inherit.
+"""
+import argparse
+import importlib.util
+import os
+import sys
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the AI Engineer Capstone API.")
+    parser.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")), help="worker processes"
+    )
+    # No app imports here: app.core.config reads the environment once, and
+    # main() has to set it first (one worker runs in this process)
+    parser.add_argument(
+        "--drain-s", type=float, default=None, help="seconds /ready reports 503 before stopping (DRAIN_DELAY_S)"
+    )
+    parser.add_argument(
+        "--graceful-timeout",
+        type=float,
+        default=float(os.getenv("GRACEFUL_SHUTDOWN_S", "30")),
+        help="seconds in-flight requests get to finish (GRACEFUL_SHUTDOWN_S)",
+    )
+    parser.add_argument("--keep-alive", type=int, default=5, help="idle HTTP keep-alive timeout (s)")
+    parser.add_argument("--warmup-queries", default=None, help='"|"-separated warmup queries ("" disables)')
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "INFO").lower())
+    parser.add_argument("--no-access-log", action="store_true")
+    parser.add_argument("--reload", action="store_true", help="development: restart on code changes (one worker)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    from dotenv import load_dotenv
+
+    load_dotenv()  # as app.core.config does, so .env values show up as flag defaults
+    args = parse_args(argv)
+
+    # Settings reach app.core.config through the environment, so set it before
+    # anything imports the app: a single worker runs in this process, more are
+    # spawned and inherit it
+    if args.drain_s is not None:
+        os.environ["DRAIN_DELAY_S"] = str(args.drain_s)
+    os.environ["GRACEFUL_SHUTDOWN_S"] = str(args.graceful_timeout)
+    if args.warmup_queries is not None:
+        os.environ["WARMUP_QUERIES"] = args.warmup_queries
+    # Tool calls go to this server's own /mcp mount unless MCP_URL points elsewhere
+    os.environ.setdefault("MCP_URL", f"http://127.0.0.1:{args.port}/mcp")
+    if args.workers > 1 and not os.getenv("METRICS_DIR"):
+        print("warning: --workers > 1 without METRICS_DIR: /metrics shows one worker at a time", file=sys.stderr)
+
+    import uvicorn
+
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=None if args.reload else args.workers,
+        reload=args.reload,
+        loop="uvloop" if _installed("uvloop") else "asyncio",
+        http="httptools" if _installed("httptools") else "h11",
+        lifespan="on",
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=int(args.graceful_timeout),
+        log_level=args.log_level,
+        access_log=not args.no_access_log,
+    )
 
 
 if __name__ == "__main__":